@@ -22,6 +22,21 @@ if _platform == 'x86_64':
     binaries = [('/Users/cudmore/opt/miniconda3/envs/sanpy-pyinstaller-i386/lib/python3.11/site-packages/tables/libblosc2.dylib', 'tables')]
 
 hiddenimports=['pkg_resources']
+
+# modules sanpy imports on first use, pyinstaller does not see these
+from PyInstaller.utils.hooks import collect_submodules
+hiddenimports += collect_submodules('sanpy.interface.plugins')
+hiddenimports += [
+    'sanpy.interface.bScatterPlotWidget2',
+    'sanpy.interface.bExportWidget',
+    'matplotlib.backends.backend_qt5agg',
+    'seaborn',
+    'h5py',
+    'tables.scripts.ptrepack',
+    'tifffile',
+    'skimage.measure.profile',
+    'requests',
+]
 block_cipher = None
 
 a = Analysis(
@@ -3,6 +3,23 @@
 
 block_cipher = None
 
+hiddenimports=['tables', 'pkg_resources']
+
+# modules sanpy imports on first use, pyinstaller does not see these
+from PyInstaller.utils.hooks import collect_submodules
+hiddenimports += collect_submodules('sanpy.interface.plugins')
+hiddenimports += [
+    'sanpy.interface.bScatterPlotWidget2',
+    'sanpy.interface.bExportWidget',
+    'matplotlib.backends.backend_qt5agg',
+    'seaborn',
+    'h5py',
+    'tables.scripts.ptrepack',
+    'tifffile',
+    'skimage.measure.profile',
+    'requests',
+]
+
 
 a = Analysis(
     ['..\\..\\sanpy\\interface\\sanpy_app.py'],
@@ -10,7 +27,7 @@ a = Analysis(
     binaries=[],
     datas=[('libblosc2.dll', 'tables'),
         ('..\\..\\sanpy\\_userFiles','_userFiles')],
-    hiddenimports=['tables', 'pkg_resources'],
+    hiddenimports=hiddenimports,
     hookspath=[],
     runtime_hooks=[],
     excludes=[],
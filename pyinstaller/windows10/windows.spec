@@ -3,6 +3,23 @@
 
 block_cipher = None
 
+hiddenimports=['tables', 'pkg_resources']
+
+# modules sanpy imports on first use, pyinstaller does not see these
+from PyInstaller.utils.hooks import collect_submodules
+hiddenimports += collect_submodules('sanpy.interface.plugins')
+hiddenimports += [
+    'sanpy.interface.bScatterPlotWidget2',
+    'sanpy.interface.bExportWidget',
+    'matplotlib.backends.backend_qt5agg',
+    'seaborn',
+    'h5py',
+    'tables.scripts.ptrepack',
+    'tifffile',
+    'skimage.measure.profile',
+    'requests',
+]
+
 
 a = Analysis(
     ['..\\..\\sanpy\\interface\\sanpy_app.py'],
@@ -12,7 +29,7 @@ a = Analysis(
         ('..\\..\\sanpy\\interface\\icons\\sanpy_transparent.png', '.'), # window icon
         ('..\\..\\sanpy\\_userFiles','_userFiles'),
         ('..\\..\\sanpy\\detection-presets', 'detection-presets')],
-    hiddenimports=['tables', 'pkg_resources'],
+    hiddenimports=hiddenimports,
     hookspath=[],
     runtime_hooks=[],
     excludes=[],
@@ -33,8 +33,8 @@ class exampleUserAnalysis(baseUserAnalysis):
         """This is the user code to create and then fill in
             a new name/value for each spike."""
 
-        # get filtered vm for the entire trace
-        filteredVm = self.getFilteredVm()
+        # filtered vm of the current sweep is self.getFilteredVm(),
+        # not needed here and it filters the entire sweep of a lazy recording
 
         lastThresholdPnt = None
         for spikeIdx, spikeDict in enumerate(self.ba.spikeDict):
@@ -1,8 +1,10 @@
 import os
 import sys
 import importlib
+import importlib.util
 import pathlib
 import shutil
+import types
 from typing import List, Union
 import uuid
 
@@ -43,6 +45,110 @@ def _module_from_file(module_name: str, file_path: str):
     return module
 
 
+class _lazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    See _lazyImport().
+    """
+
+    def __init__(self, module_name: str):
+        self._lazyModuleName = module_name
+
+    def __getattr__(self, name):
+        # only called for attributes we do not have, e.g. sns.scatterplot
+        # import_module() is thread safe and returns sys.modules after the first call
+        module = importlib.import_module(self._lazyModuleName)
+        return getattr(module, name)
+
+    def __repr__(self):
+        return f"<lazy module '{self._lazyModuleName}'>"
+
+
+def _lazyImport(module_name: str):
+    """Defer importing a heavy dependency until it is first used.
+
+    Use in place of `import seaborn as sns` at the top of a module,
+        sns = _lazyImport("seaborn")
+
+    If the module is already imported, it is returned directly.
+
+    Args:
+        module_name: Full module name like 'matplotlib.pyplot'
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    return _lazyModule(module_name)
+
+
+def _bindLazyNames(moduleGlobals: dict, lazyNames: dict, moduleName: str, module):
+    """Bind all lazy names that come from one imported submodule.
+
+    Args:
+        moduleGlobals: globals() of the package
+        lazyNames: Dict of name -> (module, attribute)
+        moduleName: Relative module name like '.plotScatter'
+        module: The imported submodule
+    """
+    for oneName, (oneModuleName, oneAttribute) in lazyNames.items():
+        if oneModuleName == moduleName and hasattr(module, oneAttribute):
+            moduleGlobals[oneName] = getattr(module, oneAttribute)
+
+
+class _lazyPackage(types.ModuleType):
+    """Package whose lazy names are not hidden by submodules of the same name.
+
+    Python's import system binds each imported submodule onto its package,
+    e.g. `import sanpy.interface.plugins.plotScatter` sets the package
+    attribute plotScatter to the module. Bind the class back in its place.
+
+    See _lazyAttributes().
+    """
+
+    def __setattr__(self, name, value):
+        lazyNames = self.__dict__.get("_lazyAttributeNames", {})
+        if name in lazyNames and isinstance(value, types.ModuleType):
+            moduleName = lazyNames[name][0]
+            if value.__name__ == importlib.util.resolve_name(moduleName, self.__name__):
+                _bindLazyNames(self.__dict__, lazyNames, moduleName, value)
+                if name in self.__dict__:
+                    return
+        super().__setattr__(name, value)
+
+
+def _lazyAttributes(moduleGlobals: dict, lazyNames: dict):
+    """Make a package level __getattr__ that imports names on first use.
+
+    In a package __init__.py, in place of `from .plotScatter import plotScatter`,
+        __getattr__ = _lazyAttributes(globals(), {"plotScatter": (".plotScatter", "plotScatter")})
+
+    Works for both `package.plotScatter` and `from package import plotScatter`,
+    also after the submodule was imported directly (see _lazyPackage).
+
+    Args:
+        moduleGlobals: globals() of the package
+        lazyNames: Dict of name -> (module, attribute), module is relative to the package
+    """
+    packageName = moduleGlobals["__name__"]
+
+    moduleGlobals["_lazyAttributeNames"] = lazyNames
+    sys.modules[packageName].__class__ = _lazyPackage
+
+    def __getattr__(name):
+        if name not in lazyNames:
+            raise AttributeError(f"module '{packageName}' has no attribute '{name}'")
+
+        moduleName = lazyNames[name][0]
+        module = importlib.import_module(moduleName, packageName)
+
+        # importing a submodule binds it in the package (plotScatter is then the module)
+        # bind all our names from this module so they win
+        _bindLazyNames(moduleGlobals, lazyNames, moduleName, module)
+
+        return moduleGlobals[name]
+
+    return __getattr__
+
+
 def addUserPath():
     """Make <user>/Documents/SanPy folder and add it to the Python sys.path
 
@@ -139,6 +245,13 @@ def _getUserPreferencesFolder():
     return userPreferencesFolder
 
 
+def _getUserCacheFolder():
+    """Folder of SanPy caches, safe to delete (user does not modify this)."""
+    userCacheFolder = _getUserSanPyFolder()
+    userCacheFolder = os.path.join(userCacheFolder, "cache")
+    return userCacheFolder
+
+
 def pprint(d: dict):
     for k, v in d.items():
         print(f"  {k}: {v}")
@@ -5,14 +5,17 @@
 import os, time, sys
 import random
 import copy  # For copy.deepcopy() of bAnalysis
+import hashlib
+import json
 import uuid  # to generate unique key on bAnalysis spike detect
 import pathlib  # ned to use this (introduced in Python 3.4) to maname paths on Windows, stop using os.path
+from multiprocessing import Pool
 
 from typing import List, Union, Optional
 
 import numpy as np
 import pandas as pd
-import requests, io  # too load from the web
+import io
 
 # for old code that was compressing hdf5 files
 # from subprocess import call # to call ptrepack (might fail on windows???)
@@ -23,9 +26,12 @@ import requests, io  # too load from the web
 import sanpy
 import sanpy.h5Util
 
+from sanpy._util import _lazyImport
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+requests = _lazyImport("requests")  # too load from the web
+
 # Turn off pandas save h5 performance warnnig
 # see: https://github.com/pandas-dev/pandas/issues/3622
 # /home/cudmore/Sites/SanPy/sanpy/analysisDir.py:478: PerformanceWarning:
@@ -461,6 +467,238 @@ def stripSantanaTif(fileList : List[str]) -> List[str]:
         
     return retList
 
+def _analyzeFileWorker(
+    path: str,
+    detectionDict: dict,
+    uuid: str = "",
+    metaDataDict: dict = None,
+    fileLoaderDict: dict = None,
+) -> dict:
+    """Load and detect one file, used by analysisDir.analyzeAll().
+
+    Module level so it can run in a multiprocessing Pool. We return the
+    h5 DataFrames of the analysis (not the bAnalysis) so raw data is not
+    sent back to the calling process.
+
+    Returns
+    -------
+    dict
+        Keys are (uuid, N, E, Time(s), Error, hdfFrames, detectionDict).
+    """
+    _start = time.time()
+
+    resultDict = {
+        "uuid": "",
+        "N": 0,
+        "E": 0,
+        "Time(s)": None,
+        "Error": "",
+        "hdfFrames": {},
+        "detectionDict": None,
+    }
+
+    try:
+        ba = sanpy.bAnalysis(path, fileLoaderDict=fileLoaderDict)
+        if ba.loadError:
+            resultDict["Error"] = "Load error"
+        else:
+            if uuid:
+                # replace previous analysis in h5 file
+                ba.uuid = uuid
+            if metaDataDict is not None:
+                ba.metaData.fromDict(metaDataDict, triggerDirty=False)
+
+            ba.spikeDetect(detectionDict)
+
+            resultDict["uuid"] = ba.uuid
+            resultDict["N"] = ba.numSpikes
+            resultDict["E"] = ba.numErrors
+            resultDict["hdfFrames"] = ba._getHdfFrames()
+            resultDict["detectionDict"] = ba.getDetectionDict()
+    except Exception as e:
+        # one bad file should not stop a batch of files
+        logger.error(f'Analysis failed for "{path}" {e}')
+        resultDict["Error"] = str(e)
+
+    resultDict["Time(s)"] = round(time.time() - _start, 3)
+
+    return resultDict
+
+
+def _analyzeAllResults(workerParams: List[tuple], workers: int = 1):
+    """Yield result of _analyzeFileWorker() for each params, in order.
+    """
+    if workers > 1 and len(workerParams) > 1:
+        with Pool(processes=workers) as pool:
+            result_objs = [
+                pool.apply_async(_analyzeFileWorker, params)
+                for params in workerParams
+            ]
+            for result in result_objs:
+                yield result.get()
+    else:
+        for params in workerParams:
+            yield _analyzeFileWorker(*params)
+
+
+def _getFileRow(
+    path: str, folderPath: str, loadData: bool = False, fileLoaderDict: dict = None
+):
+    """Get dict representing one file (row in table). See analysisDir.getFileRow().
+
+    Module level so it can run in a multiprocessing Pool.
+
+    Args:
+        path (Str): Full path to file.
+        folderPath (str): Path to analysisDir folder, used for relPath.
+        loadData (bool): If False, only load file header.
+        fileLoaderDict (dict): If None, bAnalysis will load file loaders.
+
+    Return:
+        (tuple): tuple containing:
+
+        - ba (bAnalysis): [sanpy.bAnalysis](/api/bAnalysis).
+        - rowDict (dict): On success, otherwise None.
+                fails when path does not lead to valid bAnalysis file.
+    """
+    if not os.path.isfile(path):
+        logger.warning(f'Did not find file "{path}"')
+        return None, None
+    fileType = os.path.splitext(path)[1]
+    if fileType not in analysisDir.theseFileTypes:
+        logger.warning(f'Did not load file type "{fileType}"')
+        return None, None
+
+    # load bAnalysis
+    # logger.info(f'Loading bAnalysis "{path}"')
+    # loadData is false, load header
+    ba = sanpy.bAnalysis(path, loadData=loadData, fileLoaderDict=fileLoaderDict)
+
+    if ba.loadError:
+        logger.error(f'Error loading bAnalysis file "{path}"')
+        # return None, None
+
+    # not sufficient to default everything to empty str ''
+    # sanpyColumns can only have type in ('float', 'str')
+    rowDict = dict.fromkeys(_sanpyColumns.keys(), "")
+    for k in rowDict.keys():
+        if _sanpyColumns[k]["type"] == str:
+            rowDict[k] = ""
+        elif _sanpyColumns[k]["type"] == float:
+            rowDict[k] = np.nan
+
+    # if rowIdx is not None:
+    #    rowDict['Idx'] = rowIdx
+
+    """
+    if ba.loadError:
+        rowDict['I'] = 0
+    else:
+        rowDict['I'] = 2 # need 2 because checkbox value is in (0,2)
+    """
+
+    if ba.loadError:
+        return None, None
+    
+    rowDict["File"] = ba.fileLoader.filename  # os.path.split(ba.path)[1]
+    rowDict["Dur(s)"] = ba.fileLoader.recordingDur
+
+    rowDict["Channels"] = ba.fileLoader.numChannels  # Theanne
+
+    rowDict["Sweeps"] = ba.fileLoader.numSweeps
+
+    # TODO: here, we do not get an epoch table until the file is loaded !!!
+    rowDict["Epochs"] = ba.fileLoader.numEpochs  # Theanne, data has to be loaded
+
+    rowDict["kHz"] = ba.fileLoader.recordingFrequency
+    rowDict["Mode"] = ba.fileLoader.recordingMode.value
+
+    # rowDict['dvdtThreshold'] = 20
+    # rowDict['mvThreshold'] = -20
+    if ba.isAnalyzed():
+        dDict = ba.getDetectionDict()
+        # rowDict['I'] = dDict.getValue('include')
+        rowDict["dvdtThreshold"] = dDict.getValue("dvdtThreshold")
+        rowDict["mvThreshold"] = dDict.getValue("mvThreshold")
+        rowDict["Start(s)"] = dDict.getValue("startSeconds")
+        rowDict["Stop(s)"] = dDict.getValue("stopSeconds")
+
+    # add parent1, parent2, parent3
+    _path, _file = os.path.split(path)
+    _path, _parent1 = os.path.split(_path)
+    _path, _parent2 = os.path.split(_path)
+    _path, _parent3 = os.path.split(_path)
+    rowDict['parent1'] = _parent1
+    rowDict['parent2'] = _parent2
+    rowDict['parent3'] = _parent3
+    
+    # aug 2023,  adding bAnalysis metadata columns
+    for k,v in ba.metaData.items():
+        rowDict[k] = v
+
+    rowDict["relPath"] = _getRelPath(path, folderPath)
+
+    return ba, rowDict
+
+
+def _getRelPath(path: str, folderPath: str) -> str:
+    """Get path relative to analysisDir folder path.
+    """
+    # remove the path to the folder we have loaded
+    relPath = path.replace(folderPath, "")
+    
+    # logger.info(f'xxx folderPath: "{folderPath}"')
+    # logger.info(f'xxx path: "{path}"')
+    # logger.info(f'xxx relPath: "{relPath}"')
+    
+    if relPath.startswith("/"):
+        # so we can use os.path.join()
+        relPath = relPath[1:]
+    # added 20230505 working with johnson in 1313 to fix windows bug ???
+    if relPath.startswith("\\"):
+        # so we can use os.path.join()
+        relPath = relPath[1:]
+
+    #logger.info(f'2) xxx relPath: "{relPath}"')
+
+    return relPath
+
+
+def _getFileStat(path: str) -> tuple:
+    """Get (size, mtime) of a file, used to invalidate the header index.
+    """
+    fileStat = os.stat(path)
+    return fileStat.st_size, fileStat.st_mtime
+
+
+_poolMinFiles = 50
+"""Minimum number of files to read headers in a multiprocessing Pool."""
+
+_headerIndexFolder = None
+"""Folder of header index files, if None then the user cache folder."""
+
+_workerFileLoaderDict = None
+"""File loaders for _getFileRowWorker(), set in each worker process by _initFileRowWorker()."""
+
+
+def _initFileRowWorker():
+    """Pool initializer, load file loaders once per worker process.
+    """
+    global _workerFileLoaderDict
+    _workerFileLoaderDict = sanpy.fileloaders.getFileLoaders()
+
+
+def _getFileRowWorker(path: str, folderPath: str) -> dict:
+    """Get header row of one file in a worker process.
+
+    Only returns the rowDict, the bAnalysis stays in the worker.
+    """
+    _ba, rowDict = _getFileRow(
+        path, folderPath, loadData=False, fileLoaderDict=_workerFileLoaderDict
+    )
+    return rowDict
+
+
 class analysisDir:
     """
     Class to manage a list of files loaded from a folder.
@@ -474,6 +712,11 @@ class analysisDir:
     """File types to load.
     """
 
+    repackFraction = 0.3
+    """Default of saveHdf(repackFraction), repack h5 file on save when more than
+    this fraction of the file is wasted space.
+    """
+
     def __init__(
         self,
         path: str = None,
@@ -518,10 +761,19 @@ class analysisDir:
         # name of database file created/loaded from folder path
         self.dbFile = "sanpy_recording_db.csv"
 
+        # file headers keyed by relPath, used to not re-read unchanged files
+        # saved in the user cache folder, see _getHeaderIndexFile()
+
         self._df = None
+
+        # file table as last loaded/saved in h5 file, to only save when changed
+        self._savedTableDf = None
+
         # if autoLoad:
         if 1:
             self._df = self.loadHdf()
+            if self._df is not None:
+                self._savedTableDf = self._df.drop("_ba", axis=1)
             if self._df is None:
                 self._df = self.loadFolder(loadData=autoLoad)  # only used if no h5 file
                 self._updateLoadedAnalyzed()
@@ -815,15 +1067,31 @@ class analysisDir:
 
         return fullFilePath
 
-    def saveHdf(self):
+    def saveHdf(
+        self, repack: Optional[bool] = None, repackFraction: Optional[float] = None
+    ):
         """Save file table and any number of loaded and analyzed bAnalysis.
 
         Set file table 'uuid' column when we actually save a bAnalysis
 
+        Only dirty bAnalysis are saved and the file table is only saved when it changed.
+
         Important: Order matters
                 (1) Save bAnalysis first, it updates uuid in file table.
                 (2) Save file table with updated uuid
+
+        Args:
+            repack (bool): If True then always repack the h5 file, if False then never.
+                If None then repack when wasted space is more than repackFraction.
+            repackFraction (float): Fraction of the h5 file (0 to 1) that is wasted
+                space by overwritten and removed keys, see h5Util.getWastedFraction().
+                Only used when repack is None. If None then use self.repackFraction.
         """
+        if repackFraction is None:
+            repackFraction = self.repackFraction
+        if not 0 <= repackFraction <= 1:
+            raise ValueError(f"repackFraction must be between 0 and 1, got {repackFraction}")
+
         start = time.time()
 
         df = self.getDataFrame()
@@ -856,14 +1124,23 @@ class analysisDir:
         df = df.drop("_ba", axis=1)  # don't ever save _ba, use it for runtime
 
         # hdfStore[dbKey] = df  # save it
-        df.to_hdf(hdfFilePath, dbKey)
+        if self._savedTableDf is not None and df.equals(self._savedTableDf):
+            logger.info("    file db did not change, not saving")
+        else:
+            df.to_hdf(hdfFilePath, key=dbKey)
+            self._savedTableDf = df
 
         #
         self._isDirty = False  # if true, prompt to save on quit
 
         # rebuild the file to remove old changes and reduce size
         # self._rebuildHdf()
-        sanpy.h5Util._repackHdf(hdfFilePath)
+        if repack is None:
+            wastedFraction = sanpy.h5Util.getWastedFraction(hdfFilePath)
+            repack = wastedFraction > repackFraction
+            logger.info(f"    wasted fraction {round(wastedFraction,3)} repack:{repack}")
+        if repack:
+            sanpy.h5Util._repackHdf(hdfFilePath)
 
         # list the keys in the file
         # sanpy.h5Util.listKeys(hdfFilePath)
@@ -871,6 +1148,140 @@ class analysisDir:
         stop = time.time()
         logger.info(f"Saving took {round(stop-start,2)} seconds")
 
+    def analyzeAll(self, detectionPreset, workers: int = 1) -> pd.DataFrame:
+        """Load, detect and save all files in the table.
+
+        Files are analyzed in worker processes and each result is written
+        into the folder h5 file as it arrives. The file table is saved
+        and the h5 file repacked once at the end.
+
+        Loaded files are unloaded, the next getAnalysis() loads the new analysis.
+        Loaded files with unsaved changes (see analysisIsDirty) are not analyzed,
+        save them first. They are reported in the returned Error column.
+
+        Parameters
+        ----------
+        detectionPreset : str or dict
+            Name of a detection preset (like 'SA Node') or a detection dict,
+                see sanpy.bDetection.
+        workers : int
+            Number of worker processes, if None then use all cores.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per file with columns (File, relPath, N, E, Time(s), Error).
+        """
+        _start = time.time()
+
+        if isinstance(detectionPreset, str):
+            detectionDict = sanpy.bDetection().getDetectionDict(detectionPreset)
+        else:
+            detectionDict = detectionPreset
+        # getDetectionDict() is not a copy
+        detectionDict = copy.deepcopy(detectionDict)
+
+        if workers is None:
+            workers = os.cpu_count()
+
+        _fileLoaderDict = self._getFileLoaderDict()
+
+        df = self._df
+        numFiles = len(df)
+
+        metaDataKeys = [
+            k for k in sanpy.MetaData.getMetaDataDict().keys() if k in df.columns
+        ]
+
+        # do not drop unsaved changes of loaded files
+        dirtyRows = [
+            rowIdx for rowIdx in range(numFiles) if self.analysisIsDirty(rowIdx)
+        ]
+        if len(dirtyRows) > 0:
+            dirtyFiles = [df.at[rowIdx, "File"] for rowIdx in dirtyRows]
+            logger.warning(
+                f"Not analyzing {len(dirtyRows)} file(s) with unsaved changes: {dirtyFiles}"
+            )
+        analyzeRows = [rowIdx for rowIdx in range(numFiles) if rowIdx not in dirtyRows]
+
+        workerParams = []
+        for rowIdx in analyzeRows:
+            relPath = df.at[rowIdx, "relPath"]
+            path = self.getPathFromRelPath(relPath)
+            uuid = df.at[rowIdx, "uuid"]
+            metaDataDict = {k: df.at[rowIdx, k] for k in metaDataKeys}
+            workerParams.append(
+                (path, detectionDict, uuid, metaDataDict, _fileLoaderDict)
+            )
+
+        self.signalApp(f"Analyzing {numFiles} files with {workers} workers")
+
+        summaryDict = {}  # keys are rowIdx
+        for rowIdx in dirtyRows:
+            summaryDict[rowIdx] = {
+                "File": df.at[rowIdx, "File"],
+                "relPath": df.at[rowIdx, "relPath"],
+                "N": df.at[rowIdx, "N"],
+                "E": df.at[rowIdx, "E"],
+                "Time(s)": 0,
+                "Error": "Not analyzed, has unsaved changes",
+            }
+
+        hdfPath = self._getHdfFile()
+        with pd.HDFStore(hdfPath) as hdfStore:
+            for analyzeIdx, resultDict in enumerate(
+                _analyzeAllResults(workerParams, workers)
+            ):
+                rowIdx = analyzeRows[analyzeIdx]
+                file = df.at[rowIdx, "File"]
+
+                if not resultDict["Error"]:
+                    hdfFrames = resultDict["hdfFrames"]
+                    for key, oneDf in hdfFrames.items():
+                        oneDf.to_hdf(hdfStore, key=key)
+
+                    # remove stale spikes when we now have none
+                    uuid = resultDict["uuid"]
+                    analysisListKey = uuid + "/" + "analysisList"
+                    if analysisListKey not in hdfFrames and analysisListKey in hdfStore:
+                        hdfStore.remove(analysisListKey)
+
+                    _detectionDict = resultDict["detectionDict"]
+                    df.at[rowIdx, "_ba"] = None
+                    df.at[rowIdx, "uuid"] = uuid
+                    df.at[rowIdx, "N"] = resultDict["N"]
+                    df.at[rowIdx, "E"] = resultDict["E"]
+                    df.at[rowIdx, "Start(s)"] = _detectionDict["startSeconds"]
+                    df.at[rowIdx, "Stop(s)"] = _detectionDict["stopSeconds"]
+                    df.at[rowIdx, "dvdtThreshold"] = _detectionDict["dvdtThreshold"]
+                    df.at[rowIdx, "mvThreshold"] = _detectionDict["mvThreshold"]
+
+                summaryDict[rowIdx] = {
+                    "File": file,
+                    "relPath": df.at[rowIdx, "relPath"],
+                    "N": resultDict["N"],
+                    "E": resultDict["E"],
+                    "Time(s)": resultDict["Time(s)"],
+                    "Error": resultDict["Error"],
+                }
+
+                self.signalApp(
+                    f'Analyzed {analyzeIdx+1} of {len(analyzeRows)} "{file}"'
+                )
+
+        # save file table, repack if needed
+        self.saveHdf()
+
+        dfSummary = pd.DataFrame([summaryDict[rowIdx] for rowIdx in sorted(summaryDict)])
+
+        numErrors = (dfSummary["Error"] != "").sum() if numFiles > 0 else 0
+        _stop = time.time()
+        self.signalApp(
+            f"Analyzed {numFiles} files in {round(_stop-_start,2)} seconds with {numErrors} failed"
+        )
+
+        return dfSummary
+
     def loadHdf(self, path=None, verbose=False):
         """Load the database key from an h5 file.
 
@@ -985,10 +1396,12 @@ class analysisDir:
             self._updateLoadedAnalyzed()
             self._isDirty = True  # if true, prompt to save on quit
 
-    def loadFolder(self, path=None, loadData=False):
+    def loadFolder(self, path=None, loadData=False, workers: int = None):
         """
         Parse a folder and load all (abf, csv, ...). Only called if no h5 file.
 
+        If loadData is False, file headers are read in parallel (see _iterFileRows).
+
         TODO: get rid of loading database from .csv (it is replaced by .h5 file)
         TODO: extend the logic to load from cloud (after we were instantiated)
         """
@@ -1042,15 +1455,12 @@ class analysisDir:
             start = time.time()
             # build new db dataframe
             listOfDict = []
-            for rowIdx, fullFilePath in enumerate(fileList):
-                self.signalApp(
-                    f'Loading file {rowIdx+1} of {_numFilesToLoad} "{fullFilePath}"'
-                )
-
-                # rowDict is what we are showing in the file table
-                # abb debug vue, set loadData=True
-                # loads bAnalysis
-                ba, rowDict = self.getFileRow(fullFilePath, loadData=loadData)
+            # rowDict is what we are showing in the file table
+            # abb debug vue, set loadData=True
+            # loads bAnalysis
+            _fileRows = self._iterFileRows(fileList, loadData=loadData, workers=workers)
+            for rowIdx, (ba, rowDict) in enumerate(_fileRows):
+                fullFilePath = fileList[rowIdx]
 
                 if rowDict is None:
                     logger.warning(f'error loading file {fullFilePath}')
@@ -1383,7 +1793,7 @@ class analysisDir:
 
         Args:
             path (Str): Full path to file.
-            #rowIdx (int): Optional row index to assign in column 'Idx'
+            loadData (bool): If False, only load file header.
 
         Return:
             (tuple): tuple containing:
@@ -1392,14 +1802,6 @@ class analysisDir:
             - rowDict (dict): On success, otherwise None.
                     fails when path does not lead to valid bAnalysis file.
         """
-        if not os.path.isfile(path):
-            logger.warning(f'Did not find file "{path}"')
-            return None, None
-        fileType = os.path.splitext(path)[1]
-        if fileType not in self.theseFileTypes:
-            logger.warning(f'Did not load file type "{fileType}"')
-            return None, None
-
         # grab the fileLoaderDict from our app
         # if it is None then bAnalysis will load this (from disk)
         if self.myApp is not None:
@@ -1407,95 +1809,177 @@ class analysisDir:
         else:
             _fileLoaderDict = None
 
-        # load bAnalysis
-        # logger.info(f'Loading bAnalysis "{path}"')
-        # loadData is false, load header
-        ba = sanpy.bAnalysis(path, loadData=loadData, fileLoaderDict=_fileLoaderDict)
+        return _getFileRow(
+            path, self.path, loadData=loadData, fileLoaderDict=_fileLoaderDict
+        )
 
-        if ba.loadError:
-            logger.error(f'Error loading bAnalysis file "{path}"')
-            # return None, None
+    def _iterFileRows(self, fileList: List[str], loadData=False, workers: int = None):
+        """Yield (ba, rowDict) from getFileRow() for each file, in order.
+
+        When only loading headers (loadData is False), ba is None. The rowDict
+        comes from the header index if the file size and modification time
+        did not change. Other headers are read, in a multiprocessing Pool when
+        there are enough files, and saved into the header index.
+
+        Args:
+            fileList (List[str]): Full path to files.
+            loadData (bool): If False, only load file header.
+            workers (int): Number of worker processes, if None then use all cores.
+        """
+        numFiles = len(fileList)
+
+        if loadData:
+            _fileLoaderDict = self._getFileLoaderDict()
+            for rowIdx, path in enumerate(fileList):
+                self.signalApp(f'Loading file {rowIdx+1} of {numFiles} "{path}"')
+                yield _getFileRow(
+                    path, self.path, loadData=True, fileLoaderDict=_fileLoaderDict
+                )
+            return
+
+        headerIndex = self._loadHeaderIndex()
+
+        rowDictList = [None] * numFiles
+        fileStatList = [None] * numFiles
+        readRowList = []  # rows that are not in the index or changed
+        for rowIdx, path in enumerate(fileList):
+            relPath = _getRelPath(path, self.path)
+            fileStat = _getFileStat(path)
+            fileStatList[rowIdx] = fileStat
+            indexDict = headerIndex.get(relPath)
+            if (
+                indexDict is not None
+                and (indexDict["size"], indexDict["mtime"]) == fileStat
+                and indexDict.keys() >= _sanpyColumns.keys()
+            ):
+                rowDict = {
+                    k: v for k, v in indexDict.items() if k not in ("size", "mtime")
+                }
+                rowDictList[rowIdx] = rowDict
+            else:
+                readRowList.append(rowIdx)
+
+        if len(readRowList) > 0:
+            logger.info(
+                f"Reading {len(readRowList)} of {numFiles} file headers, others are in header index"
+            )
+
+            readFileList = [fileList[rowIdx] for rowIdx in readRowList]
+            for readIdx, rowDict in enumerate(
+                self._readFileHeaders(readFileList, workers=workers)
+            ):
+                rowIdx = readRowList[readIdx]
+                rowDictList[rowIdx] = rowDict
+                if rowDict is not None:
+                    size, mtime = fileStatList[rowIdx]
+                    indexDict = dict(rowDict, size=size, mtime=mtime)
+                    headerIndex[rowDict["relPath"]] = indexDict
 
-        # not sufficient to default everything to empty str ''
-        # sanpyColumns can only have type in ('float', 'str')
-        rowDict = dict.fromkeys(self.sanpyColumns.keys(), "")
-        for k in rowDict.keys():
-            if self.sanpyColumns[k]["type"] == str:
-                rowDict[k] = ""
-            elif self.sanpyColumns[k]["type"] == float:
-                rowDict[k] = np.nan
+            self._saveHeaderIndex(headerIndex)
 
-        # if rowIdx is not None:
-        #    rowDict['Idx'] = rowIdx
+        for rowDict in rowDictList:
+            yield None, rowDict
 
+    def _readFileHeaders(self, fileList: List[str], workers: int = None):
+        """Yield rowDict with the header of each file, in order.
+
+        Use a multiprocessing Pool if there are at least _poolMinFiles.
         """
-        if ba.loadError:
-            rowDict['I'] = 0
+        if workers is None:
+            workers = os.cpu_count()
+
+        numFiles = len(fileList)
+        usePool = workers > 1 and numFiles >= _poolMinFiles
+        if usePool:
+            with Pool(processes=workers, initializer=_initFileRowWorker) as pool:
+                result_objs = [
+                    pool.apply_async(_getFileRowWorker, (path, self.path))
+                    for path in fileList
+                ]
+                for rowIdx, result in enumerate(result_objs):
+                    rowDict = result.get()
+                    self.signalApp(
+                        f'Loaded file {rowIdx+1} of {numFiles} "{fileList[rowIdx]}"'
+                    )
+                    yield rowDict
         else:
-            rowDict['I'] = 2 # need 2 because checkbox value is in (0,2)
-        """
+            _fileLoaderDict = self._getFileLoaderDict()
+            for rowIdx, path in enumerate(fileList):
+                self.signalApp(f'Loading file {rowIdx+1} of {numFiles} "{path}"')
+                _ba, rowDict = _getFileRow(
+                    path, self.path, loadData=False, fileLoaderDict=_fileLoaderDict
+                )
+                yield rowDict
 
-        if ba.loadError:
-            return None, None
-        
-        rowDict["File"] = ba.fileLoader.filename  # os.path.split(ba.path)[1]
-        rowDict["Dur(s)"] = ba.fileLoader.recordingDur
-
-        rowDict["Channels"] = ba.fileLoader.numChannels  # Theanne
-
-        rowDict["Sweeps"] = ba.fileLoader.numSweeps
-
-        # TODO: here, we do not get an epoch table until the file is loaded !!!
-        rowDict["Epochs"] = ba.fileLoader.numEpochs  # Theanne, data has to be loaded
-
-        rowDict["kHz"] = ba.fileLoader.recordingFrequency
-        rowDict["Mode"] = ba.fileLoader.recordingMode.value
-
-        # rowDict['dvdtThreshold'] = 20
-        # rowDict['mvThreshold'] = -20
-        if ba.isAnalyzed():
-            dDict = ba.getDetectionDict()
-            # rowDict['I'] = dDict.getValue('include')
-            rowDict["dvdtThreshold"] = dDict.getValue("dvdtThreshold")
-            rowDict["mvThreshold"] = dDict.getValue("mvThreshold")
-            rowDict["Start(s)"] = dDict.getValue("startSeconds")
-            rowDict["Stop(s)"] = dDict.getValue("stopSeconds")
-
-        # add parent1, parent2, parent3
-        _path, _file = os.path.split(path)
-        _path, _parent1 = os.path.split(_path)
-        _path, _parent2 = os.path.split(_path)
-        _path, _parent3 = os.path.split(_path)
-        rowDict['parent1'] = _parent1
-        rowDict['parent2'] = _parent2
-        rowDict['parent3'] = _parent3
-        
-        # aug 2023,  adding bAnalysis metadata columns
-        for k,v in ba.metaData.items():
-            rowDict[k] = v
+    def _getFileLoaderDict(self) -> dict:
+        """Get file loaders from our app, otherwise load them once.
+        """
+        if self.myApp is not None:
+            return self.myApp.getFileLoaderDict()
+        else:
+            return sanpy.fileloaders.getFileLoaders()
 
-        # remove the path to the folder we have loaded
-        relPath = path.replace(self.path, "")
-        
-        # logger.info(f'xxx self.path: "{self.path}"')
-        # logger.info(f'xxx path: "{path}"')
-        # logger.info(f'xxx relPath: "{relPath}"')
-        
-        if relPath.startswith("/"):
-            # so we can use os.path.join()
-            relPath = relPath[1:]
-        # added 20230505 working with johnson in 1313 to fix windows bug ???
-        if relPath.startswith("\\"):
-            # so we can use os.path.join()
-            relPath = relPath[1:]
+    def _getHeaderIndexFile(self) -> str:
+        """Get the header index file of this folder.
 
-        rowDict["relPath"] = relPath
+        It is in the user cache folder so loading a folder never writes into it.
+        """
+        headerIndexFolder = _headerIndexFolder
+        if headerIndexFolder is None:
+            headerIndexFolder = sanpy._util._getUserCacheFolder()
+        folderPath = os.path.abspath(self.path)
+        folderHash = hashlib.sha1(folderPath.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(headerIndexFolder, f"header_index_{folderHash}.json")
+
+    def _loadHeaderIndex(self) -> dict:
+        """Load header index, keys are relPath and values are rowDict with (size, mtime).
+        """
+        headerIndexPath = self._getHeaderIndexFile()
+        if not os.path.isfile(headerIndexPath):
+            return {}
 
-        #logger.info(f'2) xxx relPath: "{relPath}"')
-        logger.info('qqq')
-        print(rowDict)
+        try:
+            with open(headerIndexPath, "r") as f:
+                headerIndexDict = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Did not load header index "{headerIndexPath}" {e}')
+            return {}
+
+        # a folder moved to the same path is a different folder
+        if headerIndexDict.get("folderPath") != os.path.abspath(self.path):
+            return {}
+
+        headerIndex = {}
+        for indexDict in headerIndexDict["headerIndex"]:
+            headerIndex[indexDict["relPath"]] = indexDict
+        return headerIndex
+
+    def _saveHeaderIndex(self, headerIndex: dict):
+        """Save header index, removing files that no longer exist.
+
+        Saved as json so values (str, int, float and None) load back
+        exactly as they were in rowDict.
+        """
+        indexList = [
+            indexDict
+            for relPath, indexDict in headerIndex.items()
+            if os.path.isfile(self.getPathFromRelPath(relPath))
+        ]
+        headerIndexDict = {
+            "folderPath": os.path.abspath(self.path),
+            "headerIndex": indexList,
+        }
 
-        return ba, rowDict
+        headerIndexPath = self._getHeaderIndexFile()
+        tmpHeaderIndexPath = headerIndexPath + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(headerIndexPath), exist_ok=True)
+            with open(tmpHeaderIndexPath, "w") as f:
+                json.dump(headerIndexDict, f)
+            os.replace(tmpHeaderIndexPath, headerIndexPath)
+        except (OSError, TypeError, ValueError) as e:
+            # header index is only a cache
+            logger.warning(f'Did not save header index "{headerIndexPath}" {e}')
 
     def getFileList(self, path: str = None, santanaTif=False) -> List[str]:
         """Get file paths from path.
@@ -1697,23 +2181,25 @@ class analysisDir:
         addedToDf = False
 
         # look for files in path not in df
+        newFileList = []
         for pathFile in pathFileList:
             fileName = os.path.split(pathFile)[1]
             if fileName not in dfFileList:
                 logger.info(f'Found file in path "{fileName}" not in df')
-                # load bAnalysis and get df column values
-                addedToDf = True
-                # fullPathFile = os.path.join(self.path, pathFile)
-                ba, rowDict = self.getFileRow(pathFile)  # loads bAnalysis
-                if rowDict is not None:
-                    # listOfDict.append(rowDict)
+                newFileList.append(pathFile)
+
+        # load bAnalysis headers and get df column values
+        for ba, rowDict in self._iterFileRows(newFileList):
+            addedToDf = True
+            if rowDict is not None:
+                # listOfDict.append(rowDict)
 
-                    # TODO: get this into getFileROw()
-                    logger.warning("bug 20220718, not sure we need this ???")
-                    # rowDict['relPath'] = pathFile
-                    rowDict["_ba"] = None
+                # TODO: get this into getFileROw()
+                logger.warning("bug 20220718, not sure we need this ???")
+                # rowDict['relPath'] = pathFile
+                rowDict["_ba"] = None
 
-                    self.appendRow(rowDict=rowDict, ba=None)
+                self.appendRow(rowDict=rowDict, ba=None)
 
         # look for files in df not in path
         # for dfFile in dfFileList:
@@ -2,16 +2,19 @@ import sys
 from typing import Union, Dict, List, Tuple, Optional
 
 import numpy as np
-import scipy.signal
-import seaborn as sns
-import matplotlib.pyplot as plt
+import scipy  # submodules like scipy.signal are loaded on first use
 
 import sanpy
+from sanpy._util import _lazyImport
 
 from sanpy.sanpyLogger import get_logger
 
 logger = get_logger(__name__)
 
+# seaborn and pyplot are slow to import, only load them when we plot
+sns = _lazyImport("seaborn")
+plt = _lazyImport("matplotlib.pyplot")
+
 
 def old_getEddLines(ba):
     """Get lines representing linear fit of EDD rate.
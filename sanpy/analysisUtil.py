@@ -22,34 +22,416 @@ def throwOutAboveBelow(
         spikeTimes (list): list of spike times
         spikeErrors (list): list of error
     """
-    newSpikeTimes = []
-    newSpikeErrorList = []
-    newSpikePeakPnt = []
-    newSpikePeakVal = []
-    for i, spikeTime in enumerate(spikeTimes):
-        peakPnt = np.argmax(vm[spikeTime : spikeTime + peakWindow_pnts])
-        peakPnt += spikeTime
-        peakVal = np.max(vm[spikeTime : spikeTime + peakWindow_pnts])
-
-        goodSpikeAbove = True
-        if onlyPeaksAbove_mV is not None and (peakVal < onlyPeaksAbove_mV):
-            goodSpikeAbove = False
-        goodSpikeBelow = True
-        if onlyPeaksBelow_mV is not None and (peakVal > onlyPeaksBelow_mV):
-            goodSpikeBelow = False
-
-        if goodSpikeAbove and goodSpikeBelow:
-            newSpikeTimes.append(spikeTime)
-            newSpikeErrorList.append(spikeErrors[i])
-            newSpikePeakPnt.append(peakPnt)
-            newSpikePeakVal.append(peakVal)
-        else:
-            # print('spikeDetect() peak height: rejecting spike', i, 'at pnt:', spikeTime, "dDict['onlyPeaksAbove_mV']:", dDict['onlyPeaksAbove_mV'])
-            pass
+    spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+    peakPnts, peakVals = windowPeaks(vm, spikeTimes, peakWindow_pnts)
+
+    goodMask = peakPnts >= 0
+    if onlyPeaksAbove_mV is not None:
+        goodMask &= ~(peakVals < onlyPeaksAbove_mV)
+    if onlyPeaksBelow_mV is not None:
+        goodMask &= ~(peakVals > onlyPeaksBelow_mV)
+
+    goodIdx = np.nonzero(goodMask)[0]
+    newSpikeTimes = list(spikeTimes[goodIdx])
+    newSpikeErrorList = [spikeErrors[i] for i in goodIdx]
+    newSpikePeakPnt = list(peakPnts[goodIdx])
+    newSpikePeakVal = list(peakVals[goodIdx])
     #
     return newSpikeTimes, newSpikeErrorList, newSpikePeakPnt, newSpikePeakVal
 
 
+# maximum number of elements in one (windows x points) matrix,
+# larger numbers of windows are processed in chunks to bound memory
+_maxWindowElements = 2**22
+
+
+def _windowChunks(numWindows: int, width: int):
+    """Yield slices over windows so each (windows x width) matrix is bounded."""
+    chunkSize = max(1, _maxWindowElements // max(width, 1))
+    for start in range(0, numWindows, chunkSize):
+        yield slice(start, min(start + chunkSize, numWindows))
+
+
+def _windowMatrix(y, startPnts, stopPnts, width, fill):
+    """Get a (windows x width) matrix of y[start:stop] for each window.
+
+    Points past the stop of each window are set to fill.
+
+    Returns
+    -------
+    values : np.ndarray
+        (windows x width) matrix
+    valid : np.ndarray
+        (windows x width) boolean mask, False where values is padding
+    """
+    idx = startPnts[:, None] + np.arange(width)
+    valid = idx < stopPnts[:, None]
+    values = np.where(valid, y[np.where(valid, idx, 0)], fill)
+    return values, valid
+
+
+def _windowSetup(y, startPnts, stopPnts):
+    """Clip windows to y and find the non-empty ones.
+
+    Returns
+    -------
+    startPnts, stopPnts : np.ndarray of int
+    good : np.ndarray of int
+        Index of non-empty windows
+    width : int
+        Length of the longest window
+    """
+    startPnts = np.asarray(startPnts, dtype=np.int64)
+    stopPnts = np.minimum(np.asarray(stopPnts, dtype=np.int64), len(y))
+    lengths = stopPnts - startPnts
+    good = np.nonzero(lengths > 0)[0]
+    width = int(lengths[good].max()) if len(good) > 0 else 0
+    return startPnts, stopPnts, good, width
+
+
+def windowArgMin(y, startPnts, stopPnts):
+    """Get the point of the minimum of y in many windows.
+
+    Each window is like slicing y[startPnt:stopPnt], the first minimum is returned.
+
+    Args:
+        y (np.ndarray): 1D array
+        startPnts (np.ndarray): start point of each window, must be >= 0
+        stopPnts (np.ndarray): stop point of each window
+
+    Returns:
+        np.ndarray: The point in y of each minimum, -1 if window is empty
+    """
+    return _windowArgExtreme(y, startPnts, stopPnts, np.argmin, np.inf)
+
+
+def windowArgMax(y, startPnts, stopPnts):
+    """Get the point of the maximum of y in many windows.
+
+    See windowArgMin()
+    """
+    return _windowArgExtreme(y, startPnts, stopPnts, np.argmax, -np.inf)
+
+
+def _windowArgExtreme(y, startPnts, stopPnts, argFunc, fill):
+    startPnts, stopPnts, good, width = _windowSetup(y, startPnts, stopPnts)
+    thePnts = np.full(len(startPnts), -1, dtype=np.int64)
+    for chunk in _windowChunks(len(good), width):
+        rows = good[chunk]
+        values, _ = _windowMatrix(y, startPnts[rows], stopPnts[rows], width, fill)
+        thePnts[rows] = startPnts[rows] + argFunc(values, axis=1)
+    return thePnts
+
+
+def windowLastBelow(y, startPnts, stopPnts, thresholds):
+    """Get the last point in many windows where y is below a threshold.
+
+    Each window is like slicing y[startPnt:stopPnt].
+
+    Args:
+        y (np.ndarray): 1D array
+        startPnts (np.ndarray): start point of each window, must be >= 0
+        stopPnts (np.ndarray): stop point of each window
+        thresholds (np.ndarray): one threshold per window
+
+    Returns:
+        np.ndarray: The last point in y with y < threshold, -1 if none found
+    """
+    startPnts, stopPnts, good, width = _windowSetup(y, startPnts, stopPnts)
+    thresholds = np.asarray(thresholds)
+    thePnts = np.full(len(startPnts), -1, dtype=np.int64)
+    for chunk in _windowChunks(len(good), width):
+        rows = good[chunk]
+        values, valid = _windowMatrix(
+            y, startPnts[rows], stopPnts[rows], width, np.nan
+        )
+        below = (values < thresholds[rows, None]) & valid
+        found = np.any(below, axis=1)
+        lastIdx = width - 1 - np.argmax(below[:, ::-1], axis=1)
+        thePnts[rows[found]] = startPnts[rows[found]] + lastIdx[found]
+    return thePnts
+
+
+def windowFirstBelow(y, startPnts, stopPnts, thresholds):
+    """Get the first point in many windows where y is below a threshold.
+
+    See windowLastBelow()
+
+    Returns:
+        np.ndarray: The first point in y with y < threshold, -1 if none found
+    """
+    return _windowFirst(y, startPnts, stopPnts, thresholds, np.less)
+
+
+def windowFirstAbove(y, startPnts, stopPnts, thresholds):
+    """Get the first point in many windows where y is above a threshold.
+
+    See windowLastBelow()
+
+    Returns:
+        np.ndarray: The first point in y with y > threshold, -1 if none found
+    """
+    return _windowFirst(y, startPnts, stopPnts, thresholds, np.greater)
+
+
+def _windowFirst(y, startPnts, stopPnts, thresholds, compare):
+    startPnts, stopPnts, good, width = _windowSetup(y, startPnts, stopPnts)
+    thresholds = np.asarray(thresholds)
+    thePnts = np.full(len(startPnts), -1, dtype=np.int64)
+    for chunk in _windowChunks(len(good), width):
+        rows = good[chunk]
+        values, valid = _windowMatrix(
+            y, startPnts[rows], stopPnts[rows], width, np.nan
+        )
+        hit = compare(values, thresholds[rows, None]) & valid
+        found = np.any(hit, axis=1)
+        firstIdx = np.argmax(hit, axis=1)
+        thePnts[rows[found]] = startPnts[rows[found]] + firstIdx[found]
+    return thePnts
+
+
+def windowMean(y, startPnts, width):
+    """Get the mean of y in many windows of the same width.
+
+    Each window is like y[startPnt:startPnt+width] and must be within y.
+
+    Args:
+        y (np.ndarray): 1D array
+        startPnts (np.ndarray): start point of each window
+        width (int): number of points in each window
+
+    Returns:
+        np.ndarray: The mean of each window
+    """
+    startPnts = np.asarray(startPnts, dtype=np.int64)
+    theMeans = np.empty(len(startPnts), dtype=np.mean(y[0:1]).dtype)
+    for chunk in _windowChunks(len(startPnts), width):
+        idx = startPnts[chunk, None] + np.arange(width)
+        theMeans[chunk] = np.mean(y[idx], axis=1)
+    return theMeans
+
+
+def windowLinearFit(x, y, startPnts, stopPnts):
+    """Get a least-squares linear fit of y versus x in many windows.
+
+    Each window is like 'm, b = np.polyfit(x[startPnt:stopPnt], y[startPnt:stopPnt], 1)'.
+    All windows are fit at once in closed form. Windows of different length are
+    concatenated and summed per window, so each fit does not depend on the other windows.
+
+    Args:
+        x (np.ndarray): 1D array
+        y (np.ndarray): 1D array, same length as x
+        startPnts (np.ndarray): start point of each window, must be >= 0
+        stopPnts (np.ndarray): stop point of each window
+
+    Returns:
+        slopes (np.ndarray): m of each fit, nan if the fit is poorly conditioned
+        intercepts (np.ndarray): b of each fit, nan if the fit is poorly conditioned
+        numPnts (np.ndarray): Number of points in each window
+    """
+    startPnts, stopPnts, good, _ = _windowSetup(y, startPnts, stopPnts)
+    numPnts = np.maximum(stopPnts - startPnts, 0)
+    slopes = np.full(len(startPnts), np.nan)
+    intercepts = np.full(len(startPnts), np.nan)
+    for rows in _raggedChunks(good, numPnts[good]):
+        n = numPnts[rows]
+        # first element of each window in the concatenated windows
+        segStarts = np.concatenate(([0], np.cumsum(n)[:-1]))
+        idx = np.arange(n.sum()) + np.repeat(startPnts[rows] - segStarts, n)
+        xValues = x[idx]
+        yValues = y[idx]
+        xMean = np.add.reduceat(xValues, segStarts) / n
+        yMean = np.add.reduceat(yValues, segStarts) / n
+        dx = xValues - np.repeat(xMean, n)
+        dy = yValues - np.repeat(yMean, n)
+        sxx = np.add.reduceat(dx * dx, segStarts)
+        sxy = np.add.reduceat(dx * dy, segStarts)
+        # one point or all x equal has rank < 2
+        ok = (n > 1) & (sxx > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = np.where(ok, sxy / sxx, np.nan)
+        slopes[rows] = m
+        intercepts[rows] = np.where(ok, yMean - m * xMean, np.nan)
+    return slopes, intercepts, numPnts
+
+
+def _raggedChunks(rows, lengths):
+    """Yield groups of rows so the total length of each group is bounded."""
+    groups = np.cumsum(lengths) // _maxWindowElements
+    splits = np.nonzero(np.diff(groups))[0] + 1
+    for chunk in np.split(rows, splits):
+        if len(chunk) > 0:
+            yield chunk
+
+
+def windowPeaks(y, spikeTimes, windowPnts):
+    """Get the peak of y in a window after each spike.
+
+    Each window is like y[spikeTime:spikeTime+windowPnts].
+
+    Returns:
+        peakPnts (np.ndarray): The point of each peak, -1 if window is empty
+        peakVals (np.ndarray): The value of each peak, nan if window is empty
+    """
+    spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+    if len(spikeTimes) * windowPnts > len(y) and not np.isnan(y).any():
+        # windows cover more points than y, many threshold crossings
+        peakPnts = _slidingArgMax(y, spikeTimes, windowPnts)
+    else:
+        peakPnts = windowArgMax(y, spikeTimes, spikeTimes + windowPnts)
+    found = peakPnts >= 0
+    peakVals = np.where(found, y[np.where(found, peakPnts, 0)], np.nan)
+    return peakPnts, peakVals
+
+
+def _slidingArgMax(y, startPnts, width):
+    """windowArgMax() of windows y[startPnt:startPnt+width] with the same width.
+
+    The max of y is accumulated forward and backward in blocks of width points,
+    each window is the end of one block and the start of the next (van Herk/Gil-Werman).
+    Takes time proportional to len(y), y can not have nan.
+    """
+    numPnts = len(y)
+    startPnts = np.asarray(startPnts, dtype=np.int64)
+    thePnts = np.full(len(startPnts), -1, dtype=np.int64)
+    good = (startPnts >= 0) & (startPnts < numPnts)
+    if width < 1 or not np.any(good):
+        return thePnts
+
+    numBlocks = -(-numPnts // width) + 1
+    blocks = np.full(numBlocks * width, -np.inf)
+    blocks[:numPnts] = y
+    blocks = blocks.reshape(numBlocks, width)
+    pos = np.arange(numBlocks * width).reshape(numBlocks, width)
+
+    # max and first point of max from the start of each block
+    prefixMax = np.maximum.accumulate(blocks, axis=1)
+    newMax = np.ones(blocks.shape, dtype=bool)
+    newMax[:, 1:] = blocks[:, 1:] > prefixMax[:, :-1]
+    prefixArg = np.maximum.accumulate(np.where(newMax, pos, pos[:, :1]), axis=1)
+
+    # max and first point of max to the end of each block
+    reverse = blocks[:, ::-1]
+    suffixMax = np.maximum.accumulate(reverse, axis=1)
+    newMax[:, 1:] = reverse[:, 1:] >= suffixMax[:, :-1]
+    suffixArg = np.minimum.accumulate(
+        np.where(newMax, pos[:, ::-1], pos[:, -1:]), axis=1
+    )
+    suffixMax = suffixMax[:, ::-1].ravel()
+    suffixArg = suffixArg[:, ::-1].ravel()
+    prefixMax = prefixMax.ravel()
+    prefixArg = prefixArg.ravel()
+
+    firstPnts = startPnts[good]
+    lastPnts = firstPnts + width - 1
+    thePnts[good] = np.where(
+        suffixMax[firstPnts] >= prefixMax[lastPnts],
+        suffixArg[firstPnts],
+        prefixArg[lastPnts],
+    )
+    return thePnts
+
+
+def refractoryMask(spikeTimes, refractoryPnts, lastGoodTime=None):
+    """Get the spikes that are not within refractoryPnts of the previous good spike.
+
+    The first spike is always good, spike [i] is bad if it occurs
+    within refractoryPnts of the last good spike.
+
+    Args:
+        spikeTimes (np.ndarray): sorted spike times (pnts)
+        refractoryPnts (float):
+        lastGoodTime (int): good spike before spikeTimes (pnts), None if there is none.
+            Used to continue with the next chunk of a recording.
+
+    Returns:
+        np.ndarray: boolean mask, True for good spikes
+    """
+    spikeTimes = np.asarray(spikeTimes)
+    goodMask = np.zeros(len(spikeTimes), dtype=bool)
+    i = 0
+    if lastGoodTime is not None:
+        i = int(np.searchsorted(spikeTimes, lastGoodTime + refractoryPnts, side="left"))
+    while i < len(spikeTimes):
+        goodMask[i] = True
+        # next good spike is the first one at least refractoryPnts after spike [i]
+        nextGood = np.searchsorted(
+            spikeTimes, spikeTimes[i] + refractoryPnts, side="left"
+        )
+        i = max(i + 1, int(nextGood))
+    return goodMask
+
+
+def throwOutRefractory(spikeTimes, refractoryPnts, spikeErrors=None):
+    """If there are doubles, throw-out the second one.
+
+    See refractoryMask(). Spike times of 0 are also thrown out.
+
+    Args:
+        spikeTimes (np.ndarray): sorted spike times (pnts)
+        refractoryPnts (float):
+        spikeErrors (list): list of errors per spike, can be None
+
+    Returns:
+        spikeTimes (np.ndarray): good spike times
+        spikeErrors (list): errors of good spikes, None if spikeErrors is None
+    """
+    spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+    goodMask = refractoryMask(spikeTimes, refractoryPnts) & (spikeTimes != 0)
+    goodIdx = np.nonzero(goodMask)[0]
+    if spikeErrors is not None:
+        spikeErrors = [spikeErrors[i] for i in goodIdx]
+    return spikeTimes[goodIdx], spikeErrors
+
+
+def risingPhaseMask(y, spikeTimes, prePnts):
+    """Get the spikes that are upward deflections of y.
+
+    A spike is good if the mean of y[spikeTime+1:spikeTime+prePnts+1]
+    is greater than the mean of y[spikeTime-prePnts:spikeTime].
+
+    Returns:
+        np.ndarray: boolean mask, True for good spikes
+    """
+    spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+    goodMask = np.zeros(len(spikeTimes), dtype=bool)
+
+    inside = (spikeTimes >= prePnts) & (spikeTimes + prePnts + 1 <= len(y))
+    preAvg = windowMean(y, spikeTimes[inside] - prePnts, prePnts)
+    postAvg = windowMean(y, spikeTimes[inside] + 1, prePnts)
+    goodMask[inside] = postAvg > preAvg
+
+    # windows cut by the start or end of y
+    for idx in np.nonzero(~inside)[0]:
+        spikeTime = spikeTimes[idx]
+        preAvg = np.average(y[spikeTime - prePnts : spikeTime])
+        postAvg = np.average(y[spikeTime + 1 : spikeTime + prePnts + 1])
+        goodMask[idx] = postAvg > preAvg
+    return goodMask
+
+
+def percentOfMaxPnts(deriv, spikeTimes, windowPnts, percentOfMax):
+    """Backup each spike to where deriv is below a percent of its max.
+
+    The max of deriv is searched in deriv[spikeTime:spikeTime+windowPnts],
+    the last point below percentOfMax of the max is searched
+    in deriv[spikeTime-windowPnts:spikeTime].
+
+    Returns:
+        thresholdPnts (np.ndarray): -1 if not found
+        peakVals (np.ndarray): Max of deriv after each spike, nan if window is empty
+    """
+    spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+    _, peakVals = windowPeaks(deriv, spikeTimes, windowPnts)
+    percentMaxVals = peakVals * percentOfMax
+    startPnts = spikeTimes - windowPnts
+    thresholdPnts = windowLastBelow(
+        deriv, np.maximum(startPnts, 0), spikeTimes, percentMaxVals
+    )
+    thresholdPnts[startPnts < 0] = -1
+    return thresholdPnts, peakVals
+
+
 def getEddLines(ba):
     """Get lines representing linear fit of EDD rate.
 
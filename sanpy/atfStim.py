@@ -20,10 +20,12 @@ See:
 import sys, math
 from math import exp
 import numpy as np
-import scipy.signal
-import matplotlib.pyplot as plt
+import scipy  # submodules like scipy.signal are loaded on first use
 
 import sanpy
+from sanpy._util import _lazyImport
+
+plt = _lazyImport("matplotlib.pyplot")  # only load when we plot
 
 def getAtfHeader():
     ATF_HEADER = """
@@ -3,12 +3,13 @@
 import os, sys
 import numpy as np
 
-import tifffile
-
+from sanpy._util import _lazyImport
 from sanpy.sanpyLogger import get_logger
 
 logger = get_logger(__name__)
 
+tifffile = _lazyImport("tifffile")  # only load when we open a tif
+
 
 class bAbfText:
     """
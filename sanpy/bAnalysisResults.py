@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np  # needed to convert np types to JSON types in save
 import pandas as pd
@@ -491,6 +491,22 @@ for i in [10, 20, 50, 80, 90]:
 # now we have (AP threshold, AP peak), derive stats about each AP
 
 
+def getDetectionDependencies(resultKeys: List[str]) -> List[str]:
+    """Get the bDetection keys that a list of analysis results depend on.
+
+    Uses "depends on detection" in analysisResultDict,
+    like "mdp_ms" or "(onlyPeaksAbove_mV, peakWindow_ms)".
+    """
+    detectionKeys = []
+    for resultKey in resultKeys:
+        dependsOn = analysisResultDict[resultKey]["depends on detection"]
+        for detectionKey in dependsOn.strip("()").split(","):
+            detectionKey = detectionKey.strip()
+            if detectionKey and detectionKey not in detectionKeys:
+                detectionKeys.append(detectionKey)
+    return detectionKeys
+
+
 def printDocs():
     """
     Print out human readable detection parameters and convert to markdown table.
@@ -556,53 +572,462 @@ class NumpyEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
+def _valueKind(value) -> Optional[str]:
+    """Get the storage kind of one analysis result value.
+
+    Returns
+    -------
+    str or None
+        One of ('b', 'i', 'f', 'O'), None if value is missing (None or NaN).
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return "b"
+    if isinstance(value, (int, np.integer)):
+        return "i"
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return None
+        return "f"
+    return "O"
+
+
+def _arrayKind(values: np.ndarray) -> str:
+    """Get the storage kind of a numpy array of values."""
+    if values.dtype.kind == "b":
+        return "b"
+    elif values.dtype.kind in "iu":
+        return "i"
+    elif values.dtype.kind == "f":
+        if np.all(np.isnan(values)):
+            return ""
+        return "f"
+    # object (or str) array, classify each value
+    valueKinds = [_valueKind(value) for value in values]
+    if len(valueKinds) > 0 and all(kind == "b" for kind in valueKinds):
+        return "b"
+    theKind = ""
+    for valueKind in valueKinds:
+        theKind = _promoteKind(theKind, valueKind)
+    return theKind
+
+
+def _promoteKind(kind: str, newKind: Optional[str]) -> str:
+    """Get the kind of a column that holds values of both kind and newKind.
+
+    Kind '' is a column where no value has been set (all missing).
+    Numeric kinds ('i', 'f') store missing values as NaN, bool and
+    everything else is stored as an object.
+    """
+    if newKind is None:
+        # missing value
+        return kind if kind in ("", "i", "f", "O") else "O"
+    if kind == newKind:
+        return kind
+    if kind == "":
+        return "O" if newKind == "b" else newKind
+    if kind in ("i", "f") and newKind in ("i", "f"):
+        return "f"
+    return "O"
+
+
+class _spikeIndex:
+    """Spike rows sorted by sweep, epoch and time for range queries.
+
+    Built from the 'sweep', 'epoch' and 'thresholdSec' columns of an
+    analysisResultList. Rows are always returned in spike order, as a
+    slice when they are contiguous.
+    """
+
+    def __init__(self, sweeps: np.ndarray, epochs: np.ndarray, seconds: np.ndarray):
+        self._numSpikes = len(sweeps)
+
+        # rows sorted by (sweep, epoch), lexsort is stable so equal keys stay in spike order
+        self._sweepOrder = np.lexsort((epochs, sweeps))
+        self._sweeps = sweeps[self._sweepOrder]
+        self._sweepEpochs = epochs[self._sweepOrder]
+
+        self._epochOrder = np.argsort(epochs, kind="stable")
+        self._epochs = epochs[self._epochOrder]
+
+        self._timeOrder = np.argsort(seconds, kind="stable")
+        self._seconds = seconds[self._timeOrder]
+
+    @staticmethod
+    def _asRows(rows: np.ndarray):
+        """Get rows (in spike order) as a slice if they are contiguous."""
+        if len(rows) == 0:
+            return slice(0, 0)
+        if rows[-1] - rows[0] + 1 == len(rows):
+            return slice(int(rows[0]), int(rows[-1]) + 1)
+        return rows
+
+    def getRows(self, sweepNumber="All", epochNumber="All"):
+        """Get rows of spikes in a sweep and epoch, 'All' matches all."""
+        if sweepNumber == "All" and epochNumber == "All":
+            return slice(0, self._numSpikes)
+
+        if sweepNumber == "All":
+            start = np.searchsorted(self._epochs, epochNumber, side="left")
+            stop = np.searchsorted(self._epochs, epochNumber, side="right")
+            return self._asRows(np.sort(self._epochOrder[start:stop]))
+
+        start = np.searchsorted(self._sweeps, sweepNumber, side="left")
+        stop = np.searchsorted(self._sweeps, sweepNumber, side="right")
+        if epochNumber != "All":
+            sweepEpochs = self._sweepEpochs[start:stop]
+            stop = start + np.searchsorted(sweepEpochs, epochNumber, side="right")
+            start = start + np.searchsorted(sweepEpochs, epochNumber, side="left")
+        return self._asRows(np.sort(self._sweepOrder[start:stop]))
+
+    def getRowsInTime(self, startSec: float, stopSec: float):
+        """Get rows of spikes with startSec <= thresholdSec < stopSec."""
+        start = np.searchsorted(self._seconds, startSec, side="left")
+        stop = np.searchsorted(self._seconds, stopSec, side="left")
+        return self._asRows(np.sort(self._timeOrder[start:stop]))
+
+
 class analysisResultList:
-    """Class encapsulating a list of analysis results.
-    
-    Each row is an analysisResultDict for one spike.
+    """Class encapsulating analysis results for all spikes.
+
+    Analysis results are stored column-wise, one numpy array per key
+    in analysisResultDict (plus any user analysis keys). Per spike
+    errors are kept in a side table.
+
+    Use self[i] to get a view of one spike, like spikeDict[i]["peakVal"].
+    Use getColumn() and setColumn() to get/set one key for all spikes.
 
     These are keys in bAnalysis_ spike dict and columns in output reports
     """
 
+    # key of per spike error lists, stored in side table self._errors
+    errorKey = "errors"
+
+    # keys used by getSpikeIndex(), setting any of these rebuilds the index
+    indexKeys = ("sweep", "epoch", "thresholdSec")
+
     def __init__(self):
         # one copy for entire list
 
         # TODO: put xxx in a function getAnalysisResltDict()
         self._dDict = analysisResultDict
 
-        # list of analysisResultDict
-        self._myList = []
+        self._numSpikes: int = 0
+        self._capacity: int = 0
+
+        # ordered list of keys, same order as columns in asDataFrame()
+        self._keys: List[str] = []
+
+        # one np.ndarray per key, only [0:self._numSpikes] is valid
+        self._columns: Dict[str, np.ndarray] = {}
+
+        # storage kind per key, one of ('', 'b', 'i', 'f', 'O')
+        # 'i' and 'f' are both stored as float64 with NaN for missing values
+        self._kinds: Dict[str, str] = {}
+
+        # default value per key
+        self._defaults: Dict[str, object] = {}
+
+        # side table of errors, {spike index: list of error dict}
+        self._errors: Dict[int, List[dict]] = {}
+
+        # sweep/epoch/time index, built on demand in getSpikeIndex()
+        self._spikeIndex: Optional[_spikeIndex] = None
+
+        for k, v in analysisResultDict.items():
+            self._addColumn(k, v["default"])
+
+    def _addColumn(self, key: str, default):
+        """Add a new column (key) and fill all spikes with default."""
+        self._keys.append(key)
+        self._defaults[key] = default
+        if key == self.errorKey:
+            return
+        kind = _valueKind(default) or ""
+        self._kinds[key] = kind
+        self._columns[key] = np.empty(self._capacity, dtype=self._kindDtype(kind))
+        self._fillDefault(key, 0, self._numSpikes)
+
+    def _convertColumn(self, key: str, newKind: str):
+        """Convert storage of one column to a new kind."""
+        kind = self._kinds[key]
+        if kind == newKind:
+            return
+        column = self._columns[key]
+        if newKind == "O":
+            if kind == "i":
+                objColumn = column.astype(object)
+                goodRows = ~np.isnan(column)
+                objColumn[goodRows] = column[goodRows].astype(np.int64).astype(object)
+                column = objColumn
+            elif kind == "":
+                default = self._defaults[key]
+                column = np.full(len(column), default, dtype=object)
+            else:
+                column = column.astype(object)
+        self._columns[key] = column
+        self._kinds[key] = newKind
+
+    def _fillDefault(self, key: str, start: int, stop: int):
+        """Fill rows [start, stop) of one column with its default value."""
+        if start >= stop:
+            return
+        default = self._defaults[key]
+        self._convertColumn(key, _promoteKind(self._kinds[key], _valueKind(default)))
+        column = self._columns[key]
+        if self._kinds[key] == "O" and isinstance(default, list):
+            # each spike needs its own list
+            for row in range(start, stop):
+                column[row] = list(default)
+        elif _valueKind(default) is None and self._kinds[key] != "O":
+            column[start:stop] = np.nan
+        else:
+            column[start:stop] = default
+
+    def _reserve(self, numSpikes: int):
+        """Grow underlying column arrays to hold at least numSpikes."""
+        if numSpikes <= self._capacity:
+            return
+        newCapacity = max(numSpikes, 2 * self._capacity, 16)
+        for key, column in self._columns.items():
+            newColumn = np.empty(newCapacity, dtype=column.dtype)
+            newColumn[: self._numSpikes] = column[: self._numSpikes]
+            self._columns[key] = newColumn
+        self._capacity = newCapacity
+
+    def _checkRow(self, row: int) -> int:
+        """Check a spike index, allowing negative indexing."""
+        if row < 0:
+            row += self._numSpikes
+        if row < 0 or row >= self._numSpikes:
+            raise IndexError(
+                f"spike index {row} out of range, number of spikes is {self._numSpikes}"
+            )
+        return row
+
+    def getValue(self, row: int, key: str):
+        """Get the value of one key for one spike.
+
+        Raises
+        ------
+        KeyError
+            If key is not an analysis result.
+        """
+        if key == self.errorKey:
+            # reading does not add to the side table, see appendError()
+            return self._errors.get(row, [])
+
+        kind = self._kinds[key]
+        value = self._columns[key][row]
+        if kind == "":
+            return self._defaults[key]
+        elif kind == "i":
+            return float("nan") if np.isnan(value) else int(value)
+        elif kind == "b":
+            return bool(value)
+        return value
+
+    def setValue(self, row: int, key: str, value):
+        """Set the value of one key for one spike.
+
+        If key does not exist, it is added for all spikes.
+        """
+        if key not in self._defaults:
+            self._addColumn(key, float("nan"))
+
+        if key in self.indexKeys:
+            self._spikeIndex = None
+
+        if key == self.errorKey:
+            self._errors[row] = value
+            return
+
+        kind = _valueKind(value)
+        self._convertColumn(key, _promoteKind(self._kinds[key], kind))
+        if kind is None and self._kinds[key] != "O":
+            self._columns[key][row] = np.nan
+        else:
+            self._columns[key][row] = value
+
+    def appendError(self, row: int, errorDict: dict):
+        """Append one error to the errors of one spike.
+
+        Parameters
+        ----------
+        row : int
+            Spike index
+        errorDict : dict
+            From bAnalysis._getErrorDict()
+        """
+        row = int(self._checkRow(row))
+        self._errors.setdefault(row, []).append(errorDict)
+
+    def getColumn(self, key: str, keepInt: bool = False, rows=None) -> np.ndarray:
+        """Get all values of one key as a np.ndarray, one element per spike.
+
+        Parameters
+        ----------
+        key : str
+        keepInt : bool
+            If True and an int column has missing values, return an object
+            array of int and NaN. Otherwise an int column with missing values
+            is returned as float64.
+        rows : slice or np.ndarray
+            Only get these spikes, e.g. from getSpikeIndex().getRows().
+
+        Raises
+        ------
+        KeyError
+            If key is not an analysis result.
+        """
+        n = self._numSpikes
+        if key == self.errorKey:
+            rowList = np.arange(n) if rows is None else np.arange(n)[rows]
+            column = np.empty(len(rowList), dtype=object)
+            for idx, row in enumerate(rowList):
+                column[idx] = self._errors.get(int(row), [])
+            return column
+
+        kind = self._kinds[key]
+        column = self._columns[key][:n]
+        if rows is not None:
+            column = column[rows]
+            n = len(column)
+        if kind == "":
+            default = self._defaults[key]
+            if default is None:
+                return np.full(n, None, dtype=object)
+            return np.full(n, np.nan)
+        elif kind == "i":
+            goodRows = ~np.isnan(column)
+            if np.all(goodRows):
+                return column.astype(np.int64)
+            elif keepInt:
+                objColumn = column.astype(object)
+                objColumn[goodRows] = column[goodRows].astype(np.int64).astype(object)
+                return objColumn
+        return column.copy()
+
+    def setColumn(self, key: str, values, rows=None):
+        """Set values of one key for all spikes or a list of spikes.
+
+        Parameters
+        ----------
+        key : str
+            If key does not exist, it is added for all spikes.
+        values : scalar, list, or np.ndarray
+            A scalar is assigned to all rows.
+        rows : list of int or np.ndarray
+            Spike indices to set, if None then set all spikes.
+        """
+        if key not in self._defaults:
+            self._addColumn(key, float("nan"))
+
+        if key in self.indexKeys:
+            self._spikeIndex = None
 
-        self._iterIdx = -1
+        if rows is None:
+            rows = np.arange(self._numSpikes)
+            allRows = True
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            allRows = False
+
+        isScalar = np.isscalar(values) or values is None or isinstance(values, dict)
+        if not isScalar and len(values) != len(rows):
+            raise ValueError(
+                f'Setting "{key}" expected {len(rows)} values but got {len(values)}'
+            )
+
+        if key == self.errorKey:
+            for idx, row in enumerate(rows):
+                self._errors[int(row)] = values if isScalar else values[idx]
+            return
+
+        if isScalar:
+            kind = _valueKind(values)
+        else:
+            if not isinstance(values, np.ndarray):
+                # list of mixed types, keep each as an object
+                _tmp = np.empty(len(values), dtype=object)
+                _tmp[:] = values
+                values = _tmp
+            kind = _arrayKind(values)
+
+        if allRows and self._numSpikes > 0:
+            # replacing the entire column, do not promote
+            self._kinds[key] = kind if kind is not None else ""
+            if self._kinds[key] in ("b", "O"):
+                self._columns[key] = np.empty(self._capacity, dtype=self._kindDtype(kind))
+            else:
+                self._columns[key] = np.full(self._capacity, np.nan)
+        else:
+            self._convertColumn(key, _promoteKind(self._kinds[key], kind))
+
+        column = self._columns[key]
+        if self._kinds[key] == "O":
+            if isScalar:
+                for row in rows:
+                    column[row] = values
+            else:
+                column[rows] = values
+        elif self._kinds[key] == "":
+            column[rows] = np.nan
+        else:
+            if not isScalar and values.dtype == object:
+                values = np.array(
+                    [np.nan if _valueKind(v) is None else v for v in values],
+                    dtype=column.dtype,
+                )
+            column[rows] = np.nan if (isScalar and kind is None) else values
+
+    @staticmethod
+    def _kindDtype(kind: str):
+        if kind == "b":
+            return bool
+        elif kind == "O":
+            return object
+        return np.float64
+
+    def keys(self) -> List[str]:
+        """Get all analysis result keys, including user analysis keys."""
+        return list(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._defaults
 
     def setFromListDict(self, listOfDict: List[dict]):
         """Set analysis results from a list of dict.
 
         Used when loading sanpy.bAnalysis from h5 file.
 
-        When we create self (during spike detect) we have a list of class analysisResult.
-        When we save/load we have a list of dict.
-
         This is assuming we re-create self every time we do spike detection
         """
+        self.__init__()
 
-        # do not do this, we are an analysisResultList as a list of analysisResult
-        # self._myList = listOfDict
+        self.appendDefault(len(listOfDict))
 
-        self._myList = []
+        # keys in analysisResultDict come first, then any new keys in order
+        loadedKeys = {}
         for oneDict in listOfDict:
-            oneAnalysisResult = analysisResult(theDict=oneDict)
-            self._myList.append(oneAnalysisResult)
+            for k in oneDict.keys():
+                loadedKeys[k] = None
+
+        for key in loadedKeys.keys():
+            default = self._defaults.get(key, float("nan"))
+            values = [oneDict.get(key, default) for oneDict in listOfDict]
+            self.setColumn(key, values)
 
     def analysisDate(self):
         if len(self) > 0:
-            return self._myList[0]["analysisDate"]
+            return self[0]["analysisDate"]
         else:
             return None
 
     def analysisTime(self):
         if len(self) > 0:
-            return self._myList[0]["analysisTime"]
+            return self[0]["analysisTime"]
         else:
             return None
 
@@ -611,9 +1036,6 @@ class analysisResultList:
 
         analysisList = self.asList()
 
-        # print(analysisList[0].print())
-        print(self._myList[0])
-
         with open(savePath, "w") as f:
             json.dump(analysisList, f, cls=NumpyEncoder, indent=4)
 
@@ -625,108 +1047,192 @@ class analysisResultList:
             return
 
         with open(loadPath, "r") as f:
-            self._myList = json.load(f)
+            self.setFromListDict(json.load(f))
 
-    def appendDefault(self):
-        """Append a spike to analysis.
+    def appendDefault(self, numSpikes: int = 1):
+        """Append spike(s) with default values to analysis.
 
         Used in bAnalysis spike detection.
         """
-        oneResult = analysisResult()
-        self._myList.append(oneResult)
+        start = self._numSpikes
+        stop = start + numSpikes
+        self._reserve(stop)
+        self._numSpikes = stop
+        self._spikeIndex = None
+        for key in self._columns.keys():
+            self._fillDefault(key, start, stop)
 
     def appendAnalysis(self, analysisResultList):
-        for analysisResult in analysisResultList:
-            # analysisResult is for one spike
-            self._myList.append(analysisResult)
+        """Append all spikes from another analysisResultList."""
+        if not isinstance(analysisResultList, type(self)):
+            # an iterable of analysisResult (or dict), one per spike
+            for oneResult in analysisResultList:
+                self.appendDefault()
+                row = self._numSpikes - 1
+                for k, v in oneResult.items():
+                    self.setValue(row, k, v)
+            return
+
+        other = analysisResultList
+        numOther = len(other)
+        if numOther == 0:
+            return
+
+        for key in other._keys:
+            if key not in self._defaults:
+                self._addColumn(key, other._defaults[key])
+
+        start = self._numSpikes
+        stop = start + numOther
+        wasEmpty = start == 0
+        self._reserve(stop)
+        self._numSpikes = stop
+        self._spikeIndex = None
+
+        for key in self._columns.keys():
+            if key not in other._columns:
+                self._fillDefault(key, start, stop)
+                continue
+            otherKind = other._kinds[key]
+            otherColumn = other._columns[key][:numOther]
+            if wasEmpty:
+                newKind = otherKind
+                self._columns[key] = np.empty(self._capacity, dtype=self._kindDtype(newKind))
+                self._kinds[key] = newKind
+            elif otherKind == "":
+                newKind = _promoteKind(self._kinds[key], None)
+            else:
+                newKind = _promoteKind(self._kinds[key], otherKind)
+            self._convertColumn(key, newKind)
+            if newKind == "O" and otherKind != "O":
+                otherColumn = other.getColumn(key, keepInt=True)
+            self._columns[key][start:stop] = otherColumn
+
+        for row, errors in other._errors.items():
+            self._errors[start + row] = errors
+
+    def getErrorList(self) -> List[dict]:
+        """Get the errors of all spikes as one flat list of error dict, in spike order.
+
+        Each error dict is given the 'Sweep' and 'Epoch' of its spike.
+        Only spikes with errors are visited.
+        """
+        sweeps = self.getColumn("sweep", keepInt=True).tolist()
+        epochs = self.getColumn("epoch", keepInt=True).tolist()
+
+        errorList = []
+        for row in sorted(self._errors.keys()):
+            if row >= self._numSpikes:
+                continue
+            for error in self._errors[row]:
+                # error is dict from bAnalysis._getErrorDict
+                if error is None or error == np.nan or error == "nan":
+                    continue
+                error["Sweep"] = sweeps[row]
+                error["Epoch"] = epochs[row]
+                errorList.append(error)
+        return errorList
+
+    def getRows(self, rows) -> "analysisResultList":
+        """Get a new analysisResultList with a subset of spikes.
+
+        Parameters
+        ----------
+        rows : list of int or np.ndarray
+            Spike indices to keep, in order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+
+        newList = analysisResultList()
+        newList._keys = list(self._keys)
+        newList._defaults = dict(self._defaults)
+        newList._kinds = dict(self._kinds)
+        newList._columns = {
+            key: column[: self._numSpikes][rows] for key, column in self._columns.items()
+        }
+        newList._numSpikes = len(rows)
+        newList._capacity = len(rows)
+        for newRow, row in enumerate(rows):
+            if row in self._errors:
+                newList._errors[newRow] = self._errors[row]
+        return newList
+
+    def getSpikeIndex(self) -> _spikeIndex:
+        """Get the sweep/epoch/time index of all spikes.
+
+        The index is rebuilt only after spikes are appended or one of
+        indexKeys is set.
+        """
+        if self._spikeIndex is None:
+            self._spikeIndex = _spikeIndex(
+                self.getColumn("sweep").astype(float),
+                self.getColumn("epoch").astype(float),
+                self.getColumn("thresholdSec").astype(float),
+            )
+        return self._spikeIndex
 
     def addAnalysisResult(self, theKey, theDefault=None):
-        # go through list and add to each [i] dict
-        for spike in self:
-            spike.addNewKey(theKey, theDefault=theDefault)
+        """Add a new key to all spikes, existing keys are not modified."""
+        if theDefault is None:
+            theDefault = float("nan")
+        if theKey not in self._defaults:
+            self._addColumn(theKey, theDefault)
 
     def asList(self):
         """
-        Return underlying list.
+        Return analysis results as a list of dict, one dict per spike.
         """
-        # return [spike.asDict() for spike in self._myList]
-        return [x.asDict() for x in self._myList]
+        return [self[row].asDict() for row in range(len(self))]
 
     def asDataFrame(self):
         """
-        Note: underlying _myList is a list of analysisResult
+        Return analysis results as a pd.DataFrame, one row per spike.
         """
-        return pd.DataFrame(self.asList())
+        if len(self) == 0:
+            return pd.DataFrame()
+        theDict = {key: self.getColumn(key) for key in self._keys}
+        return pd.DataFrame(theDict)
 
     def __getitem__(self, key):
         """
         Allow [] indexing with self[int].
         """
         try:
-            # return self._dDict[key]['currentValue']
-            return self._myList[key]
+            row = self._checkRow(key)
+            return analysisResult(self, row)
         except IndexError as e:
             logger.error(f"{e}")
-            # logger.error(f'possible keys are: {self._myList.keys()}')
 
     def __len__(self):
         """Allow len() with len(this)"""
-        return len(self._myList)
+        return self._numSpikes
 
     def __iter__(self):
         """Allow iteration with "for item in self"
         """
-        _iterIdx = -1
-        return self
-
-    def __next__(self):
-        """Allow iteration with "for item in self"
-        """
-        self._iterIdx += 1
-        if self._iterIdx >= len(self._myList):
-            self._iterIdx = -1  # reset to initial value
-            raise StopIteration
-        else:
-            return self._myList[self._iterIdx]
+        for row in range(self._numSpikes):
+            yield analysisResult(self, row)
 
 
 class analysisResult:
-    def __init__(self, theDict=None):
-        """Create an anlysis item (for one spike)
+    """A view of the analysis results for one spike.
+
+    Behaves like a dictionary, values are read and written to
+    the columns of the parent analysisResultList.
+    """
 
+    def __init__(self, resultList: analysisResultList, row: int):
+        """
         Args:
-            theDict: Pre-existing dict when we load form h5 file
+            resultList: The analysisResultList holding the values
+            row: The spike index into resultList
         """
-        # this is the raw definition of analysis results (See above)
-        # pull from this to create key/value self.rDict
-        # self._dDict = analysisResultDict
-        defaultDict = analysisResultDict
-        # this is simple key/value pairs as we will in detection
-        self._rDict = {}
-        for k, v in defaultDict.items():
-            default = v["default"]
-            self._rDict[k] = default
-
-        if theDict is not None:
-            for k, v in theDict.items():
-                self[k] = v  # calls __setitem__()
-
-    # this was interfering with converting to DataFrame ???
-    """
-    def __str__(self):
-        printList = []
-        for k,v in self._rDict.items():
-            if isinstance(v, dict):
-                for k2,v2 in v.items():
-                    printList.append(f'  {k2} : {v2} {type(v2)}')
-            else:
-                printList.append(f'{k} : {v} {type(v)}')
-        return '\n'.join(printList)
-    """
+        self._resultList = resultList
+        self._row = row
 
     def print(self):
         printList = []
-        for k, v in self._rDict.items():
+        for k, v in self.items():
             if isinstance(v, list):
                 for item in v:
                     for k2, v2 in item.items():
@@ -746,53 +1252,45 @@ class analysisResult:
             theDefault = float("nan")
 
         # check if key exists
-        keyExists = theKey in self._rDict.keys()
-        addedKey = False
-        if keyExists:
+        if theKey in self._resultList:
             # key exists, don't modify
-            # logger.warning(f'The key "{theKey}" already exists and has value "{self._rDict[theKey]}"')
-            pass
-        else:
-            self._rDict[theKey] = theDefault
-            addedKey = True
+            return False
 
-        #
-        return addedKey
+        self._resultList.addAnalysisResult(theKey, theDefault)
+        return True
 
     def asDict(self):
         """
-        Returns underlying dictionary
+        Returns a dictionary copy of this spike.
         """
-        return self._rDict
+        return dict(self.items())
 
     def __getitem__(self, key):
         # to mimic a dictionary
-        ret = None
         try:
-            # return self._dDict[key]['currentValue']
-            ret = self._rDict[key]
+            return self._resultList.getValue(self._row, key)
         except KeyError as e:
             logger.error(f'Error getting key "{key}"')
-            logger.error(f'possible keys are: {self._rDict.keys()}')
+            logger.error(f'possible keys are: {self.keys()}')
             raise
-        #
-        return ret
 
     def __setitem__(self, key, value):
         # to mimic a dictionary
-        try:
-            # self._dDict[key]['currentValue'] = value
-            self._rDict[key] = value
-        except KeyError as e:
-            logger.error(f"{e}")
+        self._resultList.setValue(self._row, key, value)
+
+    def get(self, key, default=None):
+        # to mimic a dictionary
+        if key in self._resultList:
+            return self[key]
+        return default
 
     def items(self):
         # to mimic a dictionary
-        return self._rDict.items()
+        return [(k, self[k]) for k in self.keys()]
 
     def keys(self):
         # to mimic a dictionary
-        return self._rDict.keys()
+        return self._resultList.keys()
 
 
 def test():
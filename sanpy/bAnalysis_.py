@@ -4,19 +4,20 @@ import math
 import time
 import datetime
 import copy
+import itertools
 import json
+import weakref
 from collections import OrderedDict
-import warnings  # to catch np.polyfit -->> RankWarning: Polyfit may be poorly conditioned
+from functools import partial
+from multiprocessing import Pool
 
-from typing import Union, Dict, List, Tuple, Optional
+from typing import Callable, Union, Dict, List, Tuple, Optional
 
 # import h5py
 
 import numpy as np
 import pandas as pd
-import scipy
-import scipy.signal
-import scipy.stats
+import scipy  # submodules like scipy.signal and scipy.stats are loaded on first use
 
 import pyabf  # see: https://github.com/swharden/pyABF
 
@@ -35,6 +36,44 @@ from sanpy.fileloaders import recordingModes
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+# stages of spike detection in the order they run as
+# (stage, bDetection keys, analysis results made by the stage).
+# The keys of a stage are extended with the "depends on detection"
+# of its results. Stages after "candidates" (features, user stats) are always run.
+_detectionStageList = [
+    ("filter", ["SavitzkyGolay_pnts", "SavitzkyGolay_poly"], ["medianFilter"]),
+    (
+        "crossings",
+        ["detectionType", "startSeconds", "stopSeconds"],
+        ["dvdtThreshold", "mvThreshold"],
+    ),
+    (
+        "candidates",
+        ["dvdtPreWindow_ms", "dvdt_percentOfMax", "doBackupSpikeVm", "onlyPeaksBelow_mV"],
+        ["peakPnt", "isi_pnts"],
+    ),
+]
+
+
+def getDetectionStages() -> Dict[str, List[str]]:
+    """Get the bDetection keys each stage of spike detection depends on.
+
+    A stage and all stages after it are re-run when one of its keys changes.
+    """
+    stages = {}
+    for stage, detectionKeys, resultKeys in _detectionStageList:
+        stageKeys = list(detectionKeys)
+        for key in sanpy.bAnalysisResults.getDetectionDependencies(resultKeys):
+            if key not in stageKeys:
+                stageKeys.append(key)
+        stages[stage] = stageKeys
+    return stages
+
+
+class _DetectionCancelled(Exception):
+    """Raised when the progressCallback of spikeDetect() cancels detection."""
+
+
 class bAnalysis:
     """
     The bAnalysis class represents a whole-cell recording and provides functions for analysis.
@@ -69,6 +108,8 @@ class bAnalysis:
         fileLoaderDict: dict = None,
         stimulusFileFolder: str = None,
         verbose: bool = False,
+        fileLoader: "sanpy.fileloaders.fileLoader_base" = None,
+        lazy: bool = False,
     ):
         """
         Args:
@@ -80,6 +121,10 @@ class bAnalysis:
                 Do this if running in a script.
                 If running an SanPy app, we pass the dict
             stimulusFileFolder:
+            fileLoader: An already loaded file loader, filepath is ignored.
+                See fileLoader_base.getSweepLoader()
+            lazy: If true, file loader reads sweeps when needed (if it supports it).
+                For example, abf files are memory mapped.
         """
 
         """
@@ -95,6 +140,12 @@ class bAnalysis:
 
         self._isAnalyzed: bool = False
 
+        self._detectionTimes: Dict[str, float] = {}
+        # seconds for each stage of the last spikeDetect(), see detectionTimes
+
+        self._candidateCache: Dict[int, dict] = {}
+        # candidate spikes of each sweep from the last detection, see _getCandidates()
+
         self.loadError: bool = False
         """bool: True if error loading file/stream."""
 
@@ -137,34 +188,37 @@ class bAnalysis:
 
         # TODO (cudmore) need to parse folder of file loaders in fileloders/ and determine
         # class to use to load file (using fileLoader.filetype
-        self._fileLoader = None
-        if filepath is not None and not os.path.isfile(filepath):
+        self._fileLoader = fileLoader
+        if fileLoader is None and filepath is not None and not os.path.isfile(filepath):
             logger.error(f'File does not exist: "{filepath}"')
             self.loadError = True
         else:
-            if fileLoaderDict is None:
-                fileLoaderDict = (
-                    sanpy.fileloaders.getFileLoaders()
-                )  # EXPENSIVE, to do, pass in from app
-
-            _ext = os.path.splitext(filepath)[1]
-            _ext = _ext[1:]
-            try:
-                if verbose:
-                    logger.info(f"Loading file with extension: {_ext}")
-                constructorObject = fileLoaderDict[_ext]["constructor"]
-                self._fileLoader = constructorObject(filepath)
-                # may 2, 2023
-                if self._fileLoader._loadError:
-                    logger.error(f'load error in file loader for ext: "{_ext}"')
-                    self.loadError = True
+            if fileLoader is None:
+                if fileLoaderDict is None:
+                    fileLoaderDict = (
+                        sanpy.fileloaders.getFileLoaders()
+                    )  # EXPENSIVE, to do, pass in from app
+
+                _ext = os.path.splitext(filepath)[1]
+                _ext = _ext[1:]
+                try:
+                    if verbose:
+                        logger.info(f"Loading file with extension: {_ext}")
+                    constructorObject = fileLoaderDict[_ext]["constructor"]
+                    self._fileLoader = constructorObject(
+                        filepath, loadData=loadData, lazy=lazy
+                    )
+                    # may 2, 2023
+                    if self._fileLoader._loadError:
+                        logger.error(f'load error in file loader for ext: "{_ext}"')
+                        self.loadError = True
 
-            except KeyError as e:
-                logger.error(f'did not find a file loader for extension "{_ext}"')
-                self.loadError = True
+                except KeyError as e:
+                    logger.error(f'did not find a file loader for extension "{_ext}"')
+                    self.loadError = True
             
             self._kymAnalysis : sanpy.kymAnalysis = None
-            if (self.fileLoader is not None) and (self.fileLoader.recordingMode == recordingModes.kymograph):
+            if (self.fileLoader is not None) and (self.fileLoader.recordingMode == recordingModes.kymograph) and loadData:
                 if verbose:
                     logger.info('creating kymAnalysis')
                     logger.info(f'    self.fileLoader.filepath:{self.fileLoader.filepath}')
@@ -198,8 +252,8 @@ class bAnalysis:
             #self.loadError = True
         """
 
-        # get default derivative
-        if loadData and not self.loadError:
+        # get default derivative, when lazy each sweep is filtered when it is needed
+        if loadData and not self.loadError and not self.fileLoader.lazy:
             self._rebuildFiltered()
 
         self._detectionDirty = False
@@ -273,47 +327,46 @@ class bAnalysis:
         # always save as csv
         self.saveAnalysis_tocsv()
 
-        # when making df from dict, need to pass it a list
-        # o.w. key values that are lists get expanded into rows
-        if self._detectionDict is not None:
-            dfDetection = pd.DataFrame([self._detectionDict])
-
-        dfMetaData = pd.DataFrame([self.metaData])
-
-        # convert spikeList (list of dict) to json
-        # spikeList = self.spikeDict.asList()
-        # dataJson = json.dumps(spikeList, cls=NumpyEncoder)  # list of dict
-        # dfAnalysis = pd.DataFrame(spikeList)
-        if len(self.spikeDict) > 0:
-            dfAnalysis = self.spikeDict.asDataFrame()
-
-        uuid = self.uuid
+        hdfFrames = self._getHdfFrames()
 
         logger.info(
-            f"    Saving {self.numSpikes} spikes to uuid {uuid} in h5 file {hdfPath}"
+            f"    Saving {self.numSpikes} spikes to uuid {self.uuid} in h5 file {hdfPath}"
         )
 
         with pd.HDFStore(hdfPath) as hdfStore:
-            if self._detectionDict is not None:
-                key = uuid + "/" + "detectionDict"
-                dfDetection.to_hdf(hdfStore, key)  # default mode='a'
-
-            # always save meta data
-            key = uuid + "/" + "metaDataDict"
-            dfMetaData.to_hdf(hdfStore, key)  # default mode='a'
-            
-            # logger.warning('=== saving dfMetaData')
-            # print(dfMetaData)
-
-            if len(self.spikeDict) > 0:
-                key = uuid + "/" + "analysisList"
-                dfAnalysis.to_hdf(hdfStore, key)
+            for key, df in hdfFrames.items():
+                df.to_hdf(hdfStore, key=key)  # default mode='a'
 
         # we saved, detection is not dirty
         self._detectionDirty = False
 
         return True
 
+    def _getHdfFrames(self) -> Dict[str, pd.DataFrame]:
+        """Get the DataFrames to save into an hdf5 file.
+
+        Returns
+        -------
+        dict
+            Keys are h5 keys like '<uuid>/analysisList', values are pd.DataFrame.
+        """
+        hdfFrames = {}
+
+        uuid = self.uuid
+
+        # when making df from dict, need to pass it a list
+        # o.w. key values that are lists get expanded into rows
+        if self._detectionDict is not None:
+            hdfFrames[uuid + "/" + "detectionDict"] = pd.DataFrame([self._detectionDict])
+
+        # always save meta data
+        hdfFrames[uuid + "/" + "metaDataDict"] = pd.DataFrame([self.metaData])
+
+        if len(self.spikeDict) > 0:
+            hdfFrames[uuid + "/" + "analysisList"] = self.spikeDict.asDataFrame()
+
+        return hdfFrames
+
     def _findUuid(self, hdfPath):
         """Find this analysis uuid in an h5 file. If analysis is not saved, it will not exists.
         """
@@ -554,31 +607,24 @@ class bAnalysis:
         if len(spikeList) == 0:
             return None
 
-        # logger.info(f'spikeList: {spikeList} stat:{stat}')
-        
-        retList = []
-        # count = 0
-        for idx, spike in enumerate(self.spikeDict):
-            # logger.info(f'  idx:{idx}')
-            if idx in spikeList:
-                try:
-                    val = spike[stat]
-                    retList.append(val)
-                    # count += 1
-                except KeyError as e:
-                    logger.error(e)
-        # logger.info(f'  retList: {retList}')
+        if stat not in self.spikeDict:
+            logger.error(f'Did not find stat "{stat}"')
+            return []
+
+        # values are returned in spike order, once per spike
+        numSpikes = len(self.spikeDict)
+        spikeRows = np.unique(np.asarray(spikeList, dtype=np.int64))
+        spikeRows = spikeRows[(spikeRows >= 0) & (spikeRows < numSpikes)]
+        retList = [self.spikeDict.getValue(row, stat) for row in spikeRows]
         return retList
 
     def setSpikeStat_time(self, startSec: int, stopSec: int, stat: str, value):
         """Set a spike stat for spikes in a range of time."""
 
         # get spike list in range [startSec, stopSec]
-        spikeSeconds = self.getSpikeSeconds()
-        spikeList = [
-            idx for idx, x in enumerate(spikeSeconds) if x >= startSec and x < stopSec
-        ]
-        self.setSpikeStat(spikeList, stat, value)
+        spikeRows = self.spikeDict.getSpikeIndex().getRowsInTime(startSec, stopSec)
+        spikeList = np.arange(len(self.spikeDict))[spikeRows]
+        self.setSpikeStat(spikeList.tolist(), stat, value)
 
     def setSpikeStat(self, spikeList: Union[list, int], stat: str, value):
         """Set a spike stat for one spike or a list of spikes.
@@ -598,10 +644,9 @@ class bAnalysis:
         modDate = now.strftime("%Y%m%d")
         modTime = now.strftime("%H:%M:%S")
 
-        for spike in spikeList:
-            self.spikeDict[spike][stat] = value
-            self.spikeDict[spike]["modDate"] = modDate
-            self.spikeDict[spike]["modTime"] = modTime
+        self.spikeDict.setColumn(stat, value, rows=spikeList)
+        self.spikeDict.setColumn("modDate", modDate, rows=spikeList)
+        self.spikeDict.setColumn("modTime", modTime, rows=spikeList)
 
         self._detectionDirty = True
 
@@ -727,23 +772,17 @@ class bAnalysis:
             Returns a np.array is asArray is True
         """
 
-        def clean(val):
-            """Convert None to float('nan')"""
-            if val is None:
-                val = float("nan")
-            return val
-
         x = []  # None
         y = []  # None
         error = False
         if len(self.spikeDict) == 0:
             # logger.error(f'Did not find any spikes in spikeDict')
             error = True
-        elif statName1 not in self.spikeDict[0].keys():
+        elif statName1 not in self.spikeDict:
             logger.error(f'Did not find statName1: "{statName1}" in spikeDict')
             # print('available stat names are:', self.spikeDict[0].keys())
             error = True
-        elif statName2 is not None and statName2 not in self.spikeDict[0].keys():
+        elif statName2 is not None and statName2 not in self.spikeDict:
             logger.error(f'Did not find statName2: "{statName2}" in spikeDict')
             error = True
 
@@ -754,51 +793,30 @@ class bAnalysis:
             epochNumber = "All"
 
         if not error:
-            # original
-            # x = [clean(spike[statName1]) for spike in self.spikeDict]
-            
+            # rows (slice or array) of spikes in sweep and epoch
+            spikeIndex = self.spikeDict.getSpikeIndex()
+            rows = spikeIndex.getRows(sweepNumber, epochNumber)
+
             if getFullList:
                 # April 15, 2023, trying to fix bug in scatter plugin when we are
                 # using sweep and epoch
-                # strategy is to return all spikes, just nan out the ones we 
+                # strategy is to return all spikes, just nan out the ones we
                 # are not interested in
-                x = []
-                for spike in self.spikeDict:
-                    _include = \
-                        (sweepNumber == "All" or spike["sweep"] == sweepNumber) \
-                            and (epochNumber == "All" or spike["epoch"] == epochNumber)
-                    if _include:
-                        x.append(clean(spike[statName1]))
-                    else:
-                        x.append(float("nan"))
-            
+                x = self.spikeDict.getColumn(statName1, keepInt=True)
+                mask = np.zeros(len(x), dtype=bool)
+                mask[rows] = True
+                x = x.astype(object)
+                x[~mask] = float("nan")
             else:
                 # only current sweep and epoch
-                # (1) was this
-                # was causing errors with kym diam analysis
-                x = [
-                    clean(spike[statName1])
-                    for spike in self.spikeDict
-                    if (sweepNumber == "All" or spike["sweep"] == sweepNumber)
-                    and (epochNumber == "All" or spike["epoch"] == epochNumber)
-                ]
-                # for _idx, spike in enumerate(self.spikeDict):
-                #     if (sweepNumber == "All" or spike["sweep"] == sweepNumber) and (epochNumber == "All" or spike["epoch"] == epochNumber):
-                #         try:
-                #             val = spike[statName1]
-                #         except (KeyError) as e:
-                #             logger.error(f'did not find key "{statName1}" at spike {_idx}')
-                #         clean(val)
+                x = self.spikeDict.getColumn(statName1, keepInt=True, rows=rows)
+            x = self._cleanStat(x)
 
             if statName2 is not None:
-                # original
-                # y = [clean(spike[statName2]) for spike in self.spikeDict]
-                # only current spweek
-                y = [
-                    clean(spike[statName2])
-                    for spike in self.spikeDict
-                    if sweepNumber == "All" or spike["sweep"] == sweepNumber
-                ]
+                # only current sweep
+                sweepRows = spikeIndex.getRows(sweepNumber, "All")
+                y = self.spikeDict.getColumn(statName2, keepInt=True, rows=sweepRows)
+                y = self._cleanStat(y)
 
         if asArray:
             x = np.array(x)
@@ -810,6 +828,14 @@ class bAnalysis:
         else:
             return x
 
+    @staticmethod
+    def _cleanStat(values: np.ndarray) -> list:
+        """Convert an array of stat values to a list, None is converted to float('nan')."""
+        values = values.tolist()
+        if values and any(val is None for val in values):
+            values = [float("nan") if val is None else val for val in values]
+        return values
+
     def getSpikeTimes(self, sweepNumber=None, epochNumber='All'):
         """Get spike times (points) for current sweep"""
         # theRet = [spike['thresholdPnt'] for spike in self.spikeDict if spike['sweep']==self.currentSweep]
@@ -828,11 +854,9 @@ class bAnalysis:
         if sweepNumber is None:
             sweepNumber = "All"
         # logger.info(f'sweepNumber:{sweepNumber}')
-        theRet = [
-            spike
-            for spike in self.spikeDict
-            if sweepNumber == "All" or spike["sweep"] == sweepNumber
-        ]
+        spikeRows = self.spikeDict.getSpikeIndex().getRows(sweepNumber)
+        spikeRows = np.arange(len(self.spikeDict))[spikeRows]
+        theRet = [self.spikeDict[row] for row in spikeRows]
         return theRet
 
     def getOneSpikeDict(self, spikeNumber: int):
@@ -860,6 +884,9 @@ class bAnalysis:
         """
         Get a filtered version of recording, used for both V-Clamp and I-Clamp.
 
+        When the file loader is lazy, this only sets the filter and the
+        current sweep is filtered when it is needed.
+
         Args:
             dDict (dict): Default detection dictionary. See bDetection.defaultDetection
         """
@@ -979,38 +1006,28 @@ class bAnalysis:
         #
         return realSpikeTimePnts
 
-    def _throwOutRefractory(self, spikeTimes0, goodSpikeErrors, refractory_ms=20):
+    def _throwOutRefractory(
+        self, spikeTimes0, goodSpikeErrors, refractory_ms=20, chunkState=None
+    ):
         """
         spikeTimes0: spike times to consider
         goodSpikeErrors: list of errors per spike, can be None
         refractory_ms:
+        chunkState: when detecting in chunks, see _spikeDetectChunks()
         """
         before = len(spikeTimes0)
 
         # if there are doubles, throw-out the second one
-        # refractory_ms = 20 #10 # remove spike [i] if it occurs within refractory_ms of spike [i-1]
-        lastGood = 0  # first spike [0] will always be good, there is no spike [i-1]
-        for i in range(len(spikeTimes0)):
-            if i == 0:
-                # first spike is always good
-                continue
-            dPoints = spikeTimes0[i] - spikeTimes0[lastGood]
-            if dPoints < self.fileLoader.dataPointsPerMs * refractory_ms:
-                # remove spike time [i]
-                spikeTimes0[i] = 0
-            else:
-                # spike time [i] was good
-                lastGood = i
-        # regenerate spikeTimes0 by throwing out any spike time that does not pass 'if spikeTime'
-        # spikeTimes[i] that were set to 0 above (they were too close to the previous spike)
-        # will not pass 'if spikeTime', as 'if 0' evaluates to False
+        # same as sanpy.analysisUtil.throwOutRefractory(), spike times of 0 are thrown out
+        refractoryPnts = self.fileLoader.dataPointsPerMs * refractory_ms
+        spikeTimes0 = np.asarray(spikeTimes0, dtype=np.int64)
+        goodMask = self._refractoryMask(
+            spikeTimes0, refractoryPnts, chunkState, "refractory_ms"
+        ) & (spikeTimes0 != 0)
+        goodIdx = np.nonzero(goodMask)[0]
         if goodSpikeErrors is not None:
-            goodSpikeErrors = [
-                goodSpikeErrors[idx]
-                for idx, spikeTime in enumerate(spikeTimes0)
-                if spikeTime
-            ]
-        spikeTimes0 = [spikeTime for spikeTime in spikeTimes0 if spikeTime]
+            goodSpikeErrors = [goodSpikeErrors[i] for i in goodIdx]
+        spikeTimes0 = list(spikeTimes0[goodIdx])
 
         # TODO: put back in and log if detection ['verbose']
         after = len(spikeTimes0)
@@ -1021,140 +1038,66 @@ class bAnalysis:
 
         return spikeTimes0, goodSpikeErrors
 
-    def _getHalfWidth(
+    def _refractoryMask(
         self,
-        vm,
-        iIdx,
-        spikeDict,
-        thresholdPnt,
-        peakPnt,
-        hwWindowPnts,
-        dataPointsPerMs,
-        halfHeightList,
-        verbose=False,
-    ):
-        """
-        Get half-widhts for one spike.
+        spikeTimes: np.ndarray,
+        refractoryPnts: float,
+        chunkState: Optional[dict] = None,
+        anchorKey: str = "refractory_ms",
+    ) -> np.ndarray:
+        """Get sanpy.analysisUtil.refractoryMask() of spike times.
+
+        When detecting in chunks, continue from the last good spike of the
+        previous chunks in chunkState["lastGoodPnt"][anchorKey] and update it,
+        see _spikeDetectChunks().
+        """
+        if chunkState is None:
+            return sanpy.analysisUtil.refractoryMask(spikeTimes, refractoryPnts)
+
+        offsetPnt = chunkState["offsetPnt"]
+        lastGoodPnt = chunkState["lastGoodPnt"].get(anchorKey)
+        if lastGoodPnt is not None:
+            lastGoodPnt -= offsetPnt
+        goodMask = sanpy.analysisUtil.refractoryMask(
+            spikeTimes, refractoryPnts, lastGoodPnt
+        )
+        goodTimes = spikeTimes[goodMask]
+        if len(goodTimes) > 0:
+            chunkState["lastGoodPnt"][anchorKey] = int(goodTimes[-1]) + offsetPnt
+        return goodMask
 
-        Note: Want to make this standalone function outside of class but we need self._getErrorDict()
+    def _selectCrossings(
+        self, spikeTimes0: np.ndarray, dDict: dict, chunkState: Optional[dict] = None
+    ) -> np.ndarray:
+        """Reduce threshold crossings to the ones between startSeconds and stopSeconds.
 
-        Args:
-            vm ():
-            iIdx (int):
-            spikeDict (): new 20210928
-            #dictNumber (int):
-            thresholdPnt (int): AP threshold crossing
-            peakPnt (int): AP peak
-            hwWindowPnts (int): Window to look after peakPnt for falling vm
-            dataPointsPerMs (int):
-            halfHeightList (list): List of half-height [10,20,50,80,90]
+        When detecting in chunks, also reduce to the crossings in
+        [chunkState['startPnt'], chunkState['stopPnt']) of the sweep,
+        crossings in the padding of a chunk belong to the chunk before or after.
         """
+        offsetPnt = 0 if chunkState is None else chunkState["offsetPnt"]
 
-        halfWidthWindow_ms = hwWindowPnts / dataPointsPerMs
-
-        thresholdVal = vm[thresholdPnt]
-        peakVal = vm[peakPnt]
-        spikeHeight = peakVal - thresholdVal
-
-        spikeSecond = thresholdPnt / dataPointsPerMs / 1000
-        peakSec = peakPnt / dataPointsPerMs / 1000
-
-        widthDictList = []
-        errorList = []
-
-        # clear out any existing list
-        spikeDict[iIdx]["widths"] = []
-
-        tmpErrorType = None
-        for j, halfHeight in enumerate(halfHeightList):
-            # halfHeight in [20, 50, 80]
-
-            # search rising/falling phae of vm for this vm
-            thisVm = thresholdVal + spikeHeight * (halfHeight * 0.01)
-
-            # todo: logic is broken, this get over-written in following try
-            widthDict = {
-                "halfHeight": halfHeight,
-                "risingPnt": None,
-                #'risingVal': defaultVal,
-                "fallingPnt": None,
-                #'fallingVal': defaultVal,
-                "widthPnts": None,
-                "widthMs": float("nan"),
-            }
-            widthMs = float("nan")
-            try:
-                postRange = vm[peakPnt : peakPnt + hwWindowPnts]
-                fallingPnt = np.where(postRange < thisVm)[0]  # less than
-                if len(fallingPnt) == 0:
-                    # no falling pnts found within hwWindowPnts
-                    tmpErrorType = "falling point"
-                    raise IndexError
-                fallingPnt = fallingPnt[0]  # first falling point
-                fallingPnt += peakPnt
-                fallingVal = vm[fallingPnt]
-
-                # use the post/falling to find pre/rising
-                preRange = vm[thresholdPnt:peakPnt]
-                risingPnt = np.where(preRange > fallingVal)[0]  # greater than
-                if len(risingPnt) == 0:
-                    tmpErrorType = "rising point"
-                    raise IndexError
-                risingPnt = risingPnt[0]  # first rising point
-                risingPnt += thresholdPnt
-                # risingVal = vm[risingPnt]
-
-                # width (pnts)
-                widthPnts = fallingPnt - risingPnt
-                widthMs = widthPnts / dataPointsPerMs
-                # 20210825 may want to add this to analysis
-                # widthPnts2 = fallingPnt - thresholdPnt
-                # assign
-                widthDict["halfHeight"] = halfHeight
-                widthDict["risingPnt"] = risingPnt
-                # widthDict['risingVal'] = risingVal
-                widthDict["fallingPnt"] = fallingPnt
-                # widthDict['fallingVal'] = fallingVal
-                widthDict["widthPnts"] = widthPnts
-                widthDict["widthMs"] = widthMs
-                # widthMs = widthPnts / dataPointsPerMs # abb 20210125
-
-                # may want to add this
-                # widthDict['widthPnts2'] = widthPnts2
-                # widthDict['widthMs2'] = widthPnts2 / dataPointsPerMs
-
-            except IndexError as e:
-                errorType = "Spike Width"
-                errorStr = (
-                    f'Half width {halfHeight} error in "{tmpErrorType}" '
-                    f"with halfWidthWindow_ms:{halfWidthWindow_ms} "
-                    f"searching for Vm:{round(thisVm,2)} from peak sec {round(peakSec,2)}"
-                )
-
-                # was this
-                # eDict = self._getErrorDict(spikeNumber, thresholdPnt, errorType, errorStr) # spikeTime is in pnts
-                eDict = self._getErrorDict(
-                    iIdx, thresholdPnt, errorType, errorStr
-                )  # spikeTime is in pnts
-                # self.spikeDict[dictNumber]['errors'].append(eDict)
-                spikeDict[iIdx]["errors"].append(eDict)
-                if verbose:
-                    print(
-                        f"_getHalfWidth() error iIdx:{iIdx} j:{j} halfHeight:{halfHeight} eDict:{eDict}"
-                    )
-            #
-            # self.spikeDict[dictNumber]['widths_'+str(halfHeight)] = widthMs
-            # self.spikeDict[dictNumber]['widths'][j] = widthDict
-
-            # logger.info('================')
-            # print(f'len(spikeDict):{len(spikeDict)} iIdx:{iIdx} j:{j} widthDict:{widthDict}')
+        # logger.error('THIS IS a BUg if start sec is none then set to 0 !!!')
+        # THIS IS ABUG ... FIX
+        if dDict["startSeconds"] is not None and dDict["stopSeconds"] is not None:
+            startPnt = self.fileLoader.dataPointsPerMs * (
+                dDict["startSeconds"] * 1000
+            )  # seconds to pnt
+            stopPnt = self.fileLoader.dataPointsPerMs * (
+                dDict["stopSeconds"] * 1000
+            )  # seconds to pnt
+            spikeTimes0 = spikeTimes0[
+                (spikeTimes0 + offsetPnt >= startPnt)
+                & (spikeTimes0 + offsetPnt <= stopPnt)
+            ]
 
-            spikeDict[iIdx]["widths_" + str(halfHeight)] = widthMs
-            # spikeDict[iIdx]['widths'][j] = widthDict
-            spikeDict[iIdx]["widths"].append(widthDict)
+        if chunkState is not None:
+            spikeTimes0 = spikeTimes0[
+                (spikeTimes0 + offsetPnt >= chunkState["startPnt"])
+                & (spikeTimes0 + offsetPnt < chunkState["stopPnt"])
+            ]
 
-        #
-        # return widthDictList, errorList
+        return spikeTimes0
 
     def _getErrorDict(self, spikeNumber, pnt, _type : str, detailStr) -> dict:
         """Get error dict for one spike
@@ -1180,11 +1123,456 @@ class bAnalysis:
         }
         return eDict
 
-    def _spikeDetect_dvdt(self, dDict: dict, sweepNumber: int, verbose: bool = False):
+    def _appendSpikeError(self, spikeDict, spikeIdx, pnt, errorType, errorStr):
+        """Append one error dict to the errors of one spike in a sweep.
+
+        Parameters
+        ----------
+        spikeDict : sanpy.bAnalysisResults.analysisResultList
+            Analysis results for one sweep
+        spikeIdx : int
+            Spike index within the sweep
+        pnt : int
+            Point of the error, usually the spike threshold
+        """
+        eDict = self._getErrorDict(int(spikeIdx), pnt, errorType, errorStr)
+        spikeDict.appendError(spikeIdx, eDict)
+        if self._detectionDict["verbose"]:
+            print(f"  spike:{spikeIdx} error:{eDict}")
+
+    def _spikeFeatures_info(
+        self,
+        spikeDict,
+        sweepNumber: int,
+        spikeTimes: np.ndarray,
+        spikeErrorList: list,
+        peakPnts: np.ndarray,
+        peakVals: list,
+        dateStr: str,
+        timeStr: str,
+    ):
+        """Set detection parameters, threshold and peak for all spikes in one sweep.
+
+        Parameters
+        ----------
+        spikeDict : sanpy.bAnalysisResults.analysisResultList
+            Analysis results for one sweep, one default spike per spike time
+        spikeTimes : np.ndarray
+            Threshold crossing of each spike (points)
+        spikeErrorList : list
+            Error dict (or None) of each spike from spike detection
+        peakPnts, peakVals :
+            Peak point and value of each spike
+        """
+        dDict = self._detectionDict
+        numSpikes = len(spikeTimes)
+        if numSpikes == 0:
+            return
+
+        filteredVm = self.fileLoader.sweepY_filtered
+        filteredDeriv = self.fileLoader.filteredDeriv
+        dataPointsPerMs = self.fileLoader.dataPointsPerMs
+
+        spikeDict.setColumn("analysisDate", dateStr)
+        spikeDict.setColumn("analysisTime", timeStr)
+        spikeDict.setColumn("analysisVersion", sanpy.analysisVersion)
+        spikeDict.setColumn("interfaceVersion", sanpy.interfaceVersion)
+        spikeDict.setColumn("file", self.fileLoader.filename)
+
+        spikeDict.setColumn("detectionType", dDict["detectionType"])
+
+        spikeDict.setColumn("cellType", dDict["cellType"])
+        spikeDict.setColumn("sex", dDict["sex"])
+        spikeDict.setColumn("condition", dDict["condition"])
+
+        spikeDict.setColumn("sweep", sweepNumber)
+
+        epochTable = self.fileLoader.getEpochTable(sweepNumber)
+        if epochTable is not None:
+            epochs = [epochTable.findEpoch(spikeTime) for spikeTime in spikeTimes]
+            spikeDict.setColumn("epoch", epochs)
+            spikeDict.setColumn(
+                "epochLevel", [epochTable.getLevel(epoch) for epoch in epochs]
+            )
+        else:
+            spikeDict.setColumn("epoch", float("nan"))
+            spikeDict.setColumn("epochLevel", float("nan"))
+
+        # keep track of per sweep spike and total spike
+        sweepSpikeNumber = np.arange(numSpikes)
+        spikeDict.setColumn("sweepSpikeNumber", sweepSpikeNumber)
+        spikeDict.setColumn("spikeNumber", self.numSpikes + sweepSpikeNumber)
+
+        spikeDict.setColumn("include", True)
+
+        # todo: make this a byte encoding so we can have multiple user tyes per spike
+        spikeDict.setColumn("userType", 0)  # One userType (int) that can have values
+
+        # append existing spikeErrorList from spikeDetect_dvdt() or spikeDetect_mv()
+        for i, tmpError in enumerate(spikeErrorList):
+            if tmpError is not None and tmpError != np.nan:
+                spikeDict.appendError(i, tmpError)
+                if dDict["verbose"]:
+                    print(f"  spike:{i} error:{tmpError}")
+
+        #
+        # detection params
+        spikeDict.setColumn("dvdtThreshold", dDict["dvdtThreshold"])
+        spikeDict.setColumn("mvThreshold", dDict["mvThreshold"])
+        spikeDict.setColumn("medianFilter", dDict["medianFilter"])
+        for i in range(numSpikes):
+            # a list, same for all spikes
+            spikeDict[i]["halfHeights"] = dDict["halfHeights"]
+
+        thresholdSec = self.fileLoader.pnt2Sec_(spikeTimes)
+        thresholdVal = filteredVm[spikeTimes]
+        spikeDict.setColumn("thresholdPnt", spikeTimes)
+        spikeDict.setColumn("thresholdSec", thresholdSec)
+        spikeDict.setColumn("thresholdVal", thresholdVal)  # in vm
+        spikeDict.setColumn("thresholdVal_dvdt", filteredDeriv[spikeTimes])  # in dvdt
+
+        peakVals = np.asarray(peakVals)
+        peakSec = self.fileLoader.pnt2Sec_(peakPnts)
+        spikeDict.setColumn("peakPnt", peakPnts)
+        spikeDict.setColumn("peakSec", peakSec)
+        spikeDict.setColumn("peakVal", peakVals)
+        spikeDict.setColumn("peakHeight", peakVals - thresholdVal)
+        spikeDict.setColumn("timeToPeak_ms", (peakSec - thresholdSec) * 1000)
+
+    def _spikeFeatures_preMin(self, spikeDict, spikeTimes: np.ndarray) -> np.ndarray:
+        """Get the pre spike minimum (MDP) for all spikes in one sweep.
+
+        Search for the minimum in a window of mdp_ms before each spike,
+        average Vm in avgWindow_ms around it, then search backward
+        from the spike for Vm below that average.
+
+        Returns
+        -------
+        np.ndarray
+            The pre spike min point of each spike. On error this is not
+            the final pre min (see code) but is still used by
+            downstream features like the EDD fit.
+        """
+        dDict = self._detectionDict
+        filteredVm = self.fileLoader.sweepY_filtered
+
+        mdp_pnts = int(self.fileLoader.ms2Pnt_(dDict["mdp_ms"]))
+
+        # small window to average Vm to calculate MDP (itself in a window before spike)
+        avgWindow_pnts = self.fileLoader.ms2Pnt_(dDict["avgWindow_ms"])
+        avgWindow_pnts = math.floor(avgWindow_pnts / 2)  # can be 0 !!!
+
+        # pre spike min
+        # other algorithms look between spike[i-1] and spike[i]
+        # here we are looking in a predefined window
+        startPnts = spikeTimes - mdp_pnts
+        underRun = startPnts < 0
+        startPnts[underRun] = 0
+        for i in np.nonzero(underRun)[0]:
+            errorType = "Pre spike min under-run (mdp)"
+            errorStr = "Went past startPnt 0 searching for pre-spike min"
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+        preMinPnts = sanpy.analysisUtil.windowArgMin(filteredVm, startPnts, spikeTimes)
+        noPreMin = preMinPnts < 0
+        # relative to startPnt, like argmin(filteredVm[startPnt:spikeTime])
+        preMinPnts -= startPnts
+        # 20220926, happend when we have no scale and mdp_pnts=0
+        # TODO: fix this mess, lots of code below relies on preMinPnt
+        preMinPnts[noPreMin] = startPnts[noPreMin]
+        for i in np.nonzero(noPreMin)[0]:
+            errorType = "Pre spike min 0 (mdp)"
+            errorStr = f"Did not find preMinPnt mdp_pnts:{mdp_pnts} startPnt:{startPnts[i]} spikeTimes[i]:{spikeTimes[i]}"
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+        # 20230924, avgMinPnts is coming up zero now that we have sampling dt for kymographs that are slow !!!
+        if avgWindow_pnts < 1:
+            for i in range(len(spikeTimes)):
+                errorType = "mdp error"
+                errorStr = "avgWindow_pnts"
+                self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+            return preMinPnts
+
+        preMinPnts += startPnts
+
+        # the pre min is actually an average around the real minima
+        avgStartPnts = preMinPnts - avgWindow_pnts
+        inRange = (avgStartPnts >= 0) & (
+            preMinPnts + avgWindow_pnts <= len(filteredVm)
+        )
+        preMinVals = np.empty(len(spikeTimes), dtype=np.mean(filteredVm[0:1]).dtype)
+        preMinVals[inRange] = sanpy.analysisUtil.windowMean(
+            filteredVm, avgStartPnts[inRange], 2 * avgWindow_pnts
+        )
+        for i in np.nonzero(~inRange)[0]:
+            # keep slice semantics at the start and end of the recording
+            avgRange = filteredVm[
+                preMinPnts[i] - avgWindow_pnts : preMinPnts[i] + avgWindow_pnts
+            ]
+            preMinVals[i] = np.average(avgRange)
+
+        # search backward from spike to find when vm reaches preMinVal (avg)
+        lastBelow = sanpy.analysisUtil.windowLastBelow(
+            filteredVm, preMinPnts, spikeTimes, preMinVals
+        )
+        found = lastBelow >= 0
+        preMinPnts[found] = lastBelow[found] + 1
+        foundRows = np.nonzero(found)[0]
+        if len(foundRows) > 0:
+            spikeDict.setColumn("preMinPnt", preMinPnts[found], rows=foundRows)
+            spikeDict.setColumn("preMinVal", preMinVals[found], rows=foundRows)
+        for i in np.nonzero(~found)[0]:
+            errorType = "Pre spike min (mdp)"
+            errorStr = "Did not find preMinVal: " + str(round(preMinVals[i], 3))
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+        return preMinPnts
+
+    def _spikeFeatures_edd(self, spikeDict, spikeTimes: np.ndarray, preMinPnts: np.ndarray):
+        """Get the early diastolic duration (EDD) for all spikes in one sweep.
+
+        The nonlinear late diastolic depolarization phase was
+        estimated as the duration between 1% and 10% dV/dt
+        linear fit on 10% - 50% of the time from preMinPnt to spike threshold
+        """
+        if len(spikeTimes) == 0:
+            return
+
+        dDict = self._detectionDict
+        sweepX = self.fileLoader.sweepX
+        filteredVm = self.fileLoader.sweepY_filtered
+
+        startLinearFit = 0.1  # percent of time between pre spike min and AP peak
+        stopLinearFit = 0.5  #
+        timeInterval_pnts = spikeTimes - preMinPnts
+        # taking round() so we always get an integer # points
+        preLinearFitPnt0 = preMinPnts + np.round(timeInterval_pnts * startLinearFit).astype(np.int64)
+        preLinearFitPnt1 = preMinPnts + np.round(timeInterval_pnts * stopLinearFit).astype(np.int64)
+
+        # linear fit before spike
+        spikeDict.setColumn("preLinearFitPnt0", preLinearFitPnt0)
+        spikeDict.setColumn("preLinearFitPnt1", preLinearFitPnt1)
+        spikeDict.setColumn(
+            "earlyDiastolicDuration_ms",
+            self.fileLoader.pnt2Ms_(preLinearFitPnt1 - preLinearFitPnt0),
+        )
+        spikeDict.setColumn("preLinearFitVal0", filteredVm[preLinearFitPnt0])
+        spikeDict.setColumn("preLinearFitVal1", filteredVm[preLinearFitPnt1])
+
+        # a linear fit where 'm,b = np.polyfit(x, y, 1)'
+        # m*x+b"
+        mLinear, _, numFitPnts = sanpy.analysisUtil.windowLinearFit(
+            sweepX, filteredVm, preLinearFitPnt0, preLinearFitPnt1
+        )
+        spikeDict.setColumn("earlyDiastolicDurationRate", mLinear)
+
+        lowestEddRate = dDict["lowEddRate_warning"]  # 8
+        errorType = "Fit EDD"
+        badFit = np.isnan(mLinear) | (mLinear <= lowestEddRate)
+        for i in np.nonzero(badFit)[0]:
+            if numFitPnts[i] < 2:
+                # xFit/yFit turn up empty when mdp and TOP points are within 1 point
+                errorStr = "Early diastolic duration rate fit - preMinPnt == spikePnt"
+            elif np.isnan(mLinear[i]):
+                # Polyfit may be poorly conditioned
+                errorStr = "Early diastolic duration rate fit - RankWarning"
+            else:
+                # todo: make an error if edd rate is too low
+                errorStr = f"Early diastolic duration rate fit - Too low {round(mLinear[i],3)}<={lowestEddRate}"
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+    def _spikeFeatures_dvdt(self, spikeDict, spikeTimes: np.ndarray, peakPnts: np.ndarray):
+        """Get max dV/dt before and min dV/dt after the peak for all spikes in one sweep."""
+        if len(spikeTimes) == 0:
+            return
+
+        dDict = self._detectionDict
+        filteredVm = self.fileLoader.sweepY_filtered
+        filteredDeriv = self.fileLoader.filteredDeriv
+
+        #
+        # maxima in dv/dt before spike (between TOP and peak)
+        maxPnts = sanpy.analysisUtil.windowArgMax(filteredDeriv, spikeTimes, peakPnts + 1)
+        found = maxPnts >= 0
+        foundRows = np.nonzero(found)[0]
+        if len(foundRows) > 0:
+            maxPnts = maxPnts[found]
+            spikeDict.setColumn("preSpike_dvdt_max_pnt", maxPnts, rows=foundRows)
+            spikeDict.setColumn(
+                "preSpike_dvdt_max_val", filteredVm[maxPnts], rows=foundRows
+            )  # in units mV
+            spikeDict.setColumn(
+                "preSpike_dvdt_max_val2", filteredDeriv[maxPnts], rows=foundRows
+            )  # in units dv/dt
+        for i in np.nonzero(~found)[0]:
+            # sometimes preRange is empty, don't try and put min/max in error
+            errorType = "Pre Spike dvdt"
+            errorStr = "Searching for dvdt max - ValueError"
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+        #
+        # minima in dv/dt after spike, in a fixed window after the peak
+        dvdtPostWindow_pnts = self.fileLoader.ms2Pnt_(dDict["dvdtPostWindow_ms"])
+        minPnts = sanpy.analysisUtil.windowArgMin(
+            filteredDeriv, peakPnts, peakPnts + dvdtPostWindow_pnts
+        )
+        if np.any(minPnts < 0):
+            raise ValueError(
+                "attempt to get argmin of an empty sequence (dvdtPostWindow_ms)"
+            )
+        spikeDict.setColumn("postSpike_dvdt_min_pnt", minPnts)
+        spikeDict.setColumn("postSpike_dvdt_min_val", filteredVm[minPnts])
+        spikeDict.setColumn("postSpike_dvdt_min_val2", filteredDeriv[minPnts])
+
+    def _spikeFeatures_halfWidth(
+        self, spikeDict, spikeTimes: np.ndarray, peakPnts: np.ndarray
+    ):
+        """Get half-widths for all spikes in one sweep and all halfHeights.
+
+        For each halfHeight, the falling point is the first point after the peak
+        (within halfWidthWindow_ms) below the half-height Vm. The rising point is
+        the first point between threshold and peak above Vm at the falling point.
+        """
+        numSpikes = len(spikeTimes)
+        if numSpikes == 0:
+            return
+
+        dDict = self._detectionDict
+        vm = self.fileLoader.sweepY_filtered
+        dataPointsPerMs = self.fileLoader.dataPointsPerMs
+        hwWindowPnts = dDict["halfWidthWindow_ms"] * dataPointsPerMs
+        hwWindowPnts = round(hwWindowPnts)
+        halfWidthWindow_ms = hwWindowPnts / dataPointsPerMs
+        halfHeightList = dDict["halfHeights"]
+        numHeights = len(halfHeightList)
+
+        thresholdVals = vm[spikeTimes]
+        spikeHeights = vm[peakPnts] - thresholdVals
+
+        # one row per (spike, halfHeight), spike major
+        thisVm = thresholdVals[:, None] + spikeHeights[:, None] * (
+            np.asarray(halfHeightList) * 0.01
+        )
+        thisVm = thisVm.ravel()
+        peakRows = np.repeat(peakPnts, numHeights)
+        thresholdRows = np.repeat(spikeTimes, numHeights)
+
+        fallingPnts = sanpy.analysisUtil.windowFirstBelow(
+            vm, peakRows, peakRows + hwWindowPnts, thisVm
+        )
+        risingPnts = np.full(len(fallingPnts), -1, dtype=np.int64)
+        foundFalling = np.nonzero(fallingPnts >= 0)[0]
+        risingPnts[foundFalling] = sanpy.analysisUtil.windowFirstAbove(
+            vm,
+            thresholdRows[foundFalling],
+            peakRows[foundFalling],
+            vm[fallingPnts[foundFalling]],
+        )
+        found = risingPnts >= 0
+        widthPnts = fallingPnts - risingPnts
+        widthMs = np.where(found, widthPnts / dataPointsPerMs, float("nan"))
+
+        widthsList = np.empty(numSpikes, dtype=object)
+        for i in range(numSpikes):
+            widthDictList = []
+            for j, halfHeight in enumerate(halfHeightList):
+                row = i * numHeights + j
+                if found[row]:
+                    widthDict = {
+                        "halfHeight": halfHeight,
+                        "risingPnt": risingPnts[row],
+                        "fallingPnt": fallingPnts[row],
+                        "widthPnts": widthPnts[row],
+                        "widthMs": widthMs[row],
+                    }
+                else:
+                    widthDict = {
+                        "halfHeight": halfHeight,
+                        "risingPnt": None,
+                        "fallingPnt": None,
+                        "widthPnts": None,
+                        "widthMs": float("nan"),
+                    }
+                widthDictList.append(widthDict)
+            widthsList[i] = widthDictList
+
+        # errors are appended per spike in halfHeight order
+        for row in np.nonzero(~found)[0]:
+            i, j = divmod(int(row), numHeights)
+            if fallingPnts[row] < 0:
+                # no falling pnts found within hwWindowPnts
+                tmpErrorType = "falling point"
+            else:
+                tmpErrorType = "rising point"
+            peakSec = self.fileLoader.pnt2Sec_(peakPnts[i])
+            errorType = "Spike Width"
+            errorStr = (
+                f'Half width {halfHeightList[j]} error in "{tmpErrorType}" '
+                f"with halfWidthWindow_ms:{halfWidthWindow_ms} "
+                f"searching for Vm:{round(thisVm[row],2)} from peak sec {round(peakSec,2)}"
+            )
+            self._appendSpikeError(spikeDict, i, spikeTimes[i], errorType, errorStr)
+
+        widthMs = widthMs.reshape(numSpikes, numHeights)
+        for j, halfHeight in enumerate(halfHeightList):
+            spikeDict.setColumn("widths_" + str(halfHeight), widthMs[:, j])
+        spikeDict.setColumn("widths", widthsList)
+
+    def _spikeFeatures_intervals(
+        self, spikeDict, spikeTimes: np.ndarray, preMinPnts: np.ndarray
+    ):
+        """Get diastolic duration, ISI and cycle length for all spikes in one sweep.
+
+        First spike in a sweep does not have ISI or cycle length.
+        """
+        numSpikes = len(spikeTimes)
+        if numSpikes == 0:
+            return
+
+        #
+        # diastolic duration was defined as the interval between MDP and TOP
+        # one off error when preMinPnt is not defined
+        spikeDict.setColumn(
+            "diastolicDuration_ms", self.fileLoader.pnt2Ms_(spikeTimes - preMinPnts)
+        )
+
+        # Cycle length was defined as the interval between MDPs in successive APs
+        cycleLength_ms = np.full(numSpikes, float("nan"))
+        if numSpikes > 1:
+            rows = np.arange(1, numSpikes)
+
+            # instantaneous spike frequency and ISI
+            isiPnts = np.diff(spikeTimes)
+            isi_ms = self.fileLoader.pnt2Ms_(isiPnts)
+            spikeDict.setColumn("isi_pnts", isiPnts, rows=rows)
+            spikeDict.setColumn("isi_ms", isi_ms, rows=rows)
+            spikeDict.setColumn("spikeFreq_hz", 1 / (isi_ms / 1000), rows=rows)
+
+            preMinPnt = spikeDict.getColumn("preMinPnt")  # can be nan
+            cycleLength_pnts = np.diff(preMinPnt)
+            cycleLength_ms[1:] = self.fileLoader.pnt2Ms_(cycleLength_pnts)
+            hasCycle = ~np.isnan(cycleLength_pnts)
+            if np.any(hasCycle):
+                spikeDict.setColumn(
+                    "cycleLength_pnts",
+                    cycleLength_pnts[hasCycle].astype(np.int64),
+                    rows=rows[hasCycle],
+                )
+        spikeDict.setColumn("cycleLength_ms", cycleLength_ms)
+
+    def _spikeDetect_dvdt(
+        self,
+        dDict: dict,
+        sweepNumber: int,
+        verbose: bool = False,
+        chunkState: Optional[dict] = None,
+    ):
         """
         Search for threshold crossings (dvdtThreshold) in first derivative (dV/dt) of membrane potential (Vm)
         append each threshold crossing (e.g. a spike) in self.spikeTimes list
 
+        chunkState is used when detecting in chunks, see _spikeDetectChunks().
+
         Returns:
             self.spikeTimes (pnts): the time before each threshold crossing when dv/dt crosses 15% of its max
             self.filteredVm:
@@ -1201,40 +1589,23 @@ class bAnalysis:
 
         #
         # reduce spike times based on start/stop
-        # logger.error('THIS IS a BUg if start sec is none then set to 0 !!!')
-        # THIS IS ABUG ... FIX
-        if dDict["startSeconds"] is not None and dDict["stopSeconds"] is not None:
-            startPnt = self.fileLoader.dataPointsPerMs * (
-                dDict["startSeconds"] * 1000
-            )  # seconds to pnt
-            stopPnt = self.fileLoader.dataPointsPerMs * (
-                dDict["stopSeconds"] * 1000
-            )  # seconds to pnt
-            tmpSpikeTimes = [
-                spikeTime
-                for spikeTime in spikeTimes0
-                if (spikeTime >= startPnt and spikeTime <= stopPnt)
-            ]
-            spikeTimes0 = tmpSpikeTimes
+        spikeTimes0 = self._selectCrossings(spikeTimes0, dDict, chunkState)
 
         #
         # throw out all spikes that are below a threshold Vm (usually below -20 mV)
         peakWindow_pnts = self.fileLoader.ms2Pnt_(dDict["peakWindow_ms"])
         # peakWindow_pnts = self.dataPointsPerMs * dDict['peakWindow_ms']
         # peakWindow_pnts = round(peakWindow_pnts)
-        goodSpikeTimes = []
         sweepY = self.fileLoader.sweepY
-        for spikeTime in spikeTimes0:
-            # wu-lab-stanford data
-            try:
-                peakVal = np.max(sweepY[spikeTime : spikeTime + peakWindow_pnts])
-                if peakVal > dDict["mvThreshold"]:
-                    goodSpikeTimes.append(spikeTime)
-            except (ValueError) as e:
-                logger.error(e)
-                logger.error(f'   spikeTime:{spikeTime} peakWindow_pnts:{peakWindow_pnts}')
-                logger.error(f'   _dataPointsPerMs: {self.fileLoader._dataPointsPerMs}')
-        spikeTimes0 = goodSpikeTimes
+        peakPnts, peakVals = sanpy.analysisUtil.windowPeaks(
+            sweepY, spikeTimes0, peakWindow_pnts
+        )
+        for spikeTime in spikeTimes0[peakPnts < 0]:
+            logger.error(
+                f"No peak window for spikeTime:{spikeTime} peakWindow_pnts:{peakWindow_pnts}"
+            )
+            logger.error(f"   _dataPointsPerMs: {self.fileLoader._dataPointsPerMs}")
+        spikeTimes0 = spikeTimes0[peakVals > dDict["mvThreshold"]]
 
         #
         # throw out spike that are not upward deflections of Vm
@@ -1254,7 +1625,10 @@ class bAnalysis:
         # if there are doubles, throw-out the second one
         spikeTimeErrors = None
         spikeTimes0, ignoreSpikeErrors = self._throwOutRefractory(
-            spikeTimes0, spikeTimeErrors, refractory_ms=dDict["refractory_ms"]
+            spikeTimes0,
+            spikeTimeErrors,
+            refractory_ms=dDict["refractory_ms"],
+            chunkState=chunkState,
         )
 
         # logger.warning('REMOVED SPIKE TOP AS % OF DVDT')
@@ -1267,83 +1641,43 @@ class bAnalysis:
         window_pnts = dDict["dvdtPreWindow_ms"] * self.fileLoader.dataPointsPerMs
         # abb 20210130 lcr analysis
         window_pnts = round(window_pnts)
-        spikeTimes1 = []
-        spikeErrorList1 = []
         filteredDeriv = self.fileLoader.filteredDeriv
-        for i, spikeTime in enumerate(spikeTimes0):
-            # get max in derivative
-
-            preDerivClip = filteredDeriv[
-                spikeTime - window_pnts : spikeTime
-            ]  # backwards
-            postDerivClip = filteredDeriv[
-                spikeTime : spikeTime + window_pnts
-            ]  # forwards
-
-            if len(preDerivClip) == 0:
-                print(
-                    "FIX ERROR: spikeDetect_dvdt()",
-                    "spike",
-                    i,
-                    "at pnt",
-                    spikeTime,
-                    "window_pnts:",
-                    window_pnts,
-                    "dvdtPreWindow_ms:",
-                    dDict["dvdtPreWindow_ms"],
-                    "len(preDerivClip)",
-                    len(preDerivClip),
-                )  # preDerivClip = np.flip(preDerivClip)
-
-            # look for % of max in dvdt
-            try:
-                # peakPnt = np.argmax(preDerivClip)
-                peakPnt = np.argmax(postDerivClip)
-                # peakPnt += spikeTime-window_pnts
-                peakPnt += spikeTime
-                peakVal = filteredDeriv[peakPnt]
-
-                percentMaxVal = (
-                    peakVal * dDict["dvdt_percentOfMax"]
-                )  # value we are looking for in dv/dt
-                preDerivClip = np.flip(preDerivClip)  # backwards
-                tmpWhere = np.where(preDerivClip < percentMaxVal)
-                # print('tmpWhere:', type(tmpWhere), tmpWhere)
-                tmpWhere = tmpWhere[0]
-                if len(tmpWhere) > 0:
-                    threshPnt2 = np.where(preDerivClip < percentMaxVal)[0][0]
-                    threshPnt2 = (spikeTime) - threshPnt2
-                    # print('i:', i, 'spikeTime:', spikeTime, 'peakPnt:', peakPnt, 'threshPnt2:', threshPnt2)
-                    threshPnt2 -= 1  # backup by 1 pnt
-                    spikeTimes1.append(threshPnt2)
-                    spikeErrorList1.append(None)
+        spikeTimes0 = np.asarray(spikeTimes0, dtype=np.int64)
+        threshPnts, peakVals = sanpy.analysisUtil.percentOfMaxPnts(
+            filteredDeriv, spikeTimes0, window_pnts, dDict["dvdt_percentOfMax"]
+        )
+        for i in np.nonzero(spikeTimes0 - window_pnts < 0)[0]:
+            logger.error(
+                f"spike {i} at pnt {spikeTimes0[i]} has no dvdtPreWindow_ms:{dDict['dvdtPreWindow_ms']}"
+            )
 
-                else:
-                    errorType = "dvdt Percent"
-                    errStr = f"Did not find dvdt_percentOfMax: {dDict['dvdt_percentOfMax']} peak dV/dt is {round(peakVal,2)}"
-                    eDict = self._getErrorDict(
-                        i, spikeTime, errorType, errStr
-                    )  # spikeTime is in pnts
-                    spikeErrorList1.append(eDict)
-                    # always append, do not REJECT spike if we can't find % in dv/dt
-                    spikeTimes1.append(spikeTime)
-            except (IndexError, ValueError) as e:
-                ##
-                print(
-                    "   FIX ERROR: bAnalysis.spikeDetect_dvdt() looking for dvdt_percentOfMax"
-                )
-                print("      ", "IndexError for spike", i, spikeTime)
-                print("      ", e)
-                # always append, do not REJECT spike if we can't find % in dv/dt
-                spikeTimes1.append(spikeTime)
+        # always keep spike, do not REJECT spike if we can't find % in dv/dt
+        found = threshPnts >= 0
+        spikeTimes1 = list(np.where(found, threshPnts, spikeTimes0))
+        spikeErrorList1 = [None] * len(spikeTimes1)
+        for i in np.nonzero(~found & ~np.isnan(peakVals))[0]:
+            errorType = "dvdt Percent"
+            errStr = f"Did not find dvdt_percentOfMax: {dDict['dvdt_percentOfMax']} peak dV/dt is {round(peakVals[i],2)}"
+            eDict = self._getErrorDict(
+                int(i), spikeTimes0[i], errorType, errStr
+            )  # spikeTime is in pnts
+            spikeErrorList1[i] = eDict
 
         return spikeTimes1, spikeErrorList1
 
-    def _spikeDetect_vm(self, dDict: dict, sweepNumber: int, verbose: bool = False):
+    def _spikeDetect_vm(
+        self,
+        dDict: dict,
+        sweepNumber: int,
+        verbose: bool = False,
+        chunkState: Optional[dict] = None,
+    ):
         """
         spike detect using Vm threshold and NOT dvdt
         append each threshold crossing (e.g. a spike) in self.spikeTimes list
 
+        chunkState is used when detecting in chunks, see _spikeDetectChunks().
+
         Returns:
             self.spikeTimes (pnts): the time before each threshold crossing when dv/dt crosses 15% of its max
             self.filteredVm:
@@ -1358,19 +1692,7 @@ class bAnalysis:
 
         #
         # reduce spike times based on start/stop
-        if dDict["startSeconds"] is not None and dDict["stopSeconds"] is not None:
-            startPnt = self.fileLoader.dataPointsPerMs * (
-                dDict["startSeconds"] * 1000
-            )  # seconds to pnt
-            stopPnt = self.fileLoader.dataPointsPerMs * (
-                dDict["stopSeconds"] * 1000
-            )  # seconds to pnt
-            tmpSpikeTimes = [
-                spikeTime
-                for spikeTime in spikeTimes0
-                if (spikeTime >= startPnt and spikeTime <= stopPnt)
-            ]
-            spikeTimes0 = tmpSpikeTimes
+        spikeTimes0 = self._selectCrossings(spikeTimes0, dDict, chunkState)
 
         spikeErrorList = [None] * len(spikeTimes0)
 
@@ -1391,40 +1713,29 @@ class bAnalysis:
 
         #
         # throw out spike that are NOT upward deflections of Vm
-        tmpLastGoodSpike_pnts = None
         # minISI_pnts = 5000 # at 20 kHz this is 0.25 sec
         minISI_ms = 75  # 250
         minISI_pnts = self.fileLoader.ms2Pnt_(minISI_ms)
 
         prePntUp = 10  # pnts
-        goodSpikeTimes = []
-        goodSpikeErrors = []
         sweepY = self.fileLoader.sweepY
-        for tmpIdx, spikeTime in enumerate(spikeTimes0):
-            tmpFuckPreClip = sweepY[
-                spikeTime - prePntUp : spikeTime
-            ]  # not including the stop index
-            tmpFuckPostClip = sweepY[
-                spikeTime + 1 : spikeTime + prePntUp + 1
-            ]  # not including the stop index
-            preAvg = np.average(tmpFuckPreClip)
-            postAvg = np.average(tmpFuckPostClip)
-            if postAvg > preAvg:
-                # tmpSpikeTimeSec = self.fileLoader.pnt2Sec_(spikeTime)
-                if (
-                    tmpLastGoodSpike_pnts is not None
-                    and (spikeTime - tmpLastGoodSpike_pnts) < minISI_pnts
-                ):
-                    continue
-                goodSpikeTimes.append(spikeTime)
-                goodSpikeErrors.append(spikeErrorList[tmpIdx])
-                tmpLastGoodSpike_pnts = spikeTime
-            else:
-                tmpSpikeTimeSec = self.fileLoader.pnt2Sec_(spikeTime)
+        spikeTimes0 = np.asarray(spikeTimes0, dtype=np.int64)
+        goodIdx = np.nonzero(
+            sanpy.analysisUtil.risingPhaseMask(sweepY, spikeTimes0, prePntUp)
+        )[0]
+        # remove upward deflections within minISI_pnts of the previous one
+        goodIdx = goodIdx[
+            self._refractoryMask(spikeTimes0[goodIdx], minISI_pnts, chunkState, "minISI")
+        ]
+        goodSpikeTimes = list(spikeTimes0[goodIdx])
+        goodSpikeErrors = [spikeErrorList[i] for i in goodIdx]
 
         # todo: add this to spikeDetect_dvdt()
         goodSpikeTimes, goodSpikeErrors = self._throwOutRefractory(
-            goodSpikeTimes, goodSpikeErrors, refractory_ms=dDict["refractory_ms"]
+            goodSpikeTimes,
+            goodSpikeErrors,
+            refractory_ms=dDict["refractory_ms"],
+            chunkState=chunkState,
         )
         spikeTimes0 = goodSpikeTimes
         spikeErrorList = goodSpikeErrors
@@ -1432,13 +1743,52 @@ class bAnalysis:
         #
         return spikeTimes0, spikeErrorList
 
-    def spikeDetect(self, detectionDict: dict):
+    def spikeDetect(
+        self,
+        detectionDict: dict,
+        workers: int = 1,
+        chunkSec: Optional[float] = None,
+        progressCallback: Optional[Callable[[int, int, float], Optional[bool]]] = None,
+    ) -> bool:
         """Run spike detection for all sweeps.
 
         Each spike is a row and has 'sweep'
 
         Args:
             detectionDict: From sanpy.bDetection
+            workers: Number of worker processes to detect sweeps in parallel.
+                Use 1 (default) to detect one sweep after another, None to use all cores.
+            chunkSec: If not None, detect each sweep in chunks of chunkSec seconds.
+                Use with bAnalysis(lazy=True) to only read and filter one chunk
+                at a time, for recordings that do not fit in memory.
+                Chunks are detected one after another, workers is ignored.
+            progressCallback: Called with (sweepNumber, numSweeps, sweepFraction)
+                while sweepNumber is detected, sweepFraction is the part of the sweep
+                that is done (1 when the sweep is done). Called after each detection
+                stage or chunk of a sweep, return False to cancel.
+
+        Returns:
+            False if detection was cancelled by progressCallback, this bAnalysis is
+            then not changed.
+        """
+
+        # detect on a copy so a cancelled detection leaves this bAnalysis as it was
+        baCopy = self.getDetectionCopy()
+        if not baCopy._spikeDetect(detectionDict, workers, chunkSec, progressCallback):
+            return False
+        self.applyDetection(baCopy)
+        return True
+
+    def _spikeDetect(
+        self,
+        detectionDict: dict,
+        workers: int = 1,
+        chunkSec: Optional[float] = None,
+        progressCallback: Optional[Callable[[int, int, float], Optional[bool]]] = None,
+    ) -> bool:
+        """Run spike detection for all sweeps, changing this bAnalysis as it goes.
+
+        See spikeDetect(). If cancelled, the analysis is incomplete.
         """
 
         rememberSweep = (
@@ -1467,46 +1817,462 @@ class bAnalysis:
 
         # self._spikesPerSweep = [0] * self.fileLoader.numSweeps
 
-        for sweepNumber in self.fileLoader.sweepList:
-            # self.setSweep(sweep)
-            self._spikeDetect2(sweepNumber)
+        self._detectionTimes = {}
 
-        #
-        self.fileLoader.setSweep(rememberSweep)
+        # detect all sweeps, then finalize once (user analysis and reports)
+        if workers is None:
+            workers = os.cpu_count()
+        numSweeps = self.fileLoader.numSweeps
 
-        stopTime = time.time()
+        def progress(sweepNumber: int, sweepFraction: float):
+            if progressCallback is None:
+                return
+            if progressCallback(sweepNumber, numSweeps, sweepFraction) is False:
+                raise _DetectionCancelled(sweepNumber)
 
-        if detectionDict["verbose"]:
-            logger.info(
-                f"Detected {len(self.spikeDict)} spikes in {round(stopTime-startTime,3)} seconds"
-            )
+        try:
+            if chunkSec is not None:
+                # filter shown after detection, chunks filter their own points
+                self._getFilteredRecording()
+                for sweepNumber in self.fileLoader.sweepList:
+                    self._spikeDetectChunks(
+                        sweepNumber, chunkSec, partial(progress, sweepNumber)
+                    )
+            elif workers > 1 and self.fileLoader.numSweeps > 1:
+                self._spikeDetectPool(workers, progress)
+            else:
+                for sweepNumber in self.fileLoader.sweepList:
+                    # self.setSweep(sweep)
+                    spikeDict = self._spikeDetectSweep(
+                        sweepNumber, progress=partial(progress, sweepNumber)
+                    )
+                    if spikeDict is not None:
+                        self.spikeDict.appendAnalysis(spikeDict)
+        except _DetectionCancelled as e:
+            logger.info(f"Detection was cancelled in sweep {e.args[0]}")
+            self.fileLoader.setSweep(rememberSweep)
+            return False
+        self._detectionTimes["detect"] = time.time() - startTime
 
-    def _spikeDetect2(self, sweepNumber: int):
-        """Detect all spikes in one sweep.
+        self._finalizeAnalysis()
 
-         Populate bAnalysisResult.py.
+        #
+        self.fileLoader.setSweep(rememberSweep)
 
-        Notes
-        -----
-        First spike in a sweep cannot have interval statistics like freq or isi
+        stopTime = time.time()
+
+        if detectionDict["verbose"]:
+            logger.info(
+                f"Detected {len(self.spikeDict)} spikes in {round(stopTime-startTime,3)} seconds"
+            )
+            for stage, seconds in self._detectionTimes.items():
+                logger.info(f"  {stage}: {round(seconds,3)} seconds")
+
+        return True
+
+    # set by spikeDetect(), taken from a detection copy by applyDetection()
+    _detectionAttributes = (
+        "spikeDict",
+        "_detectionDict",
+        "_isAnalyzed",
+        "_detectionTimes",
+        "_detectionDirty",
+        "_candidateCache",
+        "_dfReportForScatter",
+        "dfError",
+        "dateAnalyzed",
+        "spikeClips",
+        "spikeClips_x",
+        "spikeClips_x2",
+    )
+
+    def getDetectionCopy(self) -> "bAnalysis":
+        """Get a copy of this bAnalysis to detect spikes without changing this one.
+
+        The copy shares the recording and has its own filtered recording and
+        current sweep. Used to detect spikes in a background thread, then
+        applyDetection() takes the new analysis in one step.
+        """
+        baCopy = copy.copy(self)
+        baCopy._fileLoader = self.fileLoader.getAnalysisCopy()
+        baCopy._candidateCache = dict(self._candidateCache)
+        return baCopy
+
+    def applyDetection(self, baCopy: "bAnalysis"):
+        """Take the analysis of a copy from getDetectionCopy() after its spikeDetect().
+
+        Only the detection results are taken (see _detectionAttributes).
+        Everything else, like meta data and the current sweep, is kept.
+        """
+        detectionResults = {
+            attribute: getattr(baCopy, attribute)
+            for attribute in self._detectionAttributes
+        }
+        self.__dict__.update(detectionResults)
+        self.fileLoader.setFilteredFrom(baCopy.fileLoader)
+
+    @property
+    def detectionTimes(self) -> Dict[str, float]:
+        """Seconds for each stage of the last spikeDetect().
+
+        Keys are 'detect', 'userAnalysis', 'dataFrame' and 'errorReport'.
+        """
+        return dict(self._detectionTimes)
+
+    def sweepDetection(
+        self,
+        grid: Dict[str, list],
+        detectionDict: Optional[dict] = None,
+        statList: Optional[List[str]] = None,
+        workers: int = 1,
+    ) -> Optional[pd.DataFrame]:
+        """Detect spikes for each combination of detection parameters.
+
+        Use to tune detection presets. Combinations are detected in the order of
+        the detection stages (see getDetectionStages()) so the filtered recording
+        and candidate spikes are shared by combinations that only differ in a later stage.
+        The analysis of this bAnalysis is not changed.
+
+        Parameters
+        ----------
+        grid : dict
+            bDetection keys with a list of values for each,
+            like {'dvdtThreshold': [10, 20], 'refractory_ms': [50, 100]}
+        detectionDict : dict
+            Detection parameters for keys not in grid, if None use the last detection.
+        statList : list of str
+            Analysis results to summarize, default is ['thresholdVal', 'peakVal', 'spikeFreq_hz']
+        workers : int
+            Number of worker processes, each detects a share of the combinations.
+            Use 1 (default) to detect in this process, None to use all cores.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per combination with the grid values, numSpikes, numErrors
+            and <stat>_mean, <stat>_std for each stat in statList.
+        """
+        if detectionDict is None:
+            detectionDict = self._detectionDict
+        if detectionDict is None:
+            logger.error("No detection parameters, specify detectionDict")
+            return None
+        if statList is None:
+            statList = ["thresholdVal", "peakVal", "spikeFreq_hz"]
+
+        # keys of early stages vary slowest
+        stageKeys = [key for keys in getDetectionStages().values() for key in keys]
+        gridKeys = sorted(
+            grid.keys(),
+            key=lambda key: stageKeys.index(key) if key in stageKeys else len(stageKeys),
+        )
+        paramList = [
+            dict(zip(gridKeys, values))
+            for values in itertools.product(*[grid[key] for key in gridKeys])
+        ]
+
+        if workers is None:
+            workers = os.cpu_count()
+        workers = min(workers, len(paramList))
+        if workers > 1 and self.fileLoader.lazy:
+            logger.warning("Workers need a loaded (not lazy) file, detecting in this process")
+            workers = 1
+
+        if workers <= 1:
+            rowList = _sweepDetectionWorker(
+                self.fileLoader, detectionDict, paramList, statList
+            )
+        else:
+            # contiguous shares keep combinations that share stages in one worker
+            shares = np.array_split(np.arange(len(paramList)), workers)
+            with Pool(processes=workers) as pool:
+                result_objs = []
+                for share in shares:
+                    workerParams = (
+                        self.fileLoader,
+                        detectionDict,
+                        [paramList[i] for i in share],
+                        statList,
+                    )
+                    result = pool.apply_async(_sweepDetectionWorker, workerParams)
+                    result_objs.append(result)
+
+                rowList = [row for result in result_objs for row in result.get()]
+
+        # the file loader is shared, go back to the filtered recording of our detection
+        if self._detectionDict is not None:
+            self._getFilteredRecording()
+
+        return pd.DataFrame(rowList)
+
+    def _spikeDetectPool(
+        self, workers: int, progress: Optional[Callable[[int, float], None]] = None
+    ):
+        """Detect spikes in all sweeps with a pool of worker processes.
+
+        Each worker gets one sweep (see fileLoader_base.getSweepLoader).
+        Results are appended in sweep order so spike numbers are the
+        same as detecting one sweep after another.
+
+        progress is called with (sweepNumber, sweepFraction) while waiting for
+        each sweep, if it raises the pool and its workers are terminated.
+        """
+        # the filtered recording of all sweeps, workers only filter their sweep
+        self._getFilteredRecording()
+
+        with Pool(processes=min(workers, self.fileLoader.numSweeps)) as pool:
+            result_objs = []
+            for sweepNumber in self.fileLoader.sweepList:
+                sweepLoader = self.fileLoader.getSweepLoader(sweepNumber)
+                workerParams = (sweepLoader, self._detectionDict)
+                result = pool.apply_async(_spikeDetectWorker, workerParams)
+                result_objs.append(result)
+
+            results = []
+            for sweepNumber, result in zip(self.fileLoader.sweepList, result_objs):
+                while not result.ready():
+                    result.wait(0.1)
+                    if progress is not None:
+                        progress(sweepNumber, 0.0)
+                results.append(result.get())
+                if progress is not None:
+                    progress(sweepNumber, 1.0)
+
+        self.dateAnalyzed = datetime.datetime.now().strftime("%Y%m%d")
+
+        for sweepNumber, spikeDict in zip(self.fileLoader.sweepList, results):
+            if spikeDict is None:
+                continue
+            if len(spikeDict) > 0:
+                # worker detected sweep 0 of a one sweep file loader
+                spikeDict.setColumn("sweep", sweepNumber)
+                spikeDict.setColumn(
+                    "spikeNumber", self.numSpikes + np.arange(len(spikeDict))
+                )
+            self.spikeDict.appendAnalysis(spikeDict)
+
+    def _getChunkPadding(self) -> Tuple[int, int]:
+        """Get the points needed before and after a chunk to detect the spikes in it.
+
+        Covers the filters and the windows each candidate and spike feature
+        searches, see _spikeDetectChunks(). The refractory period is not
+        needed, it continues from the previous chunk.
+
+        Returns
+        -------
+        (prePnts, postPnts)
+        """
+        dDict = self._detectionDict
+
+        # edge effects of filtering both vm and its derivative
+        filterPnts = dDict["medianFilter"] + dDict["SavitzkyGolay_pnts"] + 2
+
+        # mv detection backs up spike times (_backupSpikeVm)
+        pre_ms = (
+            dDict["dvdtPreWindow_ms"]
+            + dDict["mdp_ms"]
+            + dDict["avgWindow_ms"]
+            + 25
+        )
+        post_ms = (
+            dDict["dvdtPreWindow_ms"]
+            + dDict["peakWindow_ms"]
+            + max(dDict["halfWidthWindow_ms"], dDict["dvdtPostWindow_ms"])
+        )
+        prePnts = self.fileLoader.ms2Pnt_(pre_ms) + filterPnts
+        postPnts = self.fileLoader.ms2Pnt_(post_ms) + filterPnts
+        return prePnts, postPnts
+
+    def _spikeDetectChunks(
+        self,
+        sweepNumber: int,
+        chunkSec: float,
+        progress: Optional[Callable[[float], None]] = None,
+    ):
+        """Detect spikes in one sweep, one chunk of chunkSec at a time.
+
+        Each chunk is detected with the points before and after it that its
+        spikes need (see _getChunkPadding). Each threshold crossing belongs to
+        the chunk it is in. The refractory periods continue from the last good
+        spike of the previous chunk, so spikes are the same as detecting the
+        whole sweep. Spike points are shifted into the sweep and appended to
+        self.spikeDict as each chunk finishes.
+
+        progress is called with the part of the sweep that is done after each chunk.
+        """
+        fileLoader = self.fileLoader
+        dDict = self._detectionDict
+
+        numPnts = fileLoader.numPnts
+        chunkPnts = max(fileLoader.ms2Pnt_(chunkSec * 1000), 1)
+        prePnts, postPnts = self._getChunkPadding()
+
+        epochTable = fileLoader.getEpochTable(sweepNumber)
+
+        # last good spike (pnt in sweep) of each refractory period, see _refractoryMask()
+        lastGoodPnt = {}
+
+        sweepSpikeNumber = 0
+        lastThresholdPnt = None
+        lastPreMinPnt = float("nan")
+        for chunkStart in range(0, numPnts, chunkPnts):
+            chunkStop = min(chunkStart + chunkPnts, numPnts)
+            startPnt = max(chunkStart - prePnts, 0)
+            stopPnt = min(chunkStop + postPnts, numPnts)
+
+            chunkState = {
+                "offsetPnt": startPnt,
+                "startPnt": chunkStart,
+                "stopPnt": chunkStop,
+                "lastGoodPnt": lastGoodPnt,
+            }
+
+            chunkLoader = fileLoader.getChunkLoader(sweepNumber, startPnt, stopPnt)
+            chunkBa = bAnalysis(fileLoader=chunkLoader, loadData=False)
+            chunkBa._detectionDict = dDict
+            spikeDict = chunkBa._spikeDetectSweep(0, chunkState)
+            # free the chunk now, its bAnalysis and file loader reference each other
+            chunkLoader._sweepY = None
+            chunkLoader._filteredY = None
+            chunkLoader._filteredDeriv = None
+            chunkLoader._derivativeCache.clear()
+            if spikeDict is None:
+                # unknown detection type
+                return
+            if progress is not None:
+                progress(chunkStop / numPnts)
+            numSpikes = len(spikeDict)
+            if numSpikes == 0:
+                continue
+
+            thresholdPnts = spikeDict.getColumn("thresholdPnt").astype(np.int64) + startPnt
+
+            #
+            # shift points from the chunk into the sweep
+            for key in [
+                "thresholdPnt",
+                "peakPnt",
+                "preMinPnt",
+                "preLinearFitPnt0",
+                "preLinearFitPnt1",
+                "preSpike_dvdt_max_pnt",
+                "postSpike_dvdt_min_pnt",
+            ]:
+                values = spikeDict.getColumn(key)
+                goodRows = np.nonzero(~np.isnan(values))[0]
+                if len(goodRows) > 0:
+                    spikeDict.setColumn(
+                        key, values[goodRows].astype(np.int64) + startPnt, rows=goodRows
+                    )
+            for widths in spikeDict.getColumn("widths"):
+                for widthDict in widths:
+                    for key in ["risingPnt", "fallingPnt"]:
+                        if widthDict[key] is not None:
+                            widthDict[key] += startPnt
+
+            if epochTable is not None:
+                epochs = [epochTable.findEpoch(spikeTime) for spikeTime in thresholdPnts]
+                spikeDict.setColumn("epoch", epochs)
+                spikeDict.setColumn(
+                    "epochLevel", [epochTable.getLevel(epoch) for epoch in epochs]
+                )
+
+            spikeDict.setColumn("sweep", sweepNumber)
+            sweepSpikeNumbers = sweepSpikeNumber + np.arange(numSpikes)
+            spikeDict.setColumn("sweepSpikeNumber", sweepSpikeNumbers)
+            spikeDict.setColumn("spikeNumber", self.numSpikes + np.arange(numSpikes))
+            for errors in spikeDict.getColumn("errors"):
+                for error in errors:
+                    error["Spike"] += sweepSpikeNumber
+
+            #
+            # intervals to the last spike of the previous chunk
+            preMinPnts = spikeDict.getColumn("preMinPnt")
+            if lastThresholdPnt is not None:
+                firstSpike = spikeDict[0]
+                isiPnts = int(thresholdPnts[0] - lastThresholdPnt)
+                isi_ms = fileLoader.pnt2Ms_(isiPnts)
+                firstSpike["isi_pnts"] = isiPnts
+                firstSpike["isi_ms"] = isi_ms
+                firstSpike["spikeFreq_hz"] = 1 / (isi_ms / 1000)
+                cycleLength_pnts = preMinPnts[0] - lastPreMinPnt
+                firstSpike["cycleLength_ms"] = fileLoader.pnt2Ms_(cycleLength_pnts)
+                if not np.isnan(cycleLength_pnts):
+                    firstSpike["cycleLength_pnts"] = int(cycleLength_pnts)
+            lastThresholdPnt = thresholdPnts[-1]
+            lastPreMinPnt = preMinPnts[-1]
+
+            self.spikeDict.appendAnalysis(spikeDict)
+            sweepSpikeNumber += numSpikes
+
+        self.dateAnalyzed = datetime.datetime.now().strftime("%Y%m%d")
+
+    def _spikeDetect2(self, sweepNumber: int):
+        """Detect all spikes in one sweep and append them to self.spikeDict.
 
         Parameters
         ----------
         sweepNumber : int
         """
+        spikeDict = self._spikeDetectSweep(sweepNumber)
+        if spikeDict is None:
+            return
+        self._appendSweepAnalysis(spikeDict)
+
+    def _getCandidates(self, sweepNumber: int) -> Optional[tuple]:
+        """Get the candidate spikes of one sweep and their peaks.
+
+        Runs the (filter, crossings, candidates) stages of detection, see getDetectionStages().
+        Candidates are cached per sweep and reused while the bDetection keys
+        of these stages and the filtered recording do not change.
+
+        Returns
+        -------
+        tuple
+            (spikeTimes, spikeErrorList, peakPnts, peakVals),
+            None if detection type is unknown.
+        """
         dDict = self._detectionDict
+        stageValues = {
+            key: dDict.get(key)
+            for stageKeys in getDetectionStages().values()
+            for key in stageKeys
+        }
+        # all sweeps (the current sweep when lazy), a new array when
+        # filter parameters or the loaded data change
+        self.fileLoader._getFilteredColumn()
+        filteredDeriv = self.fileLoader._filteredDeriv
 
-        # a list of dict of sanpy.bAnalysisResults.analysisResult (one dict per spike)
-        spikeDict = sanpy.bAnalysisResults.analysisResultList()
+        cached = self._candidateCache.get(sweepNumber)
+        if (
+            cached is None
+            or cached["detection"] != stageValues
+            or cached["filteredDeriv"]() is not filteredDeriv
+        ):
+            candidates = self._spikeDetectCandidates(sweepNumber)
+            if candidates is None:
+                return
+            # a weak reference, do not keep old filtered recordings (like other lazy sweeps)
+            cached = {
+                "detection": copy.deepcopy(stageValues),
+                "filteredDeriv": weakref.ref(filteredDeriv),
+                "candidates": candidates,
+            }
+            self._candidateCache[sweepNumber] = cached
 
-        verbose = dDict["verbose"]
+        spikeTimes, spikeErrorList, peakPnts, peakVals = cached["candidates"]
+        # errors are appended to (and modified in) the analysis results
+        spikeErrorList = [copy.copy(tmpError) for tmpError in spikeErrorList]
+        return spikeTimes.copy(), spikeErrorList, peakPnts.copy(), list(peakVals)
 
-        #
-        self.fileLoader.setSweep(sweepNumber)
-        #
+    def _spikeDetectCandidates(
+        self, sweepNumber: int, chunkState: Optional[dict] = None
+    ) -> Optional[tuple]:
+        """Find threshold crossings in one sweep and filter them to candidate spikes.
 
-        # in case dDict has new filter values
-        self._getFilteredRecording()
+        See _getCandidates(), chunkState is used when detecting in chunks (see _spikeDetectChunks).
+        """
+        dDict = self._detectionDict
 
         #
         # spike detect
@@ -1515,7 +2281,9 @@ class bAnalysis:
         # detect all spikes either with dvdt or mv
         if detectionType == sanpy.bDetection.detectionTypes["mv"].value:
             # detect using mV threshold
-            spikeTimes, spikeErrorList = self._spikeDetect_vm(dDict, sweepNumber)
+            spikeTimes, spikeErrorList = self._spikeDetect_vm(
+                dDict, sweepNumber, chunkState=chunkState
+            )
 
             # TODO: get rid of this and replace with foot
             # backup childish vm threshold
@@ -1525,31 +2293,13 @@ class bAnalysis:
                 )
         elif detectionType == sanpy.bDetection.detectionTypes["dvdt"].value:
             # detect using dv/dt threshold AND min mV
-            spikeTimes, spikeErrorList = self._spikeDetect_dvdt(dDict, sweepNumber)
+            spikeTimes, spikeErrorList = self._spikeDetect_dvdt(
+                dDict, sweepNumber, chunkState=chunkState
+            )
         else:
             logger.error(f'Unknown detection type "{detectionType}"')
             return
 
-        #
-        # backup thrshold to zero crossing in dvdt
-        if 0:
-            tmp_window_ms = dDict["dvdtPreWindow_ms"]
-            tmp_window_pnts = self.fileLoader.ms2Pnt_(tmp_window_ms)
-            spikeTimes = self._getFeet(spikeTimes, tmp_window_pnts)
-
-        #
-        # set up
-        sweepX = self.fileLoader.sweepX  # sweepNumber is not optional
-        filteredVm = self.fileLoader.sweepY_filtered  # sweepNumber is not optional
-        filteredDeriv = self.fileLoader.filteredDeriv
-        sweepC = self.fileLoader.sweepC
-
-        #
-        now = datetime.datetime.now()
-        dateStr = now.strftime("%Y%m%d")
-        timeStr = now.strftime("%H:%M:%S")
-        self.dateAnalyzed = dateStr
-
         #
         # look in a window after each threshold crossing to get AP peak
         peakWindow_pnts = self.fileLoader.ms2Pnt_(dDict["peakWindow_ms"])
@@ -1565,7 +2315,7 @@ class bAnalysis:
             newSpikePeakPnt,
             newSpikePeakVal,
         ) = sanpy.analysisUtil.throwOutAboveBelow(
-            filteredVm,
+            self.fileLoader.sweepY_filtered,
             spikeTimes,
             spikeErrorList,
             peakWindow_pnts,
@@ -1573,463 +2323,111 @@ class bAnalysis:
             onlyPeaksBelow_mV=onlyPeaksBelow_mV,
         )
 
-        #
-        # small window to average Vm to calculate MDP (itself in a window before spike)
-        avgWindow_pnts = self.fileLoader.ms2Pnt_(dDict["avgWindow_ms"])
-        avgWindow_pnts = math.floor(avgWindow_pnts / 2)  # can be 0 !!!
-
-        #
-        # for each spike
-        # numSpikes = len(spikeTimes)
-        for i, spikeTime in enumerate(spikeTimes):
-            # spikeTime units is ALWAYS points
-
-            # new, add a spike dict for this spike time
-            spikeDict.appendDefault()
-
-            # get the AP peak
-            peakPnt = newSpikePeakPnt[i]
-            peakVal = newSpikePeakVal[i]
-            peakSec = (newSpikePeakPnt[i] / self.fileLoader.dataPointsPerMs) / 1000
-
-            # create one spike dictionary
-            # spikeDict = OrderedDict() # use OrderedDict so Pandas output is in the correct order
-
-            # spikeDict[i]['isBad'] = False
-            spikeDict[i]["analysisDate"] = dateStr
-            spikeDict[i]["analysisTime"] = timeStr
-            spikeDict[i]["analysisVersion"] = sanpy.analysisVersion
-            spikeDict[i]["interfaceVersion"] = sanpy.interfaceVersion
-            spikeDict[i]["file"] = self.fileLoader.filename
-
-            spikeDict[i]["detectionType"] = detectionType
-
-            spikeDict[i]["cellType"] = dDict["cellType"]
-            spikeDict[i]["sex"] = dDict["sex"]
-            spikeDict[i]["condition"] = dDict["condition"]
-
-            spikeDict[i]["sweep"] = sweepNumber
-
-            epoch = float("nan")
-            epochLevel = float("nan")
-            epochTable = self.fileLoader.getEpochTable(sweepNumber)
-            if epochTable is not None:
-                epoch = epochTable.findEpoch(spikeTime)
-                epochLevel = epochTable.getLevel(epoch)
-            spikeDict[i]["epoch"] = epoch
-            spikeDict[i]["epochLevel"] = epochLevel
-
-            # keep track of per sweep spike and total spike
-            spikeDict[i]["sweepSpikeNumber"] = i
-            spikeDict[i]["spikeNumber"] = self.numSpikes + i
-
-            spikeDict[i]["include"] = True
-
-            # todo: make this a byte encoding so we can have multiple user tyes per spike
-            spikeDict[i]["userType"] = 0  # One userType (int) that can have values
-
-            # using bAnalysisResults will already be []
-            spikeDict[i]["errors"] = []
-
-            # append existing spikeErrorList from spikeDetect_dvdt() or spikeDetect_mv()
-            tmpError = spikeErrorList[i]
-            if tmpError is not None and tmpError != np.nan:
-                spikeDict[i]["errors"].append(tmpError)  # tmpError is from:
-                if verbose:
-                    print(f"  spike:{i} error:{tmpError}")
-            #
-            # detection params
-            spikeDict[i]["dvdtThreshold"] = dDict["dvdtThreshold"]
-            spikeDict[i]["mvThreshold"] = dDict["mvThreshold"]
-            spikeDict[i]["medianFilter"] = dDict["medianFilter"]
-            spikeDict[i]["halfHeights"] = dDict["halfHeights"]
-
-            spikeDict[i]["thresholdPnt"] = spikeTime
-            spikeDict[i]["thresholdSec"] = (
-                spikeTime / self.fileLoader.dataPointsPerMs
-            ) / 1000
-            spikeDict[i]["thresholdVal"] = filteredVm[spikeTime]  # in vm
-            spikeDict[i]["thresholdVal_dvdt"] = filteredDeriv[
-                spikeTime
-            ]  # in dvdt, spikeTime is points
-
-            # TODO: revamp this for 'Plot FI' plugin
-            # spikeTime falls into wrong epoch for first fast spike
-            # DAC command at the precise spike point
-            # spikeDict[i]['dacCommand'] = sweepC[spikeTime]  # spikeTime is in points
-            # spikeDict[i]['dacCommand'] = sweepC[peakPnt]  # spikeTime is in points
-
-            spikeDict[i]["peakPnt"] = peakPnt
-            spikeDict[i]["peakSec"] = peakSec
-            spikeDict[i]["peakVal"] = peakVal
-
-            spikeDict[i]["peakHeight"] = (
-                spikeDict[i]["peakVal"] - spikeDict[i]["thresholdVal"]
-            )
-
-            tmpThresholdSec = spikeDict[i]["thresholdSec"]
-            spikeDict[i]["timeToPeak_ms"] = (peakSec - tmpThresholdSec) * 1000
+        spikeTimes = np.asarray(spikeTimes, dtype=np.int64)
+        peakPnts = np.asarray(newSpikePeakPnt, dtype=np.int64)
+        return spikeTimes, spikeErrorList, peakPnts, newSpikePeakVal
 
-            # only append to spikeDict after we are done (accounting for spikes within a sweep)
-            # self.spikeDict.append(spikeDict)
-            # iIdx = len(self.spikeDict) - 1
+    def _spikeDetectSweep(
+        self,
+        sweepNumber: int,
+        chunkState: Optional[dict] = None,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Optional[sanpy.bAnalysisResults.analysisResultList]:
+        """Detect all spikes in one sweep.
 
-            iIdx = i
+        Does not modify self.spikeDict, see _appendSweepAnalysis().
 
-            # todo: get rid of this
-            defaultVal = float("nan")
+        Notes
+        -----
+        First spike in a sweep cannot have interval statistics like freq or isi
 
-            """
-            # get pre/post spike minima
-            self.spikeDict[iIdx]['preMinPnt'] = None
-            self.spikeDict[iIdx]['preMinVal'] = defaultVal
-
-            # early diastolic duration
-            # 0.1 to 0.5 of time between pre spike min and spike time
-            self.spikeDict[iIdx]['preLinearFitPnt0'] = None
-            self.spikeDict[iIdx]['preLinearFitPnt1'] = None
-            self.spikeDict[iIdx]['earlyDiastolicDuration_ms'] = defaultVal # seconds between preLinearFitPnt0 and preLinearFitPnt1
-            self.spikeDict[iIdx]['preLinearFitVal0'] = defaultVal
-            self.spikeDict[iIdx]['preLinearFitVal1'] = defaultVal
-            # m,b = np.polyfit(x, y, 1)
-            self.spikeDict[iIdx]['earlyDiastolicDurationRate'] = defaultVal # fit of y=preLinearFitVal 0/1 versus x=preLinearFitPnt 0/1
-            self.spikeDict[iIdx]['lateDiastolicDuration'] = defaultVal #
-
-            self.spikeDict[iIdx]['preSpike_dvdt_max_pnt'] = None
-            self.spikeDict[iIdx]['preSpike_dvdt_max_val'] = defaultVal # in units mV
-            self.spikeDict[iIdx]['preSpike_dvdt_max_val2'] = defaultVal # in units dv/dt
-            self.spikeDict[iIdx]['postSpike_dvdt_min_pnt'] = None
-            self.spikeDict[iIdx]['postSpike_dvdt_min_val'] = defaultVal # in units mV
-            self.spikeDict[iIdx]['postSpike_dvdt_min_val2'] = defaultVal # in units dv/dt
-
-            self.spikeDict[iIdx]['isi_pnts'] = defaultVal # time between successive AP thresholds (thresholdSec)
-            self.spikeDict[iIdx]['isi_ms'] = defaultVal # time between successive AP thresholds (thresholdSec)
-            self.spikeDict[iIdx]['spikeFreq_hz'] = defaultVal # time between successive AP thresholds (thresholdSec)
-            self.spikeDict[iIdx]['cycleLength_pnts'] = defaultVal # time between successive MDPs
-            self.spikeDict[iIdx]['cycleLength_ms'] = defaultVal # time between successive MDPs
-
-            # Action potential duration (APD) was defined as the interval between the TOP and the subsequent MDP
-            #self.spikeDict[iIdx]['apDuration_ms'] = defaultVal
-            self.spikeDict[iIdx]['diastolicDuration_ms'] = defaultVal
-
-            # any number of spike widths
-            #print('spikeDetect__() appending widths list to spike iIdx:', iIdx)
-            # was this
-            #self.spikeDict[iIdx]['widths'] = []
-            # debug 20210929, self._getHalfWidth() will assign spikeDict[iIdx]['widths'] = []
-            for halfHeight in dDict['halfHeights']:
-                widthDict = {
-                    'halfHeight': halfHeight,
-                    'risingPnt': None,
-                    'risingVal': defaultVal,
-                    'fallingPnt': None,
-                    'fallingVal': defaultVal,
-                    'widthPnts': None,
-                    'widthMs': defaultVal
-                }
-                # was this
-                #spikeDict[iIdx]['widths_' + str(halfHeight)] = defaultVal
-                spikeDict[iIdx]['widths'].append(widthDict)
-            """
+        Parameters
+        ----------
+        sweepNumber : int
+        chunkState : dict
+            When detecting in chunks, see _spikeDetectChunks().
+        progress : Callable
+            Called with the part of the sweep that is done after each stage of detection.
 
-            #
-            mdp_ms = dDict["mdp_ms"]
-            mdp_pnts = self.fileLoader.ms2Pnt_(mdp_ms)  # mdp_ms * self.dataPointsPerMs
-            mdp_pnts = int(mdp_pnts)
-
-            # pre spike min
-            # other algorithms look between spike[i-1] and spike[i]
-            # here we are looking in a predefined window
-            startPnt = spikeTimes[i] - mdp_pnts
-            if startPnt < 0:
-                # logger.info('TODO: add an official warning, we went past 0 for pre spike mdp ms window')
-                startPnt = 0
-                # log error
-                errorType = "Pre spike min under-run (mdp)"
-                errorStr = "Went past startPnt 0 searching for pre-spike min"
-                eDict = self._getErrorDict(
-                    i, spikeTimes[i], errorType, errorStr
-                )  # spikeTime is in pnts
-                spikeDict[iIdx]["errors"].append(eDict)
-                if verbose:
-                    logger.error(f"  spike:{iIdx} error:{eDict}")
-                    logger.error(f'  going to index vmFiltered {startPnt} to spike time i {i} with value {spikeTimes[i]}')
-
-            preRange = filteredVm[startPnt : spikeTimes[i]]  # EXCEPTION
-            try:
-                preMinPnt = np.argmin(preRange)
-            except ValueError as e:
-                # 20220926, happend when we have no scale and mdp_pnts=0
-                # print(f'xxx i:{i} mdp_pnts:{mdp_pnts} len:{len(filteredVm)} startPnt:{startPnt} spikeTimes[i]:{spikeTimes[i]}')
-                # 20220926, we really just want ot bail on this error
-                # lots of code below relies on this
-                # TODO: fix this mess
-                preMinPnt = startPnt
-                errorType = "Pre spike min 0 (mdp)"
-                errorStr = f"Did not find preMinPnt mdp_pnts:{mdp_pnts} startPnt:{startPnt} spikeTimes[i]:{spikeTimes[i]}"
-                eDict = self._getErrorDict(
-                    i, spikeTimes[i], errorType, errorStr
-                )  # spikeTime is in pnts
-                spikeDict[iIdx]["errors"].append(eDict)
-                if verbose:
-                    print(f"  spike:{iIdx} error:{eDict}")
-            if preMinPnt is not None:
-                # 20230924, avgMinPnts is coming up zero now that we have sampling dt for kymographs that are slow !!!
-                if avgWindow_pnts < 1:
-                    # error
-                    errorType = "mdp error"
-                    errorStr = "avgWindow_pnts"
-                    eDict = self._getErrorDict(
-                        i, spikeTimes[i], errorType, errorStr
-                    )  # spikeTime is in pnts
-                    spikeDict[iIdx]["errors"].append(eDict)
-                    if verbose:
-                        print(f"  spike:{iIdx} error:{eDict}")
-                
-                else:
-                    preMinPnt += startPnt
-                    # the pre min is actually an average around the real minima
-                    avgRange = filteredVm[
-                        preMinPnt - avgWindow_pnts : preMinPnt + avgWindow_pnts
-                    ]
-                    # print('  avgRange is:' , avgRange)
-                    preMinVal = np.average(avgRange)
-
-                    # search backward from spike to find when vm reaches preMinVal (avg)
-                    preRange = filteredVm[preMinPnt : spikeTimes[i]]
-                    preRange = np.flip(preRange)  # we want to search backwards from peak
-                    try:
-                        preMinPnt2 = np.where(preRange < preMinVal)[0][0]
-                        preMinPnt = spikeTimes[i] - preMinPnt2
-                        spikeDict[iIdx]["preMinPnt"] = preMinPnt
-                        spikeDict[iIdx]["preMinVal"] = preMinVal
-
-                    except IndexError as e:
-                        errorType = "Pre spike min (mdp)"
-                        errorStr = "Did not find preMinVal: " + str(
-                            round(preMinVal, 3)
-                        )  # + ' postRange min:' + str(np.min(postRange)) + ' max ' + str(np.max(postRange))
-                        eDict = self._getErrorDict(
-                            i, spikeTimes[i], errorType, errorStr
-                        )  # spikeTime is in pnts
-                        spikeDict[iIdx]["errors"].append(eDict)
-                        if verbose:
-                            print(f"  spike:{iIdx} error:{eDict}")
+        Returns
+        -------
+        analysisResultList
+            Analysis results of the sweep, None if detection type is unknown.
+        """
+        dDict = self._detectionDict
 
-            #
-            # The nonlinear late diastolic depolarization phase was
-            # estimated as the duration between 1% and 10% dV/dt
-            # linear fit on 10% - 50% of the time from preMinPnt to self.spikeTimes[i]
-            startLinearFit = 0.1  # percent of time between pre spike min and AP peak
-            stopLinearFit = 0.5  #
-            timeInterval_pnts = spikeTimes[i] - preMinPnt
-            # taking round() so we always get an integer # points
-            preLinearFitPnt0 = preMinPnt + round(timeInterval_pnts * startLinearFit)
-            preLinearFitPnt1 = preMinPnt + round(timeInterval_pnts * stopLinearFit)
-            preLinearFitVal0 = filteredVm[preLinearFitPnt0]
-            preLinearFitVal1 = filteredVm[preLinearFitPnt1]
-
-            # linear fit before spike
-            spikeDict[iIdx]["preLinearFitPnt0"] = preLinearFitPnt0
-            spikeDict[iIdx]["preLinearFitPnt1"] = preLinearFitPnt1
-            spikeDict[iIdx]["earlyDiastolicDuration_ms"] = self.fileLoader.pnt2Ms_(
-                preLinearFitPnt1 - preLinearFitPnt0
-            )
-            spikeDict[iIdx]["preLinearFitVal0"] = preLinearFitVal0
-            spikeDict[iIdx]["preLinearFitVal1"] = preLinearFitVal1
+        # candidates (with the filter) and each spike feature
+        numStages = 7
 
-            # a linear fit where 'm,b = np.polyfit(x, y, 1)'
-            # m*x+b"
-            xFit = sweepX[preLinearFitPnt0:preLinearFitPnt1]  # abb added +1
-            yFit = filteredVm[preLinearFitPnt0:preLinearFitPnt1]
+        def stageDone(stage: int):
+            if progress is not None:
+                progress(stage / numStages)
 
-            # sometimes xFit/yFit have 0 length -->> TypeError
-            # print(f' {iIdx} preLinearFitPnt0:{preLinearFitPnt0}, preLinearFitPnt1:{preLinearFitPnt1}')
-            # print(f'    xFit:{len(xFit)} yFit:{len(yFit)}')
+        # a list of dict of sanpy.bAnalysisResults.analysisResult (one dict per spike)
+        spikeDict = sanpy.bAnalysisResults.analysisResultList()
 
-            # TODO: somehow trigger following errors to confirm code works (pytest)
-            with warnings.catch_warnings():
-                warnings.filterwarnings("error")
-                try:
-                    mLinear, bLinear = np.polyfit(
-                        xFit, yFit, 1
-                    )  # m is slope, b is intercept
-                    spikeDict[iIdx]["earlyDiastolicDurationRate"] = mLinear
-                    # todo: make an error if edd rate is too low
-                    lowestEddRate = dDict["lowEddRate_warning"]  # 8
-                    if mLinear <= lowestEddRate:
-                        errorType = "Fit EDD"
-                        errorStr = f"Early diastolic duration rate fit - Too low {round(mLinear,3)}<={lowestEddRate}"
-                        eDict = self._getErrorDict(
-                            i, spikeTimes[i], errorType, errorStr
-                        )  # spikeTime is in pnts
-                        # print('fit edd start num error:', 'iIdx:', iIdx, 'num error:', len(spikeDict[iIdx]['errors']))
-                        spikeDict[iIdx]["errors"].append(eDict)
-                        # print('  after num error:', len(spikeDict[iIdx]['errors']))
-                        if verbose:
-                            print(f"  spike:{iIdx} error:{eDict}")
-
-                except (TypeError, RuntimeWarning) as e:
-                    # catching exception:  expected non-empty vector for x
-                    # xFit/yFit turn up empty when mdp and TOP points are within 1 point
-                    spikeDict[iIdx]["earlyDiastolicDurationRate"] = defaultVal
-                    errorType = "Fit EDD"
-                    # errorStr = 'Early diastolic duration rate fit - TypeError'
-                    errorStr = (
-                        "Early diastolic duration rate fit - preMinPnt == spikePnt"
-                    )
-                    eDict = self._getErrorDict(i, spikeTimes[i], errorType, errorStr)
-                    spikeDict[iIdx]["errors"].append(eDict)
-                    if verbose:
-                        print(f"  spike:{iIdx} error:{eDict}")
-                except np.RankWarning as e:
-                    # logger.error('== FIX preLinearFitPnt0/preLinearFitPnt1 RankWarning')
-                    # logger.error(f'  error is: {e}')
-                    # print('RankWarning')
-                    # also throws: RankWarning: Polyfit may be poorly conditioned
-                    spikeDict[iIdx]["earlyDiastolicDurationRate"] = defaultVal
-                    errorType = "Fit EDD"
-                    errorStr = "Early diastolic duration rate fit - RankWarning"
-                    eDict = self._getErrorDict(i, spikeTimes[i], errorType, errorStr)
-                    spikeDict[iIdx]["errors"].append(eDict)
-                    if verbose:
-                        print(f"  spike:{iIdx} error:{eDict}")
-                # 20230422, don't ever catch an unknown exception
-                # except:
-                #     logger.error(
-                #         f" !!!!!!!!!!!!!!!!!!!!!!!!!!! UNKNOWN EXCEPTION DURING EDD LINEAR FIT for spike {i}"
-                #     )
-                #     spikeDict[iIdx]["earlyDiastolicDurationRate"] = defaultVal
-                #     errorType = "Fit EDD"
-                #     errorStr = "Early diastolic duration rate fit - Unknown Exception"
-                #     eDict = self._getErrorDict(i, spikeTimes[i], errorType, errorStr)
-                #     if verbose:
-                #         print(f"  spike:{iIdx} error:{eDict}")
-
-            # not implemented
-            # self.spikeDict[i]['lateDiastolicDuration'] = ???
+        #
+        self.fileLoader.setSweep(sweepNumber)
+        #
 
-            #
-            # maxima in dv/dt before spike (between TOP and peak)
-            try:
-                preRange = filteredDeriv[spikeTimes[i] : peakPnt + 1]
-                preSpike_dvdt_max_pnt = np.argmax(preRange)
-                preSpike_dvdt_max_pnt += spikeTimes[i]
-                spikeDict[iIdx]["preSpike_dvdt_max_pnt"] = preSpike_dvdt_max_pnt
-                spikeDict[iIdx]["preSpike_dvdt_max_val"] = filteredVm[
-                    preSpike_dvdt_max_pnt
-                ]  # in units mV
-                spikeDict[iIdx]["preSpike_dvdt_max_val2"] = filteredDeriv[
-                    preSpike_dvdt_max_pnt
-                ]  # in units mV
-            except ValueError as e:
-                # sometimes preRange is empty, don't try and put min/max in error
-                errorType = "Pre Spike dvdt"
-                errorStr = "Searching for dvdt max - ValueError"
-                eDict = self._getErrorDict(
-                    i, spikeTimes[i], errorType, errorStr
-                )  # spikeTime is in pnts
-                spikeDict[iIdx]["errors"].append(eDict)
-                if verbose:
-                    print(f"  spike:{iIdx} error:{eDict}")
+        # in case dDict has new filter values
+        self._getFilteredRecording()
 
-            #
-            # minima in dv/dt after spike
-            # postRange = dvdt[self.spikeTimes[i]:postMinPnt]
-            # postSpike_ms = 20 # 10
-            # postSpike_pnts = self.ms2Pnt_(postSpike_ms)
-            dvdtPostWindow_ms = dDict["dvdtPostWindow_ms"]
-            dvdtPostWindow_pnts = self.fileLoader.ms2Pnt_(dvdtPostWindow_ms)
-            postRange = filteredDeriv[
-                peakPnt : peakPnt + dvdtPostWindow_pnts
-            ]  # fixed window after spike
-
-            postSpike_dvdt_min_pnt = np.argmin(postRange)
-            postSpike_dvdt_min_pnt += peakPnt
-            spikeDict[iIdx]["postSpike_dvdt_min_pnt"] = postSpike_dvdt_min_pnt
-            spikeDict[iIdx]["postSpike_dvdt_min_val"] = filteredVm[
-                postSpike_dvdt_min_pnt
-            ]
-            spikeDict[iIdx]["postSpike_dvdt_min_val2"] = filteredDeriv[
-                postSpike_dvdt_min_pnt
-            ]
+        #
+        # spike detect, reuse candidates if only downstream parameters changed
+        if chunkState is None:
+            candidates = self._getCandidates(sweepNumber)
+        else:
+            # candidates of a chunk depend on the chunks before it, do not cache
+            candidates = self._spikeDetectCandidates(sweepNumber, chunkState)
+        if candidates is None:
+            return
+        spikeTimes, spikeErrorList, peakPnts, newSpikePeakVal = candidates
+        stageDone(1)
 
-            #
-            # diastolic duration was defined as the interval between MDP and TOP
-            # one off error when preMinPnt is not defined
-            spikeDict[iIdx]["diastolicDuration_ms"] = self.fileLoader.pnt2Ms_(
-                spikeTime - preMinPnt
-            )
+        #
+        now = datetime.datetime.now()
+        dateStr = now.strftime("%Y%m%d")
+        timeStr = now.strftime("%H:%M:%S")
+        self.dateAnalyzed = dateStr
 
-            #
-            # calculate instantaneous spike frequency and ISI, for first spike this is not defined
-            spikeDict[iIdx]["cycleLength_ms"] = float("nan")
-            if iIdx > 0:
-                isiPnts = (
-                    spikeDict[iIdx]["thresholdPnt"]
-                    - spikeDict[iIdx - 1]["thresholdPnt"]
-                )
-                isi_ms = self.fileLoader.pnt2Ms_(isiPnts)
-                isi_hz = 1 / (isi_ms / 1000)
-                spikeDict[iIdx]["isi_pnts"] = isiPnts
-                spikeDict[iIdx]["isi_ms"] = self.fileLoader.pnt2Ms_(isiPnts)
-                spikeDict[iIdx]["spikeFreq_hz"] = 1 / (
-                    self.fileLoader.pnt2Ms_(isiPnts) / 1000
-                )
+        #
+        # add a default spike for each spike time
+        spikeDict.appendDefault(len(spikeTimes))
 
-                # Cycle length was defined as the interval between MDPs in successive APs
-                prevPreMinPnt = spikeDict[iIdx - 1]["preMinPnt"]  # can be nan
-                thisPreMinPnt = spikeDict[iIdx]["preMinPnt"]
-                if prevPreMinPnt is not None and thisPreMinPnt is not None:
-                    cycleLength_pnts = thisPreMinPnt - prevPreMinPnt
-                    spikeDict[iIdx]["cycleLength_pnts"] = cycleLength_pnts
-                    spikeDict[iIdx]["cycleLength_ms"] = self.fileLoader.pnt2Ms_(
-                        cycleLength_pnts
-                    )
-                else:
-                    # error
-                    prevPreMinSec = self.fileLoader.pnt2Sec_(prevPreMinPnt)
-                    thisPreMinSec = self.fileLoader.pnt2Sec_(thisPreMinPnt)
-                    # errorStr = f'Previous spike preMinPnt is {prevPreMinPnt} and this preMinPnt: {thisPreMinPnt}'
-                    errorType = "Cycle Length"
-                    errorStr = f"Previous spike preMinPnt (s) is {prevPreMinSec} and this preMinPnt: {thisPreMinSec}"
-                    eDict = self._getErrorDict(
-                        i, spikeTimes[i], errorType, errorStr
-                    )  # spikeTime is in pnts
-                    spikeDict[iIdx]["errors"].append(eDict)
-                    if verbose:
-                        print(f"  spike:{iIdx} error:{eDict}")
+        #
+        # each feature is computed for all spikes in the sweep at once,
+        # errors are appended per spike in the order of these calls
+        self._spikeFeatures_info(
+            spikeDict,
+            sweepNumber,
+            spikeTimes,
+            spikeErrorList,
+            peakPnts,
+            newSpikePeakVal,
+            dateStr,
+            timeStr,
+        )
+        stageDone(2)
+        preMinPnts = self._spikeFeatures_preMin(spikeDict, spikeTimes)
+        stageDone(3)
+        self._spikeFeatures_edd(spikeDict, spikeTimes, preMinPnts)
+        stageDone(4)
+        self._spikeFeatures_dvdt(spikeDict, spikeTimes, peakPnts)
+        stageDone(5)
+        self._spikeFeatures_intervals(spikeDict, spikeTimes, preMinPnts)
+        stageDone(6)
 
-            #
-            # TODO: Move half-width to a function !!!
-            #
-            hwWindowPnts = dDict["halfWidthWindow_ms"] * self.fileLoader.dataPointsPerMs
-            hwWindowPnts = round(hwWindowPnts)
-            halfHeightList = dDict["halfHeights"]
-            # was this
-            # self._getHalfWidth(filteredVm, i, iIdx, spikeTime, peakPnt, hwWindowPnts, self.dataPointsPerMs, halfHeightList)
-            self._getHalfWidth(
-                filteredVm,
-                iIdx,
-                spikeDict,
-                spikeTime,
-                peakPnt,
-                hwWindowPnts,
-                self.fileLoader.dataPointsPerMs,
-                halfHeightList,
-                verbose=verbose,
-            )
+        self._spikeFeatures_halfWidth(spikeDict, spikeTimes, peakPnts)
+        stageDone(7)
 
-        #
-        # look between threshold crossing to get minima
-        # we will ignore the first and last spike
+        return spikeDict
 
-        #
-        # spike clips
-        self.spikeClips = None
-        self.spikeClips_x = None
-        self.spikeClips_x2 = None
+    def _appendSweepAnalysis(self, spikeDict: sanpy.bAnalysisResults.analysisResultList):
+        """Append the analysis results of one sweep to self.spikeDict.
 
+        Then run user analysis and regenerate the analysis and error reports.
+        """
         # SUPER important, previously our self.spikeDict was simple list of dict
         # now it is a list of class xxx
         # print('=== addind', len(spikeDict))
@@ -2040,8 +2438,24 @@ class bAnalysis:
         # keep track of spikes per sweep (expensive to calculate)
         # self._spikesPerSweep[sweepNumber] = len(spikeDict)
 
+        self._finalizeAnalysis()
+
+    def _finalizeAnalysis(self):
+        """Run user analysis and regenerate the analysis and error reports.
+
+        Call once after appending analysis results to self.spikeDict.
+        Seconds for each stage are in self.detectionTimes.
+        """
+        #
+        # spike clips
+        self.spikeClips = None
+        self.spikeClips_x = None
+        self.spikeClips_x2 = None
+
         # run all user analysis ... what if this fails ???
+        startTime = time.time()
         sanpy.user_analysis.baseUserAnalysis.runAllUserAnalysis(self)
+        self._detectionTimes["userAnalysis"] = time.time() - startTime
 
         #
         # generate a df holding stats (used by scatterplotwidget)
@@ -2053,10 +2467,14 @@ class bAnalysis:
         #     self._dfReportForScatter = self.spikeDict.asDataFrame()
         # else:
         #     self.dfReportForScatter = None
+        startTime = time.time()
         self.regenerateAnalysisDataFrame()
+        self._detectionTimes["dataFrame"] = time.time() - startTime
 
         # generate error report
+        startTime = time.time()
         self.dfError = self.getErrorReport()
+        self._detectionTimes["errorReport"] = time.time() - startTime
 
         # bAnalysis needs to be saved
         self._detectionDirty = True
@@ -2235,14 +2653,17 @@ class bAnalysis:
         """
         (Internal) Make small clips for each spike.
 
+        Clips are one 2D array (spikes x samples) gathered from a strided view
+        of the filtered recording, all clips share one x-axis.
+
         Args:
             preSpikeClipWidth_ms (int): Width of each spike clip in milliseconds.
             postSpikeClipWidth_ms (int): Width of each spike clip in milliseconds.
             theseTime_sec (list of float): [NOT USED] List of seconds to make clips from.
 
         Returns:
-            spikeClips_x2: ms
-            self.spikeClips (list): List of spike clips
+            spikeClips_x (np.ndarray): 1D x-axis (ms), shared by all clips
+            self.spikeClips (np.ndarray): 2D spike clips (spikes x samples)
         """
 
         verbose = self._detectionDict["verbose"]
@@ -2255,7 +2676,6 @@ class bAnalysis:
         if sweepNumber is None:
             sweepNumber = "All"
 
-        # print('makeSpikeClips() spikeClipWidth_ms:', spikeClipWidth_ms, 'theseTime_sec:', theseTime_sec)
         if theseTime_sec is None:
             theseTime_pnts = self.getSpikeTimes(sweepNumber=sweepNumber, epochNumber=epochNumber)
         else:
@@ -2263,81 +2683,94 @@ class bAnalysis:
             theseTime_ms = [x * 1000 for x in theseTime_sec]
             theseTime_pnts = [x * self.fileLoader.dataPointsPerMs for x in theseTime_ms]
             theseTime_pnts = [round(x) for x in theseTime_pnts]
+        theseTime_pnts = np.asarray(theseTime_pnts, dtype=np.int64).reshape(-1)
 
         preClipWidth_pnts = self.fileLoader.ms2Pnt_(preSpikeClipWidth_ms)
-        # if preClipWidth_pnts % 2 == 0:
-        #    pass # Even
-        # else:
-        #    clipWidth_pnts += 1 # Make odd even
         postClipWidth_pnts = self.fileLoader.ms2Pnt_(postSpikeClipWidth_ms)
 
-        # halfClipWidth_pnts = int(clipWidth_pnts/2)
-
-        # print('  makeSpikeClips() clipWidth_pnts:', clipWidth_pnts, 'halfClipWidth_pnts:', halfClipWidth_pnts)
-        # make one x axis clip with the threshold crossing at 0
-        # was this, in ms
-        # self.spikeClips_x = [(x-halfClipWidth_pnts)/self.dataPointsPerMs for x in range(clipWidth_pnts)]
-
-        # in ms
-        self.spikeClips_x = [
-            (x - preClipWidth_pnts) / self.fileLoader.dataPointsPerMs
-            for x in range(preClipWidth_pnts)
-        ]
-        self.spikeClips_x += [
-            (x) / self.fileLoader.dataPointsPerMs for x in range(postClipWidth_pnts)
-        ]
+        # make one x axis clip with the threshold crossing at 0 (ms)
+        self.spikeClips_x = (
+            np.arange(-preClipWidth_pnts, postClipWidth_pnts)
+            / self.fileLoader.dataPointsPerMs
+        )
 
         # 20190714, added this to make all clips same length, much easier to plot in MultiLine
         numPointsInClip = len(self.spikeClips_x)
 
-        self.spikeClips = []
-        self.spikeClips_x2 = []
-
-        sweepY = self.fileLoader.sweepY_filtered
+        # all sweeps (pnts x sweeps), each clip comes from the sweep of its spike
+        numPnts = self.fileLoader.numPnts
 
         # when there are no spikes getStat() will not return anything
         # For 'All' sweeps, we need to know column
-        sweepNum = self.getStat("sweep", sweepNumber=sweepNumber)
-
-        # logger.info(f'sweepY: {sweepY.shape} {len(sweepY.shape)}')
-        # logger.info(f'theseTime_pnts: {theseTime_pnts}')
+        if theseTime_sec is None:
+            sweepNum = self.getStat("sweep", sweepNumber=sweepNumber, epochNumber=epochNumber)
+        else:
+            sweepNum = None
+        if sweepNum is None or len(sweepNum) != len(theseTime_pnts):
+            sweepNum = np.zeros(len(theseTime_pnts), dtype=np.int64)
+        sweepNum = np.asarray(sweepNum, dtype=np.int64)
 
-        for idx, spikeTime in enumerate(theseTime_pnts):
-            sweep = sweepNum[idx]
+        clipStart = theseTime_pnts - preClipWidth_pnts
+        goodClip = (clipStart >= 0) & (clipStart + numPointsInClip <= numPnts)
+        if verbose:
+            for idx in np.flatnonzero(~goodClip):
+                logger.warning(
+                    f"Did not add clip for spike index: {idx} at time: {theseTime_pnts[idx]} clip does not fit in recording"
+                )
 
-            if len(sweepY.shape) == 1:
-                # 1D case where recording has only oone sweep
-                # currentClip = sweepY[spikeTime-halfClipWidth_pnts:spikeTime+halfClipWidth_pnts]
-                currentClip = sweepY[
-                    spikeTime - preClipWidth_pnts : spikeTime + postClipWidth_pnts
-                ]
+        if numPointsInClip == 0 or numPnts < numPointsInClip:
+            self.spikeClips = np.zeros((0, numPointsInClip))
+            self._spikeClipIndex = np.zeros(0, dtype=np.int64)
+            self._spikeClipSpikeNumbers = np.zeros(0, dtype=np.int64)
+        else:
+            self._spikeClipIndex = np.flatnonzero(goodClip)
+            if self.fileLoader.lazy:
+                # only read and filter the clips
+                self.spikeClips = np.zeros((len(self._spikeClipIndex), numPointsInClip))
+                for row, idx in enumerate(self._spikeClipIndex):
+                    self.spikeClips[row] = self.fileLoader._getFilteredRange(
+                        sweepNum[idx], clipStart[idx], clipStart[idx] + numPointsInClip
+                    )
             else:
-                # 2D case where recording has multiple sweeps
-                # currentClip = sweepY[spikeTime-halfClipWidth_pnts:spikeTime+halfClipWidth_pnts, sweep]
-                try:
-                    currentClip = sweepY[
-                        spikeTime - preClipWidth_pnts : spikeTime + preClipWidth_pnts,
-                        sweep,
-                    ]
-                except IndexError as e:
-                    logger.error(e)
-                    print(f"sweep: {sweep}")
-                    print(f"sweepY.shape: {sweepY.shape}")
-
-            if len(currentClip) == numPointsInClip:
-                self.spikeClips.append(currentClip)
-                self.spikeClips_x2.append(
-                    self.spikeClips_x
-                )  # a 2D version to make pyqtgraph multiline happy
+                # (windows, sweeps, samples) view, no copy
+                windowView = np.lib.stride_tricks.sliding_window_view(
+                    self.fileLoader._filteredY, numPointsInClip, axis=0
+                )
+                self.spikeClips = windowView[
+                    clipStart[goodClip], sweepNum[goodClip]
+                ]
+
+            # spike number of each clip
+            if theseTime_sec is None:
+                spikeNumbers = self.getStat(
+                    "spikeNumber", sweepNumber=sweepNumber, epochNumber=epochNumber
+                )
             else:
-                # pass
-                if verbose:
-                    logger.warning(
-                        f"Did not add clip for spike index: {idx} at time: {spikeTime} len(currentClip): {len(currentClip)} != numPointsInClip: {numPointsInClip}"
-                    )
+                spikeNumbers = None
+            if spikeNumbers is None or len(spikeNumbers) != len(theseTime_pnts):
+                spikeNumbers = np.arange(len(theseTime_pnts))
+            self._spikeClipSpikeNumbers = np.asarray(spikeNumbers, dtype=np.int64)[
+                self._spikeClipIndex
+            ]
+
+        # a 2D view to make pyqtgraph multiline happy, all rows are the same x
+        self.spikeClips_x2 = np.broadcast_to(
+            self.spikeClips_x, self.spikeClips.shape
+        )
 
         #
-        return self.spikeClips_x2, self.spikeClips
+        return self.spikeClips_x, self.spikeClips
+
+    def getSpikeClipSpikeNumbers(self) -> np.ndarray:
+        """Get the spike number of each clip (row) from the last getSpikeClips().
+
+        Spikes whose clip does not fit in the recording do not have a clip.
+
+        Returns:
+            (np.ndarray): 1D spike numbers, one per row of all clips made,
+                before getSpikeClips() selects by time or spike selection.
+        """
+        return self._spikeClipSpikeNumbers
 
     def getSpikeClips(
         self,
@@ -2350,7 +2783,7 @@ class bAnalysis:
         epochNumber='All',
         ignoreMinMax=False  # added 20230418
     ):
-        """Get 2d list of spike clips, spike clips x, and 1d mean spike clip.
+        """Get 2d array of spike clips, spike clips x, and 1d mean spike clip.
 
         Args:
             theMin (float): Start seconds.
@@ -2362,9 +2795,9 @@ class bAnalysis:
         Requires: self.spikeDetect() and self._makeSpikeClips()
 
         Returns:
-            theseClips (list): List of clip
-            theseClips_x (list): ms
-            meanClip (list)
+            theseClips (np.ndarray): 2D clips (spikes x samples)
+            theseClips_x (np.ndarray): ms, a read only 2D view of one shared x-axis
+            meanClip (np.ndarray)
         """
 
         if self.numSpikes == 0:
@@ -2378,12 +2811,7 @@ class bAnalysis:
             theMin = 0
             theMax = self.fileLoader.recordingDur  # self.sweepX[-1]
 
-        # new interface, spike detect no longer auto generates these
         # need to do this every time because we get here when sweepNumber changes
-        # if self.spikeClips is None:
-        #    self._makeSpikeClips(spikeClipWidth_ms=spikeClipWidth_ms, sweepNumber=sweepNumber)
-        # TODO: don't make all clips
-        # self._makeSpikeClips(spikeClipWidth_ms=spikeClipWidth_ms, sweepNumber=sweepNumber)
         self._makeSpikeClips(
             preSpikeClipWidth_ms=preSpikeClipWidth_ms,
             postSpikeClipWidth_ms=postSpikeClipWidth_ms,
@@ -2391,39 +2819,27 @@ class bAnalysis:
             epochNumber=epochNumber
         )
 
-        # make a list of clips within start/stop (Seconds)
-        theseClips = []
-        theseClips_x = []
-        tmpMeanClips = []  # for mean clip
-        meanClip = []
-        
         # spikeTimes are in pnts
         spikeTimes = self.getSpikeTimes(sweepNumber=sweepNumber, epochNumber=epochNumber)
 
         logger.info(f'spikeTimes:{len(spikeTimes)} sweepNumber:{sweepNumber} epochNumber:{epochNumber}')
 
-        # if len(spikeTimes) != len(self.spikeClips):
-        #    logger.error(f'len spikeTimes {len(spikeTimes)} !=  spikeClips {len(self.spikeClips)}')
+        # select clips within start/stop (Seconds)
+        if doSpikeSelection:
+            keepClip = np.isin(self._spikeClipIndex, spikeSelection)
+        elif ignoreMinMax:
+            keepClip = np.ones(len(self._spikeClipIndex), dtype=bool)
+        else:
+            clipSeconds = self.fileLoader.pnt2Sec_(
+                np.asarray(spikeTimes)[self._spikeClipIndex]
+            )
+            keepClip = (clipSeconds >= theMin) & (clipSeconds <= theMax)
 
-        # self.spikeClips is a list of clips
-        for idx, clip in enumerate(self.spikeClips):
-            doThisSpike = False
-            if doSpikeSelection:
-                doThisSpike = idx in spikeSelection
-            else:
-                spikeTime = spikeTimes[idx]
-                spikeTime = self.fileLoader.pnt2Sec_(spikeTime)
-                if ignoreMinMax or (spikeTime >= theMin and spikeTime <= theMax):
-                    doThisSpike = True
-            if doThisSpike:
-                theseClips.append(clip)
-                theseClips_x.append(
-                    self.spikeClips_x2[idx]
-                )  # remember, all _x are the same
-                if len(self.spikeClips_x) == len(clip):
-                    tmpMeanClips.append(clip)  # for mean clip
-        if len(tmpMeanClips):
-            meanClip = np.mean(tmpMeanClips, axis=0)
+        theseClips = self.spikeClips[keepClip]
+        theseClips_x = np.broadcast_to(self.spikeClips_x, theseClips.shape)
+        meanClip = []
+        if len(theseClips):
+            meanClip = np.mean(theseClips, axis=0)
 
         return theseClips, theseClips_x, meanClip
 
@@ -2442,41 +2858,10 @@ class bAnalysis:
             (pandas DataFrame): Pandas DataFrame, one row per error.
         """
 
-        dictList = []
-
-        # numError = 0
-        # errorList = []
-
         # logger.info(f'Generating error report for {len(self.spikeDict)} spikes')
 
-        #  20230422 spikeDict is not working as an iterable
-        # use it as a list instead
-        numSpikes = len(self.spikeDict)
-        #for spike in self.spikeDict:
-        for _spikeNumber in range(numSpikes):
-            spike = self.spikeDict[_spikeNumber]
-            # spike is sanpy.bAnalysisResults.analysisResult
-            #print('spike:', spike)
-            for error in spike["errors"]:
-                # spike["errors"] is a list of dict
-                # error is dict from _getErrorDict
-                if error is None or error == np.nan or error == "nan":
-                    continue
-
-                # 20230422 add sweep and epoch to error dict
-                #_spikeNumber = error['Spike']
-                
-                #print('  _spikeNumber:', _spikeNumber, type(_spikeNumber))
-                
-                # _sweep = self.getSpikeStat([_spikeNumber], 'sweep')
-                # if len(_sweep)==0:
-                #     logger.error(f"_spikeNumber:{_spikeNumber} sweep:{_sweep}")
-                #     #print(self.getOneSpikeDict(_spikeNumber))
-                
-                error['Sweep'] = self.getSpikeStat([_spikeNumber], 'sweep')[0]
-                error['Epoch'] = self.getSpikeStat([_spikeNumber], 'epoch')[0]
-
-                dictList.append(error)
+        # 20230422 add sweep and epoch to error dict
+        dictList = self.spikeDict.getErrorList()
 
         if len(dictList) == 0:
             fakeErrorDict = self._getErrorDict(1, 1, "fake", "fake")
@@ -2489,6 +2874,41 @@ class bAnalysis:
 
         return dfError
 
+    def getErrors(
+        self,
+        sweepNumber: Optional[int] = None,
+        epochNumber: Optional[int] = None,
+        errorType: Optional[str] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Get the rows of the error report (self.dfError) for a sweep, epoch and error type.
+
+        Parameters
+        ----------
+        sweepNumber : int str or None
+            Optional sweep number, if None or 'All' then get all sweeps
+        epochNumber : int str or None
+            Optional epoch number, if None or 'All' then get all epochs
+        errorType : str or None
+            Optional error 'Type' like 'Spike Width', if None or 'All' then get all types
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per error, None if there is no error report.
+        """
+        dfError = self.dfError
+        if dfError is None:
+            return None
+
+        mask = np.ones(len(dfError), dtype=bool)
+        if sweepNumber is not None and sweepNumber != "All":
+            mask &= dfError["Sweep"].to_numpy() == sweepNumber
+        if epochNumber is not None and epochNumber != "All":
+            mask &= dfError["Epoch"].to_numpy() == epochNumber
+        if errorType is not None and errorType != "All":
+            mask &= dfError["Type"].to_numpy() == errorType
+        return dfError[mask]
+
     def _old_to_csv(self):
         """Save as a CSV text file with name <path>_analysis.csv'"""
         savefile = os.path.splitext(self._path)[0]
@@ -2531,7 +2951,7 @@ class bAnalysis:
         self.detectionClass._dDict = dDict
 
         analysisList = loadedDict["analysis"]
-        self.spikeDict._myList = analysisList
+        self.spikeDict.setFromListDict(analysisList)
 
         self._detectionDirty = False
         self._isAnalyzed = True
@@ -2723,6 +3143,50 @@ class bAnalysis:
         return ret
 
 
+def _spikeDetectWorker(
+    sweepLoader: "sanpy.fileloaders.fileLoader_base", detectionDict: dict
+) -> Optional[sanpy.bAnalysisResults.analysisResultList]:
+    """Detect spikes in a one sweep file loader, run in a worker process.
+
+    See bAnalysis._spikeDetectPool()
+    """
+    ba = bAnalysis(fileLoader=sweepLoader, loadData=False)
+    ba._detectionDict = detectionDict
+    return ba._spikeDetectSweep(0)
+
+
+def _sweepDetectionWorker(
+    fileLoader: "sanpy.fileloaders.fileLoader_base",
+    detectionDict: dict,
+    paramList: List[dict],
+    statList: List[str],
+) -> List[dict]:
+    """Detect spikes for each dict of detection parameters in paramList.
+
+    Returns one summary dict per entry in paramList, see bAnalysis.sweepDetection()
+    """
+    ba = bAnalysis(fileLoader=fileLoader, loadData=False)
+    rowList = []
+    for params in paramList:
+        dDict = copy.deepcopy(detectionDict)
+        dDict.update(params)
+        ba.spikeDetect(dDict)
+
+        oneRow = dict(params)
+        oneRow["numSpikes"] = ba.numSpikes
+        oneRow["numErrors"] = ba.numErrors
+        for statName in statList:
+            theValues = np.array([])
+            if ba.numSpikes > 0:
+                theValues = np.asarray(ba.getStat(statName), dtype=float)
+                theValues = theValues[~np.isnan(theValues)]
+            hasValues = len(theValues) > 0
+            oneRow[statName + "_mean"] = np.mean(theValues) if hasValues else np.nan
+            oneRow[statName + "_std"] = np.std(theValues) if hasValues else np.nan
+        rowList.append(oneRow)
+    return rowList
+
+
 class NumpyEncoder(json.JSONEncoder):
     """Special json encoder for numpy types"""
 
@@ -36,7 +36,6 @@ import glob
 import copy
 from collections import OrderedDict
 
-from matplotlib.font_manager import json_load
 
 # from colin.stochAnalysis import load
 
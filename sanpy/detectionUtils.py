@@ -1,10 +1,9 @@
 from pprint import pprint
 
 from typing import List, Union, Optional  # Callable, Iterator, Optional
-import warnings  # to catch np.polyfit -->> RankWarning: Polyfit may be poorly conditioned
 
 import numpy as np
-import scipy.signal
+import scipy  # submodules like scipy.signal are loaded on first use
 
 import sanpy
 
@@ -81,27 +80,10 @@ def reduceByRefractory(spikeTimes: List[int], refractoryPnts: int):
     refractoryPnts:
     """
 
-    # refractory_ms = 20 #10 # remove spike [i] if it occurs within refractory_ms of spike [i-1]
-
-    spikeTimes = spikeTimes.copy()  # make a copy of the list, we are modifying it
-
-    lastGood = 0  # first spike [0] will always be good, there is no spike [i-1]
-    for i in range(len(spikeTimes)):
-        if i == 0:
-            # first spike is always good
-            continue
-        dPoints = spikeTimes[i] - spikeTimes[lastGood]
-        if dPoints < refractoryPnts:
-            # remove spike time [i]
-            spikeTimes[i] = 0
-        else:
-            # spike time [i] was good
-            lastGood = i
-
-    # regenerate spikeTimes0 by throwing out any spike time that does not pass 'if spikeTime'
-    # spikeTimes[i] that were set to 0 above (they were too close to the previous spike)
-    newSpikeTimes = [spikeTime for spikeTime in spikeTimes if spikeTime]
-    return newSpikeTimes
+    newSpikeTimes, _ = sanpy.analysisUtil.throwOutRefractory(
+        spikeTimes, refractoryPnts
+    )
+    return list(newSpikeTimes)
 
 
 def refineWithDerivative(
@@ -525,91 +507,53 @@ def getEarlyDiastolicDurationRate(
     # linear fit on 10% - 50% of the time from preMinPnt to self.spikeTimes[i]
     startLinearFit = 0.1  # percent of time between pre spike min and AP peak
     stopLinearFit = 0.5  #
-    defaultVal = float("nan")
 
     x = np.arange(start=0, stop=len(y), step=1)
 
-    retSpikeDict = [{}] * len(spikeTimes)
-    errorList = [[]] * len(spikeTimes)
-
-    for idx, spikeTime in enumerate(spikeTimes):
-        preMinPnt = preMinPnts[idx]  # can be nan
-        if preMinPnt is None:
-            # TODO: If all are None then our return dict will be empty
-            continue
-        timeInterval_pnts = spikeTime - preMinPnt
-        # taking round() so we always get an integer # points
-        preLinearFitPnt0 = preMinPnt + round(timeInterval_pnts * startLinearFit)
-        preLinearFitPnt1 = preMinPnt + round(timeInterval_pnts * stopLinearFit)
-        preLinearFitVal0 = y[preLinearFitPnt0]
-        preLinearFitVal1 = y[preLinearFitPnt1]
+    retSpikeDict = [{} for _ in spikeTimes]
+    errorList = [[] for _ in spikeTimes]
+
+    # spikes with a preMinPnt
+    goodIdx = [idx for idx, preMinPnt in enumerate(preMinPnts) if preMinPnt is not None]
+    if len(goodIdx) == 0:
+        # TODO: If all are None then our return dict will be empty
+        return retSpikeDict, errorList
+    spikePnts = np.asarray(spikeTimes)[goodIdx]
+    preMinPntArray = np.asarray([preMinPnts[idx] for idx in goodIdx])
+    timeInterval_pnts = spikePnts - preMinPntArray
+    # taking round() so we always get an integer # points
+    preLinearFitPnt0 = preMinPntArray + np.round(timeInterval_pnts * startLinearFit).astype(int)
+    preLinearFitPnt1 = preMinPntArray + np.round(timeInterval_pnts * stopLinearFit).astype(int)
+
+    # a linear fit where 'm,b = np.polyfit(x, y, 1)', m*x+b"
+    mLinear, _, numFitPnts = sanpy.analysisUtil.windowLinearFit(
+        x, y, preLinearFitPnt0, preLinearFitPnt1
+    )
 
+    errorType = "Fit EDD"
+    for i, idx in enumerate(goodIdx):
         # linear fit before spike
-        retSpikeDict[idx]["preLinearFitPnt0"] = preLinearFitPnt0
-        retSpikeDict[idx]["preLinearFitPnt1"] = preLinearFitPnt1
-        # retSpikeDict[idx]['earlyDiastolicDuration_ms'] = self.pnt2Ms_(preLinearFitPnt1 - preLinearFitPnt0)
-        retSpikeDict[idx]["preLinearFitVal0"] = preLinearFitVal0
-        retSpikeDict[idx]["preLinearFitVal1"] = preLinearFitVal1
-
-        # a linear fit where 'm,b = np.polyfit(x, y, 1)', m*x+b"
-        xFit = x[preLinearFitPnt0:preLinearFitPnt1]
-        yFit = y[preLinearFitPnt0:preLinearFitPnt1]
-
-        # sometimes xFit/yFit have 0 length -->> TypeError
-        # print(f' {iIdx} preLinearFitPnt0:{preLinearFitPnt0}, preLinearFitPnt1:{preLinearFitPnt1}')
-        # print(f'    xFit:{len(xFit)} yFit:{len(yFit)}')
-
-        with warnings.catch_warnings():
-            warnings.filterwarnings("error")
-            try:
-                mLinear, bLinear = np.polyfit(
-                    xFit, yFit, 1
-                )  # m is slope, b is intercept
-                retSpikeDict[idx]["earlyDiastolicDurationRate"] = mLinear
-                # make an error if edd rate is too low
-                if mLinear <= lowEddRate_warning:
-                    errorType = "Fit EDD"
-                    errorStr = f"Early diastolic duration rate fit - Too low {round(mLinear,3)}<={lowEddRate_warning}"
-                    eDict = getErrorDict(
-                        idx, spikeTime, errorType, errorStr
-                    )  # spikeTime is in pnts
-                    errorList[idx].append(eDict)
-                    if verbose:
-                        print(f"  spike:{idx} error:{eDict}")
-
-            except TypeError as e:
-                # catching exception:  expected non-empty vector for x
-                # xFit/yFit turn up empty when mdp and TOP points are within 1 point
-                retSpikeDict[idx]["earlyDiastolicDurationRate"] = defaultVal
-                errorType = "Fit EDD"
-                errorStr = "Early diastolic duration rate fit - preMinPnt == spikePnt"
-                eDict = getErrorDict(idx, spikeTime, errorType, errorStr)
-                errorList[idx].append(eDict)
-                if verbose:
-                    logger.error(f"  spike:{idx} error:{eDict}")
-            except np.RankWarning as e:
-                # logger.error('== FIX preLinearFitPnt0/preLinearFitPnt1 RankWarning')
-                # logger.error(f'  error is: {e}')
-                # print('RankWarning')
-                # also throws: RankWarning: Polyfit may be poorly conditioned
-                retSpikeDict[idx]["earlyDiastolicDurationRate"] = defaultVal
-                errorType = "Fit EDD"
-                errorStr = "Early diastolic duration rate fit - RankWarning"
-                eDict = getErrorDict(idx, spikeTime, errorType, errorStr)
-                errorList[idx].append(eDict)
-                if verbose:
-                    logger.error(f"  spike:{idx} error:{eDict}")
-            except:
-                logger.error(
-                    f" !!!!!!!! UNKNOWN EXCEPTION DURING EDD LINEAR FIT for spike {idx}"
-                )
-                retSpikeDict[idx]["earlyDiastolicDurationRate"] = defaultVal
-                errorType = "Fit EDD"
-                errorStr = "Early diastolic duration rate fit - Unknown Exception"
-                eDict = getErrorDict(idx, spikeTime, errorType, errorStr)
-                errorList[idx].append(eDict)
-                if verbose:
-                    logger.error(f"  spike:{idx} error:{eDict}")
+        retSpikeDict[idx]["preLinearFitPnt0"] = preLinearFitPnt0[i]
+        retSpikeDict[idx]["preLinearFitPnt1"] = preLinearFitPnt1[i]
+        retSpikeDict[idx]["preLinearFitVal0"] = y[preLinearFitPnt0[i]]
+        retSpikeDict[idx]["preLinearFitVal1"] = y[preLinearFitPnt1[i]]
+        retSpikeDict[idx]["earlyDiastolicDurationRate"] = mLinear[i]
+
+        if numFitPnts[i] == 0:
+            # xFit/yFit turn up empty when mdp and TOP points are within 1 point
+            errorStr = "Early diastolic duration rate fit - preMinPnt == spikePnt"
+        elif np.isnan(mLinear[i]):
+            # Polyfit may be poorly conditioned
+            errorStr = "Early diastolic duration rate fit - RankWarning"
+        elif mLinear[i] <= lowEddRate_warning:
+            # make an error if edd rate is too low
+            errorStr = f"Early diastolic duration rate fit - Too low {round(mLinear[i],3)}<={lowEddRate_warning}"
+        else:
+            continue
+        eDict = getErrorDict(idx, spikeTimes[idx], errorType, errorStr)
+        errorList[idx].append(eDict)
+        if verbose:
+            logger.error(f"  spike:{idx} error:{eDict}")
 
     return retSpikeDict, errorList
 
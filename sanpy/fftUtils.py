@@ -366,25 +366,9 @@ def _throwOutRefractory(spikePoints, refractory_ms=100):
     before = len(spikePoints)
 
     # if there are doubles, throw-out the second one
-    # refractory_ms = 20 #10 # remove spike [i] if it occurs within refractory_ms of spike [i-1]
-    lastGood = 0  # first spike [0] will always be good, there is no spike [i-1]
-    for i in range(len(spikePoints)):
-        if i == 0:
-            # first spike is always good
-            continue
-        dPoints = spikePoints[i] - spikePoints[lastGood]
-        if dPoints < dataPointsPerMs * refractory_ms:
-            # remove spike time [i]
-            spikePoints[i] = 0
-        else:
-            # spike time [i] was good
-            lastGood = i
-    # regenerate spikeTimes0 by throwing out any spike time that does not pass 'if spikeTime'
-    # spikeTimes[i] that were set to 0 above (they were too close to the previous spike)
-    # will not pass 'if spikeTime', as 'if 0' evaluates to False
-    # if goodSpikeErrors is not None:
-    # 	goodSpikeErrors = [goodSpikeErrors[idx] for idx, spikeTime in enumerate(spikeTimes0) if spikeTime]
-    spikePoints = [spikePoint for spikePoint in spikePoints if spikePoint]
+    spikePoints, _ = sanpy.analysisUtil.throwOutRefractory(
+        spikePoints, dataPointsPerMs * refractory_ms
+    )
 
     # TODO: put back in and log if detection ['verbose']
     after = len(spikePoints)
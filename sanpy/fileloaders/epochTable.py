@@ -22,11 +22,21 @@ class epochTable():
 
     """
 
-    def __init__(self, abf: pyabf.ABF = None):
+    def __init__(self, abf: pyabf.ABF = None, sweepNumber: int = None, sweepEpochs=None):
+        """
+        Parameters
+        ----------
+        abf : pyabf.ABF
+            Build from the current sweep of abf (abf.sweepNumber and abf.sweepEpochs).
+        sweepNumber : int
+            Optional, build from this sweep with sweepEpochs, abf does not need to call setSweep().
+        sweepEpochs : pyabf.waveform.EpochSweepWaveform
+            Required with sweepNumber.
+        """
         self._epochList = []
 
         if abf is not None:
-            self._builFromAbf(abf)
+            self._builFromAbf(abf, sweepNumber, sweepEpochs)
     
     def __str__(self):
         return self.getEpochList(asDataFrame=True).to_string()
@@ -59,31 +69,35 @@ class epochTable():
     def getSweepEpoch(self, sweep):
         return self._epochList[sweep]
 
-    def _builFromAbf(self, abf: pyabf.ABF):
+    def _builFromAbf(self, abf: pyabf.ABF, sweepNumber: int = None, sweepEpochs=None):
         dataPointsPerMs = abf.dataPointsPerMs
         """To convert point to seconds"""
 
+        if sweepNumber is None:
+            sweepNumber = abf.sweepNumber
+            sweepEpochs = abf.sweepEpochs
+
         try:
-            _tmp = abf.sweepEpochs.p1s
+            _tmp = sweepEpochs.p1s
         except AttributeError as e:
             logger.error(e)
             return
 
         # sweepEpochs is type "pyabf.waveform.EpochSweepWaveform"
-        for epochIdx, p1 in enumerate(abf.sweepEpochs.p1s):
-            p2 = abf.sweepEpochs.p2s[epochIdx]  # stop point of each pulse
-            epochLevel = abf.sweepEpochs.levels[epochIdx]
-            epochType = abf.sweepEpochs.types[epochIdx]
-            pulseWidth = abf.sweepEpochs.pulseWidths[epochIdx]
-            pulsePeriod = abf.sweepEpochs.pulsePeriods[epochIdx]
-            digitalState = abf.sweepEpochs.pulsePeriods[epochIdx]
+        for epochIdx, p1 in enumerate(sweepEpochs.p1s):
+            p2 = sweepEpochs.p2s[epochIdx]  # stop point of each pulse
+            epochLevel = sweepEpochs.levels[epochIdx]
+            epochType = sweepEpochs.types[epochIdx]
+            pulseWidth = sweepEpochs.pulseWidths[epochIdx]
+            pulsePeriod = sweepEpochs.pulsePeriods[epochIdx]
+            digitalState = sweepEpochs.pulsePeriods[epochIdx]
             ##print(f"epoch index {epochIdx}: at point {p1} there is a {epochType} to level {epochLevel}")
 
             p1_sec = p1 / abf.dataPointsPerMs / 1000
             p2_sec = p2 / abf.dataPointsPerMs / 1000
 
             epochDict = {
-                "sweepNumber": abf.sweepNumber,
+                "sweepNumber": sweepNumber,
                 "index": epochIdx,
                 "type": epochType,
                 "startPoint": p1,  # point the epoch starts
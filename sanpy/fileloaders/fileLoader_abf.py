@@ -1,4 +1,4 @@
-from typing import Union, Dict, List, Tuple
+from typing import Union, Dict, List, Tuple, Optional
 import numpy as np
 import pyabf
 
@@ -18,12 +18,25 @@ class fileLoader_abf(fileLoader_base):
     #     return 'abf'
 
     def loadFile(self):
-        self._loadAbf()
+        self._loadAbf(loadData=self.loadData, lazy=self.lazy)
 
     def _loadAbf(
-        self, byteStream=None, loadData: bool = True, stimulusFileFolder: str = None
+        self,
+        byteStream=None,
+        loadData: bool = True,
+        stimulusFileFolder: str = None,
+        lazy: bool = False,
     ):
-        """Load pyAbf from path."""
+        """Load pyAbf from path.
+
+        If lazy, only the header is loaded and sweeps are read from a
+        memory map of the abf data section when needed (see _loadSweepY).
+        """
+        if lazy and byteStream is not None:
+            logger.warning("lazy loading needs a file, loading all data")
+            lazy = False
+            self._lazy = False
+
         try:
             # logger.info(f'loadData:{loadData}')
             if byteStream is not None:
@@ -34,7 +47,7 @@ class fileLoader_abf(fileLoader_base):
                 # logger.info(f'Loading file: {self.filepath}')
                 self._abf = pyabf.ABF(
                     self.filepath,
-                    loadData=loadData,
+                    loadData=loadData and not lazy,
                     stimulusFileFolder=stimulusFileFolder,
                 )
 
@@ -52,22 +65,29 @@ class fileLoader_abf(fileLoader_base):
             self._loadError = True
             self._abf = None
 
-        if loadData:
+        # header (and epoch table) are loaded with or without loadData
+        if self._abf is not None:
+            # pyabf epochs for all sweeps, abf.setSweep() would load the data
+            self._pyabfEpochTable = None
             try:
-                _tmp = self._abf.sweepEpochs.p1s
-            except AttributeError as e:
+                if len(self._abf.holdingCommand) > 0:
+                    self._pyabfEpochTable = pyabf.waveform.EpochTable(self._abf, 0)
+            except Exception as e:
+                # same as pyabf failing in setSweep()
+                logger.warning(f"    pyabf EpochTable exception {e}")
+
+            if self._pyabfEpochTable is None:
                 logger.warning(
-                    f"    did not find epochTable loadData:{loadData}: {e} in file {self.filepath}"
+                    f"    did not find epochTable loadData:{loadData} in file {self.filepath}"
                 )
             else:
                 _numSweeps = len(self._abf.sweepList)
                 self._epochTableList = [None] * _numSweeps
-                for _sweepIdx in range(_numSweeps):
-                    self._abf.setSweep(_sweepIdx)
-                    self._epochTableList[_sweepIdx] = sanpy.fileloaders.epochTable(
-                        self._abf
-                    )
-                self._abf.setSweep(0)
+                if not lazy:
+                    for _sweepIdx in range(_numSweeps):
+                        self._epochTableList[_sweepIdx] = self._loadEpochTable(
+                            _sweepIdx
+                        )
 
             self._sweepList = self._abf.sweepList
             self._sweepLengthSec = (
@@ -75,7 +95,11 @@ class fileLoader_abf(fileLoader_base):
             )  # assuming all sweeps have the same duration
 
             # on load, sweep is 0
-            if loadData:
+            if lazy:
+                # sweepX is made when needed, same as pyabf setSweep(), all sweeps have the same length
+                self._lazyNumPnts = self._abf.sweepPointCount
+                self._lazySecondsPerPnt = self._abf.dataSecPerPoint
+            elif loadData:
                 _numRows = self._abf.sweepX.shape[0]
                 numSweeps = len(self._sweepList)
                 self._sweepX = np.zeros((_numRows, 1))
@@ -156,7 +180,77 @@ class fileLoader_abf(fileLoader_base):
 
         # base sanpy does not keep the abf around
         # logger.warning('[[[TURNED BACK ON]]] I turned off assigning self._abf=None for stoch-res stim file load')
-        self._abf = None
+        if not lazy:
+            # lazy keeps the abf header to load sweeps and epochs
+            self._abf = None
+            self._pyabfEpochTable = None
+
+    def getChunkLoader(
+        self, sweepNumber: int, startPnt: int, stopPnt: int
+    ) -> "fileLoader_abf":
+        """See fileLoader_base.getChunkLoader(), the copy does not keep the lazy abf header."""
+        chunkLoader = super().getChunkLoader(sweepNumber, startPnt, stopPnt)
+        chunkLoader._abf = None  # pyabf header has closed files, can not pickle
+        chunkLoader._pyabfEpochTable = None
+        return chunkLoader
+
+    def _loadEpochTable(self, sweepNumber: int) -> "sanpy.fileloaders.epochTable":
+        """Build the epoch table of one sweep."""
+        if self._pyabfEpochTable is None:
+            return None
+        sweepEpochs = self._pyabfEpochTable.epochWaveformsBySweep[sweepNumber]
+        return sanpy.fileloaders.epochTable(
+            self._abf, sweepNumber=sweepNumber, sweepEpochs=sweepEpochs
+        )
+
+    def _loadSweepY(
+        self, sweepNumber: int, startPnt: int = 0, stopPnt: Optional[int] = None
+    ) -> np.ndarray:
+        """Read one sweep from a memory map of the abf data section.
+
+        Scaled the same as pyabf ABF._loadAndScaleData().
+        Only points [startPnt, stopPnt) of the sweep are read.
+        """
+        abf = self._abf
+        _channel = 0
+        numChannels = abf.channelCount
+        numRows = int(abf.dataPointCount / numChannels)
+        rawData = np.memmap(
+            self.filepath,
+            dtype=abf._dtype,
+            mode="r",
+            offset=abf.dataByteStart,
+            shape=(numRows, numChannels),
+        )
+        if stopPnt is None or stopPnt > abf.sweepPointCount:
+            stopPnt = abf.sweepPointCount
+        pointStart = abf.sweepPointCount * sweepNumber + startPnt
+        pointStop = abf.sweepPointCount * sweepNumber + stopPnt
+
+        sweepY = rawData[pointStart:pointStop, _channel].astype(np.float32)
+        if abf._dtype == np.int16:
+            sweepY[:] = np.multiply(sweepY, abf._dataGain[_channel])
+            sweepY[:] = np.add(sweepY, abf._dataOffset[_channel])
+
+        del rawData
+
+        return sweepY.astype(np.float64)
+
+    def _loadSweepC(self, sweepNumber: int) -> Optional[np.ndarray]:
+        """Get the DAC command of one sweep from the abf header."""
+        _channel = 0
+        try:
+            stimulus = self._abf.stimulusByChannel[_channel]
+            sweepC = stimulus.stimulusWaveform(sweepNumber)
+        except ValueError as e:
+            logger.warning(f"    exception fetching sweepC for sweep {sweepNumber}: {e}")
+            return None
+
+        sweepC = np.asarray(sweepC, dtype=np.float64)[: self._abf.sweepPointCount]
+        if len(sweepC) != self._abf.sweepPointCount:
+            logger.warning(f"ba has no sweep {sweepNumber} sweepC ???")
+            return None
+        return sweepC
 
 if __name__ == '__main__':
     path = '/Users/cudmore/Dropbox/data/wu-lab-stanford/tang/R1_S1_IC_AP_Family.abf'
@@ -1,13 +1,15 @@
 import os
+import copy
 import glob
 import math
 import enum
 import inspect
+from collections import OrderedDict
 from typing import Union, Dict, List, Tuple, Optional
 from abc import ABC, abstractmethod
 
 import numpy as np
-import scipy.signal
+import scipy  # submodules like scipy.signal are loaded on first use
 
 import sanpy.fileloaders
 
@@ -170,9 +172,20 @@ class fileLoader_base(ABC):
             # specify what was loaded
             self.setLoadedData(sweepX, sweepY)
 
+    If `self.loadData` is False, a loader may only load the header.
+
+    A loader can support `lazy` loading by only loading the header and
+    defining `_loadSweepY(sweepNumber)`, and optionally `_loadSweepC()` and
+    `_loadEpochTable()`. Sweeps are then loaded when they are needed.
+    A lazy loader sets `_lazyNumPnts` and `_lazySecondsPerPnt` instead of
+    `_sweepX`, the x values are made when they are needed.
     """
 
     loadFileType: str = ""
+
+    derivativeCacheSize: int = 3
+    """Number of filtered recordings to keep, see _getDerivative(). Not used when lazy."""
+
     # @property
     # @abstractmethod
     # def loadFileType(self) -> str:
@@ -186,7 +199,7 @@ class fileLoader_base(ABC):
         """Derived classes must load the data and call setLoadedData(sweepX, sweepY)."""
         pass
 
-    def __init__(self, filepath: str, loadData: bool = True):
+    def __init__(self, filepath: str, loadData: bool = True, lazy: bool = False):
         """Base class to derive new file loaders.
 
         Parameters
@@ -195,6 +208,9 @@ class fileLoader_base(ABC):
             File path to load. Will use different derived classes based on extension
         loadData : bool
             If True then load raw data, otherwise just load the header.
+        lazy : bool
+            If True then load sweeps (and epoch tables) when they are needed.
+            Only used by loaders that support it, like fileLoader_abf.
         """
 
         super().__init__()
@@ -205,12 +221,34 @@ class fileLoader_base(ABC):
 
         self._path = filepath
 
+        self._loadData = loadData
+        self._lazy = lazy
+
+        # (sweepNumber, values) of the last lazy loaded sweep
+        self._lazySweepY = None
+        self._lazySweepC = None
+
+        # when lazy, points per sweep and seconds per point to make sweepX
+        self._lazyNumPnts: int = None
+        self._lazySecondsPerPnt: float = None
+
         self._metaData = sanpy.metaData.MetaData()  # per file metadata
 
         self._filteredY : np.ndarray = None  # set in _getDerivative
         self._filteredDeriv : np.ndarray = None
         self._currentSweep: int = 0
 
+        # (_filteredY, _filteredDeriv) keyed by filter parameters, least recently used first
+        self._derivativeCache: OrderedDict = OrderedDict()
+
+        # (medianFilter, SavitzkyGolay_pnts, SavitzkyGolay_poly) of the last _getDerivative()
+        self._filterParams: tuple = None
+        # when lazy, (sweepNumber,) + _filterParams of the one sweep in _filteredY and _filteredDeriv
+        self._filteredKey: tuple = None
+
+        # first point in the sweep, not 0 for a chunk (see getChunkLoader)
+        self._startPnt: int = 0
+
         self._epochTableList: List[sanpy.fileloaders.epochTable] = None
 
         self._sweepX = None
@@ -227,6 +265,10 @@ class fileLoader_base(ABC):
         # load file from inherited class
         self.loadFile()
 
+        if self._sweepY is not None:
+            # loader does not support lazy, it loaded all sweeps
+            self._lazy = False
+
         # check our work
         self._checkLoadedData()
 
@@ -238,6 +280,75 @@ class fileLoader_base(ABC):
     @property
     def metadata(self):
         return self._metaData
+
+    @property
+    def loadData(self) -> bool:
+        """If False, only the header was loaded (no raw data)."""
+        return self._loadData
+
+    @property
+    def lazy(self) -> bool:
+        """If True, sweeps are loaded when needed (see _loadSweepY)."""
+        return self._lazy
+
+    def _loadSweepY(
+        self, sweepNumber: int, startPnt: int = 0, stopPnt: Optional[int] = None
+    ) -> np.ndarray:
+        """Derived classes that support lazy loading return the Y values of one sweep.
+
+        Only points [startPnt, stopPnt) are returned, stopPnt None is the end of the sweep.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not lazy load sweeps")
+
+    def _loadSweepC(self, sweepNumber: int) -> Optional[np.ndarray]:
+        """Derived classes that support lazy loading return the DAC of one sweep (or None)."""
+        return None
+
+    def _loadEpochTable(self, sweepNumber: int) -> "sanpy.fileloaders.epochTable":
+        """Derived classes return the epoch table of one sweep.
+
+        Used for entries of self._epochTableList that are None.
+        """
+        return None
+
+    def _getSweepY(self, sweepNumber: int) -> np.ndarray:
+        """Get the Y values of one sweep, lazy load if necc."""
+        if not self.lazy:
+            return self._sweepY[:, sweepNumber]
+        if self._lazySweepY is None or self._lazySweepY[0] != sweepNumber:
+            self._lazySweepY = (sweepNumber, self._loadSweepY(sweepNumber))
+        return self._lazySweepY[1]
+
+    def _getSweepYRange(self, sweepNumber: int, startPnt: int, stopPnt: int) -> np.ndarray:
+        """Get Y values [startPnt, stopPnt) of one sweep, when lazy only those points are read."""
+        if not self.lazy:
+            return self._sweepY[startPnt:stopPnt, sweepNumber]
+        return self._loadSweepY(sweepNumber, startPnt, stopPnt)
+
+    def _getSweepC(self, sweepNumber: int) -> Optional[np.ndarray]:
+        """Get the DAC of one sweep, lazy load if necc. None if there is no DAC."""
+        if not self.lazy:
+            if self._sweepC is None:
+                return None
+            return self._sweepC[:, sweepNumber]
+        if self._lazySweepC is None or self._lazySweepC[0] != sweepNumber:
+            self._lazySweepC = (sweepNumber, self._loadSweepC(sweepNumber))
+        return self._lazySweepC[1]
+
+    def _getSweepXRange(self, startPnt: int = 0, stopPnt: Optional[int] = None) -> np.ndarray:
+        """Get X values (seconds) [startPnt, stopPnt), when lazy only those points are made."""
+        if not self.lazy:
+            return self._sweepX[startPnt:stopPnt, 0]
+        if stopPnt is None or stopPnt > self._lazyNumPnts:
+            stopPnt = self._lazyNumPnts
+        return np.arange(startPnt, stopPnt) * self._lazySecondsPerPnt
+
+    @property
+    def numPnts(self) -> int:
+        """Get the number of points in each sweep."""
+        if not self.lazy:
+            return self._sweepX.shape[0]
+        return self._lazyNumPnts
     
     def setAcqDate(self, value):
         self.metadata.setMetaData('Acq Date', value, triggerDirty=False)
@@ -333,20 +444,23 @@ class fileLoader_base(ABC):
         All sweeps are assumed to have the same x-values (seconds).
         """
         # return self._sweepX[:, self.currentSweep]
+        if self.lazy:
+            return self._getSweepXRange()
         return self._sweepX[:, 0]
 
     @property
     def sweepY(self):
         """Get the Y values for the current sweep."""
-        return self._sweepY[:, self.currentSweep]
+        return self._getSweepY(self.currentSweep)
 
     @property
     def sweepC(self):
         """Get the DAC command for the current sweep."""
-        if self._sweepC is None:
+        sweepC = self._getSweepC(self.currentSweep)
+        if sweepC is None:
             # return np.zeros_like(self._sweepX[:, self.currentSweep])
-            return np.zeros_like(self._sweepX[:, 0])
-        return self._sweepC[:, self.currentSweep]
+            return np.zeros(self.numPnts)
+        return sweepC
 
     def get_xUnits(self):
         return self._sweepLabelX
@@ -357,11 +471,51 @@ class fileLoader_base(ABC):
     @property
     def filteredDeriv(self) -> Optional[np.ndarray]:
         """Get the filtered first derivative of sweepY."""
+        column = self._getFilteredColumn()
         if self._filteredDeriv is not None:
-            return self._filteredDeriv[:, self.currentSweep]
+            return self._filteredDeriv[:, column]
         else:
             return None
 
+    def _getFilteredColumn(self) -> int:
+        """Get the column of the current sweep in _filteredY and _filteredDeriv.
+
+        When lazy, only the current sweep is filtered, it is filtered
+        when it is first needed with the parameters of the last _getDerivative().
+        """
+        if not self.lazy:
+            return self.currentSweep
+        filterParams = self._filterParams
+        if filterParams is None:
+            filterParams = (0, 5, 2)  # defaults of _getDerivative()
+        filteredKey = (self.currentSweep,) + filterParams
+        if self._filteredKey != filteredKey:
+            sweepY = self._getSweepY(self.currentSweep).reshape(-1, 1)
+            self._filteredY, self._filteredDeriv = self._filterSweepY(
+                sweepY, *filterParams
+            )
+            self._filteredKey = filteredKey
+        return 0
+
+    def _getFilteredRange(self, sweepNumber: int, startPnt: int, stopPnt: int) -> np.ndarray:
+        """Get filtered Y values [startPnt, stopPnt) of one sweep.
+
+        When lazy, only these points (and the edges the filter needs) are read and filtered.
+        """
+        if not self.lazy:
+            return self._filteredY[startPnt:stopPnt, sweepNumber]
+
+        filterParams = self._filterParams
+        if filterParams is None:
+            filterParams = (0, 5, 2)  # defaults of _getDerivative()
+        medianFilter, SavitzkyGolay_pnts, _ = filterParams
+        edgePnts = medianFilter + SavitzkyGolay_pnts + 2
+        readStart = max(startPnt - edgePnts, 0)
+        readStop = min(stopPnt + edgePnts, self.numPnts)
+        sweepY = self._getSweepYRange(sweepNumber, readStart, readStop).reshape(-1, 1)
+        filteredY, _ = self._filterSweepY(sweepY, *filterParams)
+        return filteredY[startPnt - readStart : stopPnt - readStart, 0]
+
     def _getDerivative(
         self,
         medianFilter: int = 0,
@@ -385,6 +539,12 @@ class fileLoader_base(ABC):
         Creates:
             self._filteredVm
             self._filteredDeriv
+
+        The last derivativeCacheSize results are cached by filter parameters,
+        the cache is cleared in setLoadedData().
+
+        When lazy, nothing is filtered or cached and None is returned. The
+        current sweep is filtered when it is needed (see _getFilteredColumn).
         """
 
         # logger.info(f'{self.filename} medianFilter:{medianFilter} SavitzkyGolay_pnts:{SavitzkyGolay_pnts} SavitzkyGolay_poly:{SavitzkyGolay_poly}')
@@ -392,6 +552,51 @@ class fileLoader_base(ABC):
         if not isinstance(medianFilter, int):
             logger.error(f"expecting int medianFilter, got: {medianFilter}")
 
+        cacheKey = (medianFilter, SavitzkyGolay_pnts, SavitzkyGolay_poly)
+        self._filterParams = cacheKey
+
+        if self.lazy:
+            return None
+
+        if cacheKey in self._derivativeCache:
+            self._derivativeCache.move_to_end(cacheKey)
+            self._filteredY, self._filteredDeriv = self._derivativeCache[cacheKey]
+            return self._filteredDeriv
+
+        # all sweeps
+        self._filteredY, self._filteredDeriv = self._filterSweepY(
+            self._sweepY, medianFilter, SavitzkyGolay_pnts, SavitzkyGolay_poly
+        )
+
+        self._derivativeCache[cacheKey] = (self._filteredY, self._filteredDeriv)
+        while len(self._derivativeCache) > self.derivativeCacheSize:
+            self._derivativeCache.popitem(last=False)
+
+        # logger.info(f'  sweepX:{self.sweepX.shape}')
+        # logger.info(f'  sweepY:{self.sweepY.shape}')
+        # logger.info(f'  _filteredY:{self._filteredY.shape}')
+        # logger.info(f'  2- _filteredDeriv:{self._filteredDeriv.shape}')
+
+        return self._filteredDeriv
+
+    def _filterSweepY(
+        self,
+        sweepY: np.ndarray,
+        medianFilter: int,
+        SavitzkyGolay_pnts: int,
+        SavitzkyGolay_poly: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Filter Y values and their derivative, see _getDerivative().
+
+        Parameters
+        ----------
+        sweepY : np.ndarray
+            Y values with shape (points, sweeps)
+
+        Returns
+        -------
+        (filteredY, filteredDeriv), both with the shape of sweepY
+        """
         if medianFilter > 0:
             if not medianFilter % 2:
                 medianFilter += 1
@@ -399,19 +604,20 @@ class fileLoader_base(ABC):
                     "Please use an odd value for the median filter, set medianFilter: {medianFilter}"
                 )
             medianFilter = int(medianFilter)
-            self._filteredY = scipy.signal.medfilt2d(self._sweepY, [medianFilter, 1])
+            filteredY = scipy.signal.medfilt2d(sweepY, [medianFilter, 1])
         elif SavitzkyGolay_pnts > 0:
-            self._filteredY = scipy.signal.savgol_filter(
-                self._sweepY,
+            filteredY = scipy.signal.savgol_filter(
+                sweepY,
                 SavitzkyGolay_pnts,
                 SavitzkyGolay_poly,
                 axis=0,
                 mode="nearest",
             )
         else:
-            self._filteredY = self.sweepY
+            # all sweeps, not just the current sweep
+            filteredY = sweepY
 
-        self._filteredDeriv = np.diff(self._filteredY, axis=0)
+        filteredDeriv = np.diff(filteredY, axis=0)
 
         # filter the derivative
         if medianFilter > 0:
@@ -421,12 +627,12 @@ class fileLoader_base(ABC):
                     f"Please use an odd value for the median filter, set medianFilter: {medianFilter}"
                 )
             medianFilter = int(medianFilter)
-            self._filteredDeriv = scipy.signal.medfilt2d(
-                self._filteredDeriv, [medianFilter, 1]
+            filteredDeriv = scipy.signal.medfilt2d(
+                filteredDeriv, [medianFilter, 1]
             )
         elif SavitzkyGolay_pnts > 0:
-            self._filteredDeriv = scipy.signal.savgol_filter(
-                self._filteredDeriv,
+            filteredDeriv = scipy.signal.savgol_filter(
+                filteredDeriv,
                 SavitzkyGolay_pnts,
                 SavitzkyGolay_poly,
                 axis=0,
@@ -438,11 +644,11 @@ class fileLoader_base(ABC):
 
         # mV/ms
         dataPointsPerMs = self.dataPointsPerMs
-        self._filteredDeriv = self._filteredDeriv * dataPointsPerMs  # / 1000
+        filteredDeriv = filteredDeriv * dataPointsPerMs  # / 1000
 
         # insert an initial point (rw) so it is the same length as raw data in abf.sweepY
         # three options (concatenate, insert, vstack), could only get vstack working
-        rowOfZeros = np.zeros(self.numSweeps)
+        rowOfZeros = np.zeros(sweepY.shape[1])
 
         # logger.info(f' dataPointsPerMs:{dataPointsPerMs}')
         # logger.info(f' self.numSweeps:{self.numSweeps}')
@@ -450,20 +656,16 @@ class fileLoader_base(ABC):
         # logger.info(f' 1 - _filteredDeriv:{self._filteredDeriv.shape}')
 
         # rowZero = 0
-        self._filteredDeriv = np.vstack([rowOfZeros, self._filteredDeriv])
+        filteredDeriv = np.vstack([rowOfZeros, filteredDeriv])
 
-        # logger.info(f'  sweepX:{self.sweepX.shape}')
-        # logger.info(f'  sweepY:{self.sweepY.shape}')
-        # logger.info(f'  _filteredY:{self._filteredY.shape}')
-        # logger.info(f'  2- _filteredDeriv:{self._filteredDeriv.shape}')
-
-        return self._filteredDeriv
+        return filteredY, filteredDeriv
     
     @property
     def sweepY_filtered(self) -> np.ndarray:
         """Get a filtered version of sweepY."""
+        column = self._getFilteredColumn()
         if self._filteredY is not None:
-            return self._filteredY[:, self.currentSweep]
+            return self._filteredY[:, column]
 
     @property
     def recordingFrequency(self) -> int:
@@ -480,12 +682,14 @@ class fileLoader_base(ABC):
         Returns
         -------
         float
-            The point in seconds (s)
+            The point in seconds (s) into the sweep, includes the start of a chunk (see getChunkLoader)
         """
         if pnt is None:
             # return math.isnan(pnt)
             return math.nan
         else:
+            if self._startPnt > 0:
+                pnt = pnt + self._startPnt
             return pnt / self.dataPointsPerMs / 1000
 
     def pnt2Ms_(self, pnt: int) -> float:
@@ -528,10 +732,108 @@ class fileLoader_base(ABC):
             Make API so derived file loaders can create their own
         """
         if self._epochTableList is not None:
+            if self._epochTableList[sweep] is None:
+                # lazy, build on first use
+                self._epochTableList[sweep] = self._loadEpochTable(sweep)
             return self._epochTableList[sweep]
         else:
             return None
 
+    def getAnalysisCopy(self) -> "fileLoader_base":
+        """Get a copy of this file loader that shares the recording.
+
+        The copy has its own filtered recording, filter cache and current sweep.
+        Used to detect spikes in a background thread, see bAnalysis.getDetectionCopy().
+        """
+        analysisLoader = copy.copy(self)
+        analysisLoader._derivativeCache = OrderedDict(self._derivativeCache)
+        return analysisLoader
+
+    def setFilteredFrom(self, analysisLoader: "fileLoader_base"):
+        """Use the filtered recording of a copy from getAnalysisCopy()."""
+        self._filteredY = analysisLoader._filteredY
+        self._filteredDeriv = analysisLoader._filteredDeriv
+        self._filterParams = analysisLoader._filterParams
+        self._filteredKey = analysisLoader._filteredKey
+        for cacheKey, filtered in analysisLoader._derivativeCache.items():
+            self._derivativeCache[cacheKey] = filtered
+            self._derivativeCache.move_to_end(cacheKey)
+        while len(self._derivativeCache) > self.derivativeCacheSize:
+            self._derivativeCache.popitem(last=False)
+
+    def getSweepLoader(self, sweepNumber: int) -> "fileLoader_base":
+        """Get a copy of this file loader with just one sweep.
+
+        Used to send one sweep to a worker process for spike detection.
+
+        Parameters
+        ----------
+        sweepNumber : int
+            Sweep to copy, it becomes sweep 0 in the returned file loader.
+
+        Notes
+        -----
+        The returned file loader has new (default) meta data and no filtered recording.
+        """
+        sweepLoader = self.getChunkLoader(sweepNumber, 0, self.numPnts)
+
+        sweepC = self._getSweepC(sweepNumber)
+        if sweepC is not None:
+            sweepLoader._sweepC = sweepC.reshape(-1, 1)
+        if self._epochTableList is not None:
+            sweepLoader._epochTableList = [self.getEpochTable(sweepNumber)]
+
+        return sweepLoader
+
+    def getChunkLoader(
+        self, sweepNumber: int, startPnt: int, stopPnt: int
+    ) -> "fileLoader_base":
+        """Get a copy of this file loader with points [startPnt, stopPnt) of one sweep.
+
+        Used to detect spikes in a long sweep one chunk at a time,
+        see bAnalysis.spikeDetect(chunkSec=).
+
+        Parameters
+        ----------
+        sweepNumber : int
+            Sweep to copy, it becomes sweep 0 in the returned file loader.
+        startPnt, stopPnt : int
+            Points of the sweep to copy, startPnt becomes point 0.
+
+        Notes
+        -----
+        The returned file loader has no DAC, no epoch table, new (default) meta data
+        and no filtered recording. Its pnt2Sec_() is still seconds into the sweep.
+        """
+        chunkLoader = copy.copy(self)
+
+        # the copy is never lazy, it only holds one sweep
+        chunkLoader._lazy = False
+        chunkLoader._lazySweepY = None
+        chunkLoader._lazySweepC = None
+        chunkLoader._lazyNumPnts = None
+        chunkLoader._lazySecondsPerPnt = None
+
+        chunkLoader._startPnt = self._startPnt + startPnt
+        chunkLoader._sweepX = self._getSweepXRange(startPnt, stopPnt).reshape(-1, 1)
+        chunkLoader._sweepY = self._getSweepYRange(sweepNumber, startPnt, stopPnt).reshape(-1, 1)
+        chunkLoader._sweepC = None
+        chunkLoader._epochTableList = None
+
+        chunkLoader._numSweeps = 1
+        chunkLoader._sweepList = [0]
+        chunkLoader._currentSweep = 0
+
+        chunkLoader._filteredY = None
+        chunkLoader._filteredDeriv = None
+        chunkLoader._derivativeCache = OrderedDict()
+        chunkLoader._filterParams = None
+        chunkLoader._filteredKey = None
+
+        chunkLoader._metaData = sanpy.metaData.MetaData()
+
+        return chunkLoader
+
     @property
     def numEpochs(self) -> Optional[int]:
         """Get the number of epochs.
@@ -539,7 +841,7 @@ class fileLoader_base(ABC):
         Epochs are mostly for pClamp abf files. We are assuming each sweep has the same namber of epochs.
         """
         if self._epochTableList is not None:
-            return self._epochTableList[0].numEpochs()
+            return self.getEpochTable(0).numEpochs()
 
     def _checkLoadedData(self):
         # TODO: check all the member vraiables are correct
@@ -582,6 +884,9 @@ class fileLoader_base(ABC):
         self._sweepY = sweepY
         self._sweepC = sweepC
 
+        # filtered recordings are of the old data
+        self._derivativeCache.clear()
+
         self._numSweeps: int = self._sweepY.shape[1]
         self._sweepList: List[int] = list(range(self._numSweeps))
 
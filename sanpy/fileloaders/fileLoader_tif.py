@@ -4,16 +4,16 @@ from typing import Union, Dict, List, Tuple
 
 import numpy as np
 
-import tifffile
-
 import sanpy
 from sanpy.fileloaders.fileLoader_base import fileLoader_base
 from sanpy.fileloaders.fileLoader_base import recordingModes
-from sanpy._util import _loadLineScanHeader
+from sanpy._util import _loadLineScanHeader, _lazyImport
 
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+tifffile = _lazyImport("tifffile")  # only load when we open a tif
+
 try:
     from aicsimageio import AICSImage
     from aicspylibczi import CziFile
@@ -196,6 +196,10 @@ class fileLoader_tif(fileLoader_base):
     loadFileType = "tif"
 
     def loadFile(self):
+        if not self.loadData:
+            self._loadHeader()
+            return
+
         # assuming pixels x line scan like (519, 10000)
         self._tif = tifffile.imread(self.filepath)
 
@@ -212,32 +216,7 @@ class fileLoader_tif(fileLoader_base):
                 self._tif, 1
             )  # ROSIE, so lines are not backward
 
-        if self._tif.dtype == np.uint8:
-            _bitDepth = 8
-        elif self._tif.dtype == np.uint16:
-            _bitDepth = 16
-        else:
-            logger.warning(f'Did not undertand dtype {self._tif.dtype} defaulting to bit depth 16')
-            _bitDepth = 16
-
-        # print('_bitDepth:', _bitDepth)
-        
-        # we need a header to mimic one in original bAnalysis
-        self._tifHeader = {
-            'secondsPerLine': 0.001,  # 1 ms
-            'umPerPixel': 0.3,
-            'bitDepth': _bitDepth,
-            'dtype': self._tif.dtype,
-        }
-
-        # load olympus txt file if it exists
-        _olympusHeader = _loadLineScanHeader(self.filepath)
-        if _olympusHeader is not None:
-            # logger.info('loaded olympus header for {self.filepath}')
-            # for k,v in _olympusHeader.items():
-            #     logger.info(f'  {k}: {v}')
-            self._tifHeader['umPerPixel'] = _olympusHeader["umPerPixel"]
-            self._tifHeader['secondsPerLine'] = _olympusHeader["secondsPerLine"]
+        self._tifHeader = self._makeTifHeader(self._tif.dtype)
 
         # logger.info('loaded header for {self.filepath}')
         # for k,v in self._tifHeader.items():
@@ -268,6 +247,67 @@ class fileLoader_tif(fileLoader_base):
 
         #self.setScale(secondsPerLine, umPerPixel)
 
+    def _makeTifHeader(self, dtype) -> dict:
+        """Make a header to mimic one in original bAnalysis.
+
+        Uses olympus txt file if it exists.
+        """
+        if dtype == np.uint8:
+            _bitDepth = 8
+        elif dtype == np.uint16:
+            _bitDepth = 16
+        else:
+            logger.warning(f'Did not undertand dtype {dtype} defaulting to bit depth 16')
+            _bitDepth = 16
+
+        # print('_bitDepth:', _bitDepth)
+        
+        tifHeader = {
+            'secondsPerLine': 0.001,  # 1 ms
+            'umPerPixel': 0.3,
+            'bitDepth': _bitDepth,
+            'dtype': dtype,
+        }
+
+        # load olympus txt file if it exists
+        _olympusHeader = _loadLineScanHeader(self.filepath)
+        if _olympusHeader is not None:
+            # logger.info('loaded olympus header for {self.filepath}')
+            # for k,v in _olympusHeader.items():
+            #     logger.info(f'  {k}: {v}')
+            tifHeader['umPerPixel'] = _olympusHeader["umPerPixel"]
+            tifHeader['secondsPerLine'] = _olympusHeader["secondsPerLine"]
+
+        return tifHeader
+
+    def _loadHeader(self):
+        """Load shape and dtype from tif metadata, do not read the image data.
+
+        Sets the same header values as loadFile(), tifData is None.
+        """
+        with tifffile.TiffFile(self.filepath) as tif:
+            _series = tif.series[0]
+            _shape = _series.shape
+            _dtype = _series.dtype
+
+        # check if 3d, assume (z,y,x)
+        if len(_shape) > 2:
+            _shape = _shape[-2:]
+
+        # loadFile() rotates so shape[1] is time/big
+        _numLines = max(_shape)
+
+        self._tif = None
+        self._tifHeader = self._makeTifHeader(_dtype)
+
+        _secondsPerLine = self._tifHeader['secondsPerLine']
+
+        # match setLoadedData(), sweep length is last sample point
+        self._sweepList = [0]
+        self._sweepLengthSec = (_numLines - 1) * _secondsPerLine
+        self._dataPointsPerMs = 1 / (_secondsPerLine * 1000)
+        self._recordingMode = recordingModes.kymograph
+
     #
     # need to pull/merge code from xxx
     # bAbfText._abfFromLineScanTif()
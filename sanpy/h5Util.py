@@ -6,13 +6,13 @@ import shutil
 
 import pandas as pd
 
-# april 5, removed (why did I remove???)
-import tables.scripts.ptrepack  # to save compressed .h5 file
-
+from sanpy._util import _lazyImport
 from sanpy.sanpyLogger import get_logger
 
 logger = get_logger(__name__)
 
+h5py = _lazyImport("h5py")
+
 def listKeys(hdfPath, printData=False):
     """List all keys in h5 file."""
     with pd.HDFStore(hdfPath, mode="r") as store:
@@ -59,6 +59,27 @@ def _getTmpHdfFile(hdfPath):
     return tmpHdfPath
 
 
+def getWastedFraction(hdfPath) -> float:
+    """Get fraction of h5 file that is not used by datasets.
+
+    Space of overwritten and removed keys stays in the file until it is repacked.
+    """
+    usedBytes = 0
+
+    def _addStorageSize(name, obj):
+        nonlocal usedBytes
+        if isinstance(obj, h5py.Dataset):
+            usedBytes += obj.id.get_storage_size()
+
+    with h5py.File(hdfPath, mode="r") as f:
+        f.visititems(_addStorageSize)
+
+    fileBytes = os.path.getsize(hdfPath)
+    if fileBytes == 0:
+        return 0
+    return 1 - usedBytes / fileBytes
+
+
 def _repackHdf(hdfPath):
     _folder, _file = os.path.split(hdfPath)
 
@@ -85,6 +106,9 @@ def _repackHdf(hdfPath):
     # The first item is normally the command line command name (not used)
     sys.argv = ["", "--overwrite", "--chunkshape=auto", _tmpHdfPath, _hdfPath]
 
+    # slow to import, only load when we save
+    import tables.scripts.ptrepack  # to save compressed .h5 file
+
     logger.info("    running tables.scripts.ptrepack.main()")
     logger.info(f"    sys.argv: {sys.argv}")
     try:
@@ -6,9 +6,6 @@
 from .sanpy_app import SanPyWindow
 
 from .bDetectionWidget import bDetectionWidget
-from .bScatterPlotWidget2 import bScatterPlotMainWindow
-from .bScatterPlotWidget2 import myTableView as myTableView_tmp  # used by fi plugin
-from .bExportWidget import bExportWidget
 from .bFileTable import *
 
 from .bTableView import bTableView
@@ -33,3 +30,15 @@ from .kymographPlugin2 import kymographPlugin2  # analyze cell length
 from .preferences import preferences
 
 from .util import sanpyCursors
+
+# matplotlib and seaborn widgets are imported when first used
+from sanpy._util import _lazyAttributes
+
+__getattr__ = _lazyAttributes(
+    globals(),
+    {
+        "bScatterPlotMainWindow": (".bScatterPlotWidget2", "bScatterPlotMainWindow"),
+        "myTableView_tmp": (".bScatterPlotWidget2", "myTableView"),  # used by fi plugin
+        "bExportWidget": (".bExportWidget", "bExportWidget"),
+    },
+)
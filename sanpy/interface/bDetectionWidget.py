@@ -20,6 +20,53 @@ import sanpy.interface
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+class detectionWorker(QtCore.QThread):
+    """Detect spikes in a background thread.
+
+    Detection runs on a copy of the bAnalysis (see bAnalysis.getDetectionCopy),
+    the copy is emitted in signalDetectDone and applied in the main thread.
+    """
+
+    signalDetectProgress = QtCore.pyqtSignal(object, int, int, float)  # (ba, sweepNumber, numSweeps, sweepFraction)
+    signalDetectDone = QtCore.pyqtSignal(object, object)  # (ba, baCopy), baCopy is None if cancelled
+
+    def __init__(self, ba: "sanpy.bAnalysis", detectionDict: dict, parent=None):
+        super().__init__(parent)
+        self.ba = ba
+        self._baCopy = ba.getDetectionCopy()
+        self._detectionDict = detectionDict
+        self._cancel = False
+        self.startTime = time.time()
+
+    def cancel(self):
+        """Cancel detection, it stops after the current stage or chunk of a sweep."""
+        self._cancel = True
+
+    def isCancelled(self) -> bool:
+        return self._cancel
+
+    def isDetectionCopy(self, baCopy: "sanpy.bAnalysis") -> bool:
+        return baCopy is self._baCopy
+
+    def _progress(self, sweepNumber: int, numSweeps: int, sweepFraction: float) -> bool:
+        if not self._cancel:
+            self.signalDetectProgress.emit(self.ba, sweepNumber, numSweeps, sweepFraction)
+        return not self._cancel
+
+    def run(self):
+        try:
+            done = self._baCopy.spikeDetect(
+                self._detectionDict, progressCallback=self._progress
+            )
+        except Exception as e:
+            logger.exception(e)
+            done = False
+        if not done or self._cancel:
+            self.signalDetectDone.emit(self.ba, None)
+        else:
+            self.signalDetectDone.emit(self.ba, self._baCopy)
+
+
 class bDetectionWidget(QtWidgets.QWidget):
     signalSelectSpike = QtCore.pyqtSignal(object)  # spike number, doZoom
     signalSelectSpikeList = QtCore.pyqtSignal(object)  # spike number, doZoom
@@ -50,6 +97,9 @@ class bDetectionWidget(QtWidgets.QWidget):
 
         self._selectedSpikeList: List[int] = None
 
+        # {bAnalysis: detectionWorker} of detection running in the background
+        self._detectionWorkers: Dict["sanpy.bAnalysis", detectionWorker] = {}
+
         self.dvdtLines = None
         self.dvdtLinesFiltered = None
         self.dacLines = None
@@ -57,6 +107,13 @@ class bDetectionWidget(QtWidgets.QWidget):
         # self.vmLinesFiltered = None
         # self.vmLinesFiltered2 = None
         self.linearRegionItem2 = None  # rectangle over global Vm
+
+        # level of detail for main traces, see _setLodData()
+        # {plot name: (sweepX, y)} of the current traces
+        self._lodTraces = {}
+        # minMaxPyramid per trace, least recently used first
+        self._lodPyramids = {}
+        self._maxLodPyramids = 8
         # self.clipLines = None
         # self.meanClipLine = None
 
@@ -370,8 +427,6 @@ class bDetectionWidget(QtWidgets.QWidget):
             detectionType (sanpy.bDetection.detectionTypes): The type of detection (dvdt, vm)
         """
 
-        _startSec = time.time()
-
         if self.ba is None:
             str = "Please select a file to analyze."
             self.updateStatusBar(str)
@@ -421,8 +476,70 @@ class bDetectionWidget(QtWidgets.QWidget):
             # detectionDict['condition'] = myDetectionDict['Condition']
 
         #
-        # detect
-        self.ba.spikeDetect(detectionDict)
+        # detect in a background thread, see slot_detectDone()
+        # a new detection replaces one that is still running for this file
+        self.cancelDetection(self.ba)
+
+        worker = detectionWorker(self.ba, detectionDict, parent=self)
+        worker.signalDetectProgress.connect(self.slot_detectProgress)
+        worker.signalDetectDone.connect(self.slot_detectDone)
+        worker.finished.connect(worker.deleteLater)
+        self._detectionWorkers[self.ba] = worker
+        worker.start()
+
+    def cancelDetection(self, ba: "sanpy.bAnalysis" = None):
+        """Cancel detection running in the background.
+
+        Parameters
+        ----------
+        ba : sanpy.bAnalysis
+            Cancel detection of this file, if None then cancel detection of all files.
+        """
+        if ba is None:
+            baList = list(self._detectionWorkers.keys())
+        else:
+            baList = [ba] if ba in self._detectionWorkers else []
+        for oneBa in baList:
+            worker = self._detectionWorkers.pop(oneBa)
+            worker.cancel()
+            self.updateStatusBar(f"Cancelled detection of {oneBa.fileLoader.filename}")
+
+    def stopDetection(self):
+        """Cancel all detection and wait for the background threads to finish.
+
+        Call before this widget is closed or destroyed, a running QThread can not be destroyed.
+        """
+        self.cancelDetection()
+        # includes cancelled workers that are still finishing
+        for worker in self.findChildren(detectionWorker):
+            worker.cancel()
+            worker.wait()
+
+    def closeEvent(self, event):
+        self.stopDetection()
+        super().closeEvent(event)
+
+    def slot_detectProgress(
+        self, ba: "sanpy.bAnalysis", sweepNumber: int, numSweeps: int, sweepFraction: float
+    ):
+        """Report progress of detection running in the background."""
+        if self._detectionWorkers.get(ba) is None:
+            # cancelled
+            return
+        self.updateStatusBar(
+            f"Detecting {ba.fileLoader.filename} sweep {sweepNumber+1} of {numSweeps} ({round(sweepFraction*100)}%)"
+        )
+
+    def slot_detectDone(self, ba: "sanpy.bAnalysis", baCopy: "sanpy.bAnalysis"):
+        """Apply detection that finished in the background."""
+        worker = self._detectionWorkers.get(ba)
+        if baCopy is None or worker is None or not worker.isDetectionCopy(baCopy):
+            # cancelled or replaced by a new detection
+            return
+        self._detectionWorkers.pop(ba)
+
+        # one step, this ba is never partially analyzed
+        ba.applyDetection(baCopy)
 
         # show dialog when num spikes is 0
         """
@@ -436,22 +553,23 @@ class bDetectionWidget(QtWidgets.QWidget):
         # this is done in analysisDir.xxx()
         # setCellValue(self, rowIdx, colStr, value)
 
-        self.replotOverlays()  # replot statistics over traces
+        if ba is self.ba:
+            self.replotOverlays()  # replot statistics over traces
 
         # 20210821
         # refresh spike clips
         # self.refreshClips(None, None)
 
-        self.signalDetect.emit(self.ba)
+        self.signalDetect.emit(ba)
         # if self.myMainWindow is not None:
         #    # signal to main window so it can update (file list, scatter plot)
         #    self.myMainWindow.mySignal('detect') #, data=(dfReportForScatter, dfError))
 
         # report the number of spikes and the time it took
         _stopSec = time.time()
-        numSpikes = self.ba.numSpikes
-        _elapsedSec = round(_stopSec - _startSec, 2)
-        updateStr = f"Detected {numSpikes} in {_elapsedSec} seconds"
+        numSpikes = ba.numSpikes
+        _elapsedSec = round(_stopSec - worker.startTime, 2)
+        updateStr = f"Detected {numSpikes} in {ba.fileLoader.filename} in {_elapsedSec} seconds"
         self.updateStatusBar(updateStr)
 
     def mySetTheme(self, doReplot=True):
@@ -648,6 +766,8 @@ class bDetectionWidget(QtWidgets.QWidget):
         # self.vmPlot.enableAutoRange()
         
         logger.info('!!!!! setting vmPlot_ auto range !!!!!')
+        # auto range on the decimated full recording
+        self._setLodData("vm", 0, self.ba.fileLoader.recordingDur)
         self.vmPlot.autoRange(items=[self.vmPlot_])  # 20221003
     
         # these are linked to vmPlot
@@ -1589,6 +1709,10 @@ class bDetectionWidget(QtWidgets.QWidget):
         # link x-axis
         self.derivPlot.setXLink(self.vmPlot)
         self.dacPlot.setXLink(self.vmPlot)
+        # x-axis follows vmPlot, do not auto range x to the (decimated) data
+        self.derivPlot.disableAutoRange(axis=pg.ViewBox.XAxis)
+        self.dacPlot.disableAutoRange(axis=pg.ViewBox.XAxis)
+        self.vmPlot.sigXRangeChanged.connect(self._slot_x_range_changed)
         # self.myKymWidget.kymographPlot.setXLink(self.vmPlot)  # row major is different
 
         # July 15, 2023
@@ -2193,10 +2317,7 @@ class bDetectionWidget(QtWidgets.QWidget):
             The current x-axis range
         Notes
         -----
-        Trying to connect but not working yet
-
-        self.vmPlot.sigXRangeChanged.connect(self._slot_x_range_changed)
-
+        derivPlot and dacPlot x-axis are linked to vmPlot.
         """
         # logger.info(event)
         # logger.info(f'v:{v}')
@@ -2206,7 +2327,59 @@ class bDetectionWidget(QtWidgets.QWidget):
         # update rectangle in vmPlotGlobal
         start = range_[0]
         stop = range_[1]
-        self.linearRegionItem2.setRegion([start, stop])
+        if self.linearRegionItem2 is not None:
+            self.linearRegionItem2.setRegion([start, stop])
+
+        # only send about 2 points per pixel for the visible range
+        for name in ["vm", "dvdt", "dac"]:
+            self._setLodData(name, start, stop)
+
+    def _getLodPyramid(self, x : np.ndarray, y : np.ndarray) -> "sanpy.interface.util.minMaxPyramid":
+        """Get the min/max pyramid of one trace, building it once.
+
+        Pyramids are keyed by the memory of (x, y), the cache holds (x, y)
+        so the memory is not reused while their pyramid is cached.
+        """
+        key = tuple(
+            (a.__array_interface__["data"][0], a.shape, a.strides) for a in (x, y)
+        )
+        if key in self._lodPyramids:
+            # move to most recently used
+            entry = self._lodPyramids.pop(key)
+        else:
+            entry = (x, y, sanpy.interface.util.minMaxPyramid(x, y))
+            if len(self._lodPyramids) >= self._maxLodPyramids:
+                # remove least recently used
+                self._lodPyramids.pop(next(iter(self._lodPyramids)))
+        self._lodPyramids[key] = entry
+        return entry[2]
+
+    def _setLodData(self, name : str, start : float, stop : float):
+        """Set one main trace plot to its min/max decimation of [start, stop].
+
+        Parameters
+        ----------
+        name : str
+            One of ('vm', 'vmGlobal', 'dvdt', 'dac')
+        """
+        plotDict = {
+            "vm": (self.vmPlot, self.vmPlot_),
+            "vmGlobal": (self.vmPlotGlobal, self.vmPlotGlobal_),
+            "dvdt": (self.derivPlot, self.derivPlot_),
+            "dac": (self.dacPlot, self.dacPlot_),
+        }
+        plotWidget, plotDataItem = plotDict[name]
+
+        if name not in self._lodTraces:
+            plotDataItem.setData([], [], connect="finite")
+            return
+        x, y = self._lodTraces[name]
+
+        numPixels = plotWidget.getViewBox().width()
+        if numPixels <= 0:
+            numPixels = 1000
+        xPlot, yPlot = self._getLodPyramid(x, y).getData(start, stop, numPixels)
+        plotDataItem.setData(xPlot, yPlot, connect="finite")
 
     def _replot(self, startSec : Optional[float] = None,
                 stopSec : Optional[float] = None,
@@ -2260,7 +2433,20 @@ class bDetectionWidget(QtWidgets.QWidget):
         if sweepX.shape != filteredDeriv.shape:
             logger.error(f"filteredDeriv shapes do not match")
 
-        self.derivPlot_.setData(sweepX, filteredDeriv, connect="finite")
+        # main traces are decimated with a min/max pyramid, see _setLodData()
+        self._lodTraces = {}
+        if sweepX is not None and sweepY is not None:
+            self._lodTraces["vm"] = (sweepX, sweepY)
+            self._lodTraces["vmGlobal"] = (sweepX, sweepY)
+            if filteredDeriv is not None and filteredDeriv.shape == sweepX.shape:
+                self._lodTraces["dvdt"] = (sweepX, filteredDeriv)
+            if sweepC is not None and sweepC.shape == sweepX.shape:
+                self._lodTraces["dac"] = (sweepX, sweepC)
+
+        # full range, setAxisFull() auto ranges on this
+        fullStart = 0
+        fullStop = self.ba.fileLoader.recordingDur
+        self._setLodData("dvdt", fullStart, fullStop)
         # self.dvdtLinesFiltered = MultiLine(
         #     sweepX,
         #     filteredDeriv,
@@ -2272,7 +2458,7 @@ class bDetectionWidget(QtWidgets.QWidget):
         # # self.derivPlot.addItem(self.dvdtLines)
         # self.derivPlot.addItem(self.dvdtLinesFiltered)
 
-        self.dacPlot_.setData(sweepX, sweepC, connect="finite")
+        self._setLodData("dac", fullStart, fullStop)
         # self.dacLines = MultiLine(
         #     sweepX, sweepC, self, forcePenColor=None, type="dac", columnOrder=True
         # )
@@ -2288,7 +2474,7 @@ class bDetectionWidget(QtWidgets.QWidget):
         #     columnOrder=True,
         # )
         # self.vmPlot.addItem(self.vmLinesFiltered)
-        self.vmPlot_.setData(sweepX, sweepY, connect="finite")
+        self._setLodData("vm", fullStart, fullStop)
 
         # vmPlot_ is PlotDataItem
         # logger.info(f'vmPlot.viewRange {self.vmPlot.viewRange()}')
@@ -2302,7 +2488,8 @@ class bDetectionWidget(QtWidgets.QWidget):
         #     sweepX, sweepY, self, forcePenColor="b", type="vmFiltered", columnOrder=True
         # )
         # self.vmPlotGlobal.addItem(self.vmLinesFiltered2)
-        self.vmPlotGlobal_.setData(sweepX, sweepY, connect="finite", pen='b')
+        self.vmPlotGlobal_.setPen('b')
+        self._setLodData("vmGlobal", fullStart, fullStop)
         self.linearRegionItem2 = pg.LinearRegionItem(
             values=(0, self.ba.fileLoader.recordingDur),
             orientation=pg.LinearRegionItem.Vertical,
@@ -2919,6 +3106,9 @@ class myDetectToolbarWidget2(QtWidgets.QWidget):
                 stopSec,
             )
 
+        elif name == "Cancel Detection":
+            self.detectionWidget.cancelDetection()
+
         elif name == "[]":
             # Reset Axes
             self.detectionWidget.setAxisFull()
@@ -3121,6 +3311,13 @@ class myDetectToolbarWidget2(QtWidgets.QWidget):
         self.mvThreshold.setValue(detectMv)
         detectionGridLayout.addWidget(self.mvThreshold, row, 2, rowSpan, columnSpan)
 
+        row += 1
+        buttonName = "Cancel Detection"
+        button = QtWidgets.QPushButton(buttonName)
+        button.setToolTip("Cancel spike detection that is running.")
+        button.clicked.connect(partial(self._on_button_click, buttonName))
+        detectionGridLayout.addWidget(button, row, 0, rowSpan, columnSpan)
+
         # removed 20230419
         # decided to not show start/stop seconds ???
         #
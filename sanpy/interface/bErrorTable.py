@@ -12,7 +12,7 @@ class errorTableView(QtWidgets.QTableView):
     Display a per spike error table (one row per spike eror)
     """
 
-    signalSelectSpike = QtCore.Signal(object)  # spike number, doZoom
+    signalSelectSpike = QtCore.pyqtSignal(object)  # spike number, doZoom
 
     def __init__(self, parent=None):
         super(errorTableView, self).__init__(parent)
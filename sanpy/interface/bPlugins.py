@@ -10,6 +10,8 @@ import inspect
 
 from typing import Union, Dict, List, Tuple, Optional
 
+from PyQt5 import QtCore
+
 import sanpy
 
 # import sanpy.interface
@@ -20,6 +22,128 @@ from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
 
+class pluginRefreshBus(QtCore.QObject):
+    """Coalesce bursts of interface changes into one refresh per plugin per frame.
+
+    Plugins post the refresh they need (see `refreshOrder`) rather than
+    calling replot() from inside a slot. Posts are collected until the next
+    timer tick and each plugin then runs each of its pending refreshes once.
+
+    Plugins that are hidden or minimized are skipped. Their refreshes are
+    held until `slot_pluginShown()` and run then.
+
+    While flushing, `getStat()` serves a shared snapshot. Plugins showing the
+    same (ba, sweep, epoch) query sanpy.bAnalysis once per frame instead of
+    once each.
+    """
+
+    refreshOrder = ("setAxis", "replot", "selectSpikeList")
+    """Refreshes a plugin can post, run in this order."""
+
+    def __init__(self, intervalMs: int = 16, parent=None):
+        """
+        Args:
+            intervalMs: Coalesce window in ms, ~16 ms is one frame at 60 Hz.
+        """
+        super().__init__(parent)
+
+        self._pending: Dict["sanpy.interface.plugins.sanpyPlugin", set] = {}
+        """Refreshes waiting for the next flush, keyed by plugin"""
+
+        self._stale: Dict["sanpy.interface.plugins.sanpyPlugin", set] = {}
+        """Refreshes held back while a plugin is hidden or minimized"""
+
+        self._statSnapshot: Optional[dict] = None
+        """Shared getStat() results, only valid during a flush"""
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(intervalMs)
+        self._timer.timeout.connect(self.flush)
+
+    def post(self, plugin: "sanpy.interface.plugins.sanpyPlugin", *refreshes: str):
+        """Request one or more refreshes of a plugin on the next flush.
+
+        Args:
+            plugin: The plugin to refresh.
+            refreshes: Items in `refreshOrder`.
+        """
+        for refresh in refreshes:
+            if refresh not in self.refreshOrder:
+                logger.error(f'Did not understand refresh "{refresh}"')
+                return
+        self._pending.setdefault(plugin, set()).update(refreshes)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def removePlugin(self, plugin: "sanpy.interface.plugins.sanpyPlugin"):
+        """Forget a plugin, called when it closes."""
+        self._pending.pop(plugin, None)
+        self._stale.pop(plugin, None)
+
+    @staticmethod
+    def isHidden(plugin: "sanpy.interface.plugins.sanpyPlugin") -> bool:
+        """True if refreshing a plugin would not be seen."""
+        widget = plugin.getWidget()
+        return not widget.isVisible() or widget.isMinimized()
+
+    def slot_pluginShown(self, plugin: "sanpy.interface.plugins.sanpyPlugin"):
+        """Run the refreshes a plugin missed while it was hidden."""
+        refreshes = self._stale.pop(plugin, None)
+        if refreshes:
+            self.post(plugin, *refreshes)
+
+    def flush(self):
+        """Run all pending refreshes, skipping hidden plugins."""
+        self._timer.stop()
+        pending = self._pending
+        self._pending = {}
+
+        self._statSnapshot = {}
+        try:
+            for plugin, refreshes in pending.items():
+                if self.isHidden(plugin):
+                    self._stale.setdefault(plugin, set()).update(refreshes)
+                    continue
+                for refresh in self.refreshOrder:
+                    if refresh in refreshes:
+                        getattr(plugin, refresh)()
+        finally:
+            self._statSnapshot = None
+
+    def getStat(
+        self,
+        ba: "sanpy.bAnalysis",
+        stat: str,
+        sweepNumber,
+        epochNumber,
+        getFullList: bool = False,
+    ) -> list:
+        """Get a stat from ba, shared across plugins during a flush.
+
+        Outside of a flush this is just ba.getStat(). Each caller gets its
+        own copy so a plugin can not modify the snapshot of another.
+        """
+        if self._statSnapshot is None:
+            return ba.getStat(
+                stat,
+                sweepNumber=sweepNumber,
+                epochNumber=epochNumber,
+                getFullList=getFullList,
+            )
+
+        key = (id(ba), stat, sweepNumber, epochNumber, getFullList)
+        if key not in self._statSnapshot:
+            self._statSnapshot[key] = ba.getStat(
+                stat,
+                sweepNumber=sweepNumber,
+                epochNumber=epochNumber,
+                getFullList=getFullList,
+            )
+        theRet = self._statSnapshot[key]
+        return theRet.copy() if theRet is not None else None
+
+
 class bPlugins:
     """Generate a dict of plugins.
 
@@ -42,12 +166,19 @@ class bPlugins:
         self._openSet = set()
         """set of open plugins"""
 
+        self._refreshBus = pluginRefreshBus()
+        """coalesce interface changes into one refresh per plugin per frame"""
+
         self.loadPlugins()
 
     def getSanPyApp(self) -> Optional["sanpy.interface.SanPyWindow"]:
         """Get the underlying SanPy app."""
         return self._sanpyApp
 
+    def getRefreshBus(self) -> pluginRefreshBus:
+        """Get the bus open plugins post their refreshes to."""
+        return self._refreshBus
+
     def getStatList(self):
         if self._sanpyApp is None:
             return
@@ -62,50 +193,37 @@ class bPlugins:
         """
         self.pluginDict = {}
 
-        # Enum is to ignore bPlugins.py class ResponseType(Enum)
-        ignoreModuleList = [
-            "sanpyPlugin",
-            "myWidget",
-            "ResponseType",
-            "SpikeSelectEvent",
-            "basePlotTool",
-            "NavigationToolbar2QT",
-            "myStatListWidget",
-        ]
+        ignoreModuleList = []
 
         if not sanpy.DO_KYMOGRAPH_ANALYSIS:
             ignoreModuleList.append('kymographPlugin')
 
         #
         # system plugins from sanpy.interface.plugins
-        # print('loadPlugins sanpy.interface.plugins:', sanpy.interface.plugins)
+        # read from the manifest, each plugin module is imported when it is first run
         loadedList = []
-        for moduleName, obj in inspect.getmembers(sanpy.interface.plugins):
-            # print('moduleName:', moduleName, 'obj:', obj)
-            if inspect.isclass(obj):
-                # logger.info(f'moduleName: {moduleName}')
-                if moduleName in ignoreModuleList:
-                    # our base plugin class
-                    continue
-                loadedList.append(moduleName)
-                fullModuleName = "sanpy.interface.plugins." + moduleName
-                humanName = obj.myHumanName  # myHumanName is a static str
-                showInMenu = obj.showInMenu  # showInMenu is a static bool
-                pluginDict = {
-                    "pluginClass": moduleName,
-                    "type": "system",
-                    "module": fullModuleName,
-                    "path": "",
-                    "constructor": obj,
-                    "humanName": humanName,
-                    "showInMenu": showInMenu,
-                }
-                if humanName in self.pluginDict.keys():
-                    logger.warning(
-                        f'Plugin already added "{moduleName}" humanName:"{humanName}"'
-                    )
-                else:
-                    self.pluginDict[humanName] = pluginDict
+        for moduleName, oneManifest in sanpy.interface.plugins.pluginManifest.items():
+            if moduleName in ignoreModuleList:
+                continue
+            loadedList.append(moduleName)
+            fullModuleName = "sanpy.interface.plugins." + oneManifest["module"]
+            humanName = oneManifest["humanName"]
+            showInMenu = oneManifest["showInMenu"]
+            pluginDict = {
+                "pluginClass": moduleName,
+                "type": "system",
+                "module": fullModuleName,
+                "path": "",
+                "constructor": None,  # see getConstructor()
+                "humanName": humanName,
+                "showInMenu": showInMenu,
+            }
+            if humanName in self.pluginDict.keys():
+                logger.warning(
+                    f'Plugin already added "{moduleName}" humanName:"{humanName}"'
+                )
+            else:
+                self.pluginDict[humanName] = pluginDict
 
         # print the loaded plugins
         logger.info('Loaded plugins:')
@@ -163,6 +281,23 @@ class bPlugins:
         for loaded in loadedModuleList:
             logger.info(f"    {loaded}")
 
+    def getConstructor(self, pluginName: str):
+        """Get the class of a plugin, importing its module on first use.
+
+        Args:
+            pluginName (str): Human name of the plugin
+        """
+        pluginDict = self.pluginDict[pluginName]
+        if pluginDict["constructor"] is None:
+            # system plugins are imported from their module on first use
+            # not from the sanpy.interface.plugins namespace, where an imported
+            # submodule can have the same name as its plugin class
+            pluginModule = importlib.import_module(pluginDict["module"])
+            pluginDict["constructor"] = getattr(
+                pluginModule, pluginDict["pluginClass"]
+            )
+        return pluginDict["constructor"]
+
     def runPlugin(self, pluginName: str, ba: sanpy.bAnalysis, show: bool = True):
         """Run one plugin with given a bAnalysis.
 
@@ -175,7 +310,7 @@ class bPlugins:
             logger.error(f'Did not find plugin: "{pluginName}"')
             return
         else:
-            humanName = self.pluginDict[pluginName]["constructor"].myHumanName
+            humanName = self.pluginDict[pluginName]["humanName"]
 
             ltwhTuple = None
 
@@ -212,7 +347,7 @@ class bPlugins:
             # try:
             if 1:
                 # print(1)
-                newPlugin = self.pluginDict[pluginName]["constructor"](
+                newPlugin = self.getConstructor(pluginName)(
                     ba=ba, bPlugin=self, startStop=startStop
                 )
                 # print(2)
@@ -304,6 +439,7 @@ class bPlugins:
             logger.info(f'Removing plugin from _openSet: "{pluginObj.getHumanName()}"')
             # Critical to detatch signal/slot, removing from set does not seem to do this?
             pluginObj._disconnectSignalSlot()
+            self._refreshBus.removePlugin(pluginObj)
             self._openSet.remove(pluginObj)
 
             # remove from preferences
@@ -1070,7 +1070,7 @@ class kymographPlugin2(QtWidgets.QMainWindow):
             self.diameterPlotItem.autoRange()
 
 def exportDiameter():
-    import sanpy.interface.bExportWidget
+    import sanpy.interface
     
     logger.info('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
 
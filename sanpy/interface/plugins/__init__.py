@@ -1,46 +1,41 @@
-# from . import *
-
-from .sanpyPlugin import *
-
-# TODO: Fix this so I do not need to add each
-from .plotRecording import plotRecording
-from .sanpyLog import sanpyLog
-
-from .basePlotTool import basePlotTool
-from .plotTool import plotTool
-from .plotToolPool import plotToolPool
-
-from .plotScatter import plotScatter
-# from .detectionErrors import detectionErrors
-from .spikeClips import spikeClips
-
-#from .sanpyPlugin import sanpyPlugin
-
-# from .resultsTable import resultsTable
-# from .resultsTable2 import resultsTable2
-# from .analysisSummary import analysisSummary
-from .summarizeResults import SummarizeResults
-
-from .exportTrace import exportTrace
-
-from .fftPlugin import fftPlugin
-
-from .stimGen import stimGen
-
-from .detectionParams import detectionParams
-
-# remove for publication
-from .kymographPlugin import kymographPlugin
-
-from .setSpikeStat import SetSpikeStat
-from .setMetaData import SetMetaData
-
-
-# eventually move this out of plotScatter
-from .plotScatter import myStatListWidget
-from .plotScatter import getPlotMarkersAndColors
-
-from .plotFi import plotFi
-
-# TODO: make this just one line, so user can drop a bplugin in and restart
-from . import *
+# Plugins are imported when they are first used, see pluginManifest.
+# This keeps their dependencies (matplotlib, seaborn, scipy) out of SanPy startup.
+
+from sanpy._util import _lazyAttributes
+
+pluginManifest = {
+    # class name: module, human name and show in menu
+    # humanName and showInMenu need to match the plugin class (see tests/interface/test_plugins.py)
+    "plotRecording": {"module": "plotRecording", "humanName": "Plot Recording", "showInMenu": True},
+    "sanpyLog": {"module": "sanpyLog", "humanName": "SanPy Log", "showInMenu": True},
+    "plotTool": {"module": "plotTool", "humanName": "Plot Tool", "showInMenu": True},
+    "plotToolPool": {"module": "plotToolPool", "humanName": "Plot Tool (pool)", "showInMenu": True},
+    "plotScatter": {"module": "plotScatter", "humanName": "Plot Scatter", "showInMenu": True},
+    "spikeClips": {"module": "spikeClips", "humanName": "Plot Spike Clips", "showInMenu": True},
+    "SummarizeResults": {"module": "summarizeResults", "humanName": "Summarize Results", "showInMenu": True},
+    "exportTrace": {"module": "exportTrace", "humanName": "Export Trace", "showInMenu": True},
+    "fftPlugin": {"module": "fftPlugin", "humanName": "FFT", "showInMenu": True},
+    "stimGen": {"module": "stimGen", "humanName": "Stim Gen", "showInMenu": True},
+    "detectionParams": {"module": "detectionParams", "humanName": "Detection Parameters", "showInMenu": True},
+    # remove for publication
+    "kymographPlugin": {"module": "kymographPlugin", "humanName": "Kymograph Length", "showInMenu": True},
+    "SetSpikeStat": {"module": "setSpikeStat", "humanName": "Set Spike Stats", "showInMenu": False},
+    "SetMetaData": {"module": "setMetaData", "humanName": "Set Meta Data", "showInMenu": True},
+    "plotFi": {"module": "plotFi", "humanName": "Plot FI", "showInMenu": True},
+}
+"""Plugins in sanpy.interface.plugins, read by bPlugins without importing them."""
+
+# name: (module, attribute)
+_lazyNames = {
+    "sanpyPlugin": (".sanpyPlugin", "sanpyPlugin"),
+    "ResponseType": (".sanpyPlugin", "ResponseType"),
+    "SpikeSelectEvent": (".sanpyPlugin", "SpikeSelectEvent"),
+    "basePlotTool": (".basePlotTool", "basePlotTool"),
+    # eventually move this out of plotScatter
+    "myStatListWidget": (".plotScatter", "myStatListWidget"),
+    "getPlotMarkersAndColors": (".plotScatter", "getPlotMarkersAndColors"),
+}
+for _className, _oneManifest in pluginManifest.items():
+    _lazyNames[_className] = ("." + _oneManifest["module"], _className)
+
+__getattr__ = _lazyAttributes(globals(), _lazyNames)
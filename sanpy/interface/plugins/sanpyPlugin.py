@@ -6,10 +6,6 @@ import functools
 
 from typing import Union, Dict, List, Tuple, Optional, Optional
 
-from matplotlib.backends import backend_qt5agg
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-
 # Allow this code to run with just backend
 from PyQt5 import QtCore, QtWidgets, QtGui
 import pyqtgraph as pg
@@ -18,11 +14,18 @@ import pyqtgraph as pg
 
 import sanpy
 import sanpy.interface
+from sanpy._util import _lazyImport
 
 from sanpy.sanpyLogger import get_logger
 
 logger = get_logger(__name__)
 
+# matplotlib is loaded when a plugin first makes a figure, see mplWindow2()
+backend_qt5agg = _lazyImport("matplotlib.backends.backend_qt5agg")
+backend_bases = _lazyImport("matplotlib.backend_bases")
+mplFigure = _lazyImport("matplotlib.figure")
+plt = _lazyImport("matplotlib.pyplot")
+
 
 class ResponseType(enum.Enum):
     """Enum representing the types of events a Plugin will respond to."""
@@ -123,7 +126,7 @@ class sanpyPlugin(QtWidgets.QWidget):
     """Each derived class needs to define this."""
 
     #signalSetSpikeStat = QtCore.Signal(dict)
-    signalUpdateAnalysis = QtCore.Signal(dict)
+    signalUpdateAnalysis = QtCore.pyqtSignal(dict)
     """Set stats (columns) for a list of spikes."""
 
     # mar 11, if True then show in menus
@@ -267,11 +270,19 @@ class sanpyPlugin(QtWidgets.QWidget):
     def getStat(self, stat: str, getFullList : bool = False) -> list:
         """Convenianece function to get a stat from underling sanpy.bAnalysis.
 
+        During a refresh from the bPlugins refresh bus this is served from a
+        snapshot shared by all open plugins.
+
         Parameters
         ----------
         stat : str
             Stat to get, corresponds to a column in sanpy.bAnalysis
         """
+        refreshBus = self._getRefreshBus()
+        if refreshBus is not None:
+            return refreshBus.getStat(
+                self.ba, stat, self.sweepNumber, self.epochNumber, getFullList
+            )
         return self.ba.getStat(
             stat, sweepNumber=self.sweepNumber,
             epochNumber=self.epochNumber,
@@ -464,6 +475,44 @@ class sanpyPlugin(QtWidgets.QWidget):
             # recieve set x axis
             app.signalSetXAxis.disconnect(self.slot_set_x_axis)
 
+    def _getRefreshBus(self) -> Optional["sanpy.interface.pluginRefreshBus"]:
+        """Get the refresh bus from bPlugins, None when running without one."""
+        bPlugins = self.get_bPlugins()
+        if bPlugins is not None:
+            return bPlugins.getRefreshBus()
+
+    def _requestRefresh(self, *refreshes: str):
+        """Refresh the plugin, coalesced with other changes in the same frame.
+
+        Parameters
+        ----------
+        refreshes : str
+            Names of methods to call, in pluginRefreshBus.refreshOrder
+            (setAxis, replot, selectSpikeList).
+        """
+        refreshBus = self._getRefreshBus()
+        if refreshBus is None:
+            # no bus, refresh now
+            for refresh in refreshes:
+                getattr(self, refresh)()
+        else:
+            refreshBus.post(self, *refreshes)
+
+    def showEvent(self, event):
+        """Catch up on refreshes skipped while hidden."""
+        super().showEvent(event)
+        refreshBus = self._getRefreshBus()
+        if refreshBus is not None:
+            refreshBus.slot_pluginShown(self)
+
+    def changeEvent(self, event):
+        """Catch up on refreshes skipped while minimized."""
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange and not self.isMinimized():
+            refreshBus = self._getRefreshBus()
+            if refreshBus is not None:
+                refreshBus.slot_pluginShown(self)
+
     def toggleResponseOptions(self, thisOption: ResponseType, newValue: bool = None):
         """Set underlying responseOptions based on name of thisOption.
 
@@ -530,7 +579,7 @@ class sanpyPlugin(QtWidgets.QWidget):
             Either a PyQt or matplotlib key press event.
         """
         isQt = isinstance(event, QtGui.QKeyEvent)
-        isMpl = isinstance(event, mpl.backend_bases.KeyEvent)
+        isMpl = not isQt and isinstance(event, backend_bases.KeyEvent)
 
         key = None
         text = None
@@ -685,7 +734,7 @@ class sanpyPlugin(QtWidgets.QWidget):
         # this is dangerous, collides with self.mplWindow()
         # these are causing really freaking annoying failures on GitHub !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
         # self.fig : "matplotlib.figure.Figure" = mpl.figure.Figure()
-        self.fig = mpl.figure.Figure()
+        self.fig = mplFigure.Figure()
 
         # not working
         # self.fig.canvas.mpl_connect('key_press_event', self.keyPressEvent)
@@ -719,7 +768,7 @@ class sanpyPlugin(QtWidgets.QWidget):
 
         # matplotlib plot tools toolbar (zoom, pan, save, etc)
         # from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-        self.mplToolbar = mpl.backends.backend_qt5agg.NavigationToolbar2QT(
+        self.mplToolbar = backend_qt5agg.NavigationToolbar2QT(
             self.static_canvas, self.static_canvas
         )
 
@@ -876,7 +925,7 @@ class sanpyPlugin(QtWidgets.QWidget):
         if self._ba != ba:
             return
 
-        self.replot()
+        self._requestRefresh("replot")
 
     def slot_setSweep(self, ba: sanpy.bAnalysis, sweepNumber: int):
         """Respond to user selecting a sweep."""
@@ -902,7 +951,7 @@ class sanpyPlugin(QtWidgets.QWidget):
         # update toolbar
         self._updateTopToolbar()
 
-        self.replot()
+        self._requestRefresh("replot")
 
     def slot_selectSpikeList(self, eDict: dict):
         """Respond to spike selection.
@@ -923,7 +972,7 @@ class sanpyPlugin(QtWidgets.QWidget):
         spikeList = eDict["spikeList"]
         self._selectedSpikeList = spikeList  # [] on no selection
 
-        self.selectSpikeList()
+        self._requestRefresh("selectSpikeList")
 
     def old_slot_selectSpike(self, eDict):
         """Respond to spike selection."""
@@ -967,8 +1016,7 @@ class sanpyPlugin(QtWidgets.QWidget):
             self._stopSec = startStopList[1]
         #
         # we do not always want to replot on set axis
-        self.setAxis()
-        self.replot()
+        self._requestRefresh("setAxis", "replot")
 
     def setAxis(self):
         """Respond to set axis.
@@ -5,7 +5,7 @@ from typing import Union, Dict, List, Tuple, Optional, Optional
 import numpy as np
 import pandas as pd
 
-from PyQt5 import QtCore, QtWidgets
+from PyQt5 import QtCore, QtGui, QtWidgets
 import pyqtgraph as pg
 
 # from matplotlib.backends import backend_qt5agg
@@ -45,6 +45,14 @@ class spikeClips(sanpyPlugin):
         self.x = None
         self.y = None
         self.yMean = None
+        self.yVar = None
+        self._clipSpikeNumbers = None  # spike number of each plotted clip
+
+        # all clips, made once, see _getAllClips()
+        self._allClips = None
+
+        # with color, max number of colors (one path each)
+        self.maxColorBlocks = 64
 
         # for waterfall
         self.xMult = 0.1
@@ -201,8 +209,15 @@ class spikeClips(sanpyPlugin):
             self.preClipWidth_ms = self.ba.getDetectionDict()["preSpikeClipWidth_ms"]
             self.postClipWidth_ms = self.ba.getDetectionDict()["postSpikeClipWidth_ms"]
 
+        self._allClips = None
         self.replot()
 
+    def slot_updateAnalysis(self, sDict: dict):
+        """Respond to new spike detection, clips are remade on replot."""
+        if sDict["ba"] is not None and sDict["ba"] == self.ba:
+            self._allClips = None
+        super().slot_updateAnalysis(sDict)
+
     def on_radio(self):
         """
         Will receive this callback n times where n is # buttons/checkboxes in group
@@ -253,6 +268,78 @@ class spikeClips(sanpyPlugin):
         self.replot()
     '''
 
+    def _getAllClips(self) -> Optional[dict]:
+        """Get all clips for the current file, sweep, epoch and clip width.
+
+        All clips are made once as one contiguous 2D array (clips x samples).
+        Changes to the x-axis, spike selection or display only select rows.
+
+        Returns:
+            (dict): None if no spikes. Keys are
+                clips: 2D clips (mV)
+                x: 1D clip x-axis (ms)
+                spikeNumbers: spike number of each row
+                spikeSec: spike time (s) of each row
+                phase: 2D dV/dt of each row, made on first use
+                stats: _runningClipStats of mV and phase
+        """
+        if self.ba is None or self.ba.numSpikes == 0:
+            return
+
+        # new spike detection makes a new spikeDict
+        clipKey = (
+            self.ba,
+            self.ba.spikeDict,
+            self.preClipWidth_ms,
+            self.postClipWidth_ms,
+            self.sweepNumber,
+            self.epochNumber,
+        )
+        if self._allClips is not None and self._allClips["key"] == clipKey:
+            return self._allClips
+
+        theseClips, theseClips_x, _meanClip = self.ba.getSpikeClips(
+            None,
+            None,
+            preSpikeClipWidth_ms=self.preClipWidth_ms,
+            postSpikeClipWidth_ms=self.postClipWidth_ms,
+            sweepNumber=self.sweepNumber,
+            epochNumber=self.epochNumber,
+            ignoreMinMax=True,
+        )
+        spikeNumbers = self.ba.getSpikeClipSpikeNumbers()
+        thresholdPnt = self.ba.getStat("thresholdPnt", asArray=True)
+        spikeSec = self.ba.fileLoader.pnt2Sec_(thresholdPnt[spikeNumbers])
+
+        theseClips = np.ascontiguousarray(theseClips, dtype=np.float64)
+        self._allClips = {
+            "key": clipKey,
+            "clips": theseClips,
+            "x": np.asarray(self.ba.spikeClips_x),
+            "spikeNumbers": spikeNumbers,
+            "spikeSec": np.asarray(spikeSec),
+            "phase": None,
+            "stats": {"mV": _runningClipStats(theseClips)},
+        }
+        return self._allClips
+
+    def _getClipRows(self, allClips: dict) -> np.ndarray:
+        """Get a boolean mask of the clips (rows) to plot.
+
+        Respond to ('All', 'X-Axis', 'Spike Selection').
+        """
+        if self.respondTo == "Spike Selection":
+            selectedSpikeList = self.getSelectedSpikes()
+            if len(selectedSpikeList) > 0:
+                return np.isin(allClips["spikeNumbers"], selectedSpikeList)
+            # no selection shows all clips
+        elif self.respondTo == "X-Axis":
+            startSec, stopSec = self.getStartStop()
+            if startSec is not None and stopSec is not None:
+                spikeSec = allClips["spikeSec"]
+                return (spikeSec >= startSec) & (spikeSec <= stopSec)
+        return np.ones(len(allClips["spikeNumbers"]), dtype=bool)
+
     def _myReplotClips(self):
         """
         Note: This is the same code as in bDetectionWidget.refreshClips() MERGE THEM.
@@ -269,136 +356,100 @@ class spikeClips(sanpyPlugin):
 
         self.variancePlot.clear()
 
-        if self.ba is None or self.ba.numSpikes == 0:
-            return
-
-        # TODO: Add option to select by selectSpikeList
-
-        #
-        # respond to x-axis selection
-        startSec = None
-        stopSec = None
-        selectedSpikeList = []
-        logger.info(f'self.respondTo: {self.respondTo}')
-        if self.respondTo == "All":
-            startSec = 0
-            stopSec = self.ba.fileLoader.recordingDur
-        elif self.respondTo == "X-Axis":
-            startSec, stopSec = self.getStartStop()
-            if startSec is None or stopSec is None:
-                startSec = 0
-                stopSec = self.ba.fileLoader.recordingDur
-        elif self.respondTo == "Spike Selection":
-            selectedSpikeList = self.getSelectedSpikes()
-
-        logger.info(f'  startSec:{startSec} stopSec:{stopSec}')
+        self.x = None
+        self.y = None
+        self.yMean = None
+        self._clipSpikeNumbers = None
+        self.spikeListMultiLine = None
 
-        # print('=== selectedSpikeList:', selectedSpikeList)
+        allClips = self._getAllClips()
+        if allClips is None:
+            return
 
-        # this returns x-axis in ms
-        # theseClips is a [list] of clips
-        # theseClips_x is in ms
-        theseClips, theseClips_x, meanClip = self.ba.getSpikeClips(
-            startSec,
-            stopSec,
-            spikeSelection=selectedSpikeList,
-            preSpikeClipWidth_ms=self.preClipWidth_ms,
-            postSpikeClipWidth_ms=self.postClipWidth_ms,
-            sweepNumber=self.sweepNumber,
-            epochNumber=self.epochNumber,
-            ignoreMinMax=False  # 20230418 trying to get sweeps/epochs working
-        )
-        numClips = len(theseClips)
-        logger.info(f'  got numClips:{numClips}')
+        clipRows = self._getClipRows(allClips)
+        numClips = int(np.count_nonzero(clipRows))
+        logger.info(f'self.respondTo: {self.respondTo} numClips:{numClips}')
         self.numSpikesLabel.setText(f"Num Spikes: {numClips}")
 
         if numClips == 0:
             return
 
-        # convert clips to 2d ndarray ???
-        xTmp = np.array(theseClips_x)
-        xTmp /= 1000  # ms to seconds
-        yTmp = np.array(theseClips)  # mV
+        # theseClips is a 2D (clips x samples) ndarray, all clips share one x-axis
+        mvStats = allClips["stats"]["mV"]
+        mvStats.setRows(clipRows)
+        yTmp = allClips["clips"][clipRows]  # mV
+        # ms to seconds
+        xTmp = np.broadcast_to(allClips["x"] / 1000, yTmp.shape)
+        xMeanClip = allClips["x"] / 1000
+        yStats = mvStats
 
         if isPhasePlot:
             # plot x mV versus y dV/dt
-            dvdt = np.zeros((yTmp.shape[0], yTmp.shape[1] - 1))  #
-            for i in range(dvdt.shape[0]):
-                dvdt[i, :] = np.diff(yTmp[i, :])
-                # drop first pnt in x
-
-            #
-            xTmp = yTmp[:, 1:]  # drop first column of mV and swap to x-axis
-            yTmp = dvdt
-            # print(xTmp.shape, yTmp.shape)
+            # drop first column of mV and swap to x-axis
+            if allClips["phase"] is None:
+                allClips["phase"] = np.diff(allClips["clips"], axis=1)
+                allClips["stats"]["phase"] = _runningClipStats(allClips["phase"])
+            yStats = allClips["stats"]["phase"]
+            yStats.setRows(clipRows)
+            xTmp = yTmp[:, 1:]
+            yTmp = allClips["phase"][clipRows]
+            xMeanClip = mvStats.mean()[1:]
+
+        yMeanClip = yStats.mean()
+        yVarClip = yStats.var()
 
         # for waterfall we need x-axis to have different values for each spike
         if self.waterfallCheckBox.isChecked():
-            # print(xTmp.shape, yTmp.shape)
             # xTmp and yTmp are 2D with rows/clips and cols/data_pnts
-            xMin = np.nanmin(xTmp)
-            xMax = np.nanmax(xTmp)
-            xRange = xMax - xMin
-            yMin = np.nanmin(yTmp)
-            yMax = np.nanmax(yTmp)
-            yRange = yMax - yMin
-            xOffset = 0
-            yOffset = 0
+            xRange = np.nanmax(xTmp) - np.nanmin(xTmp)
+            yRange = np.nanmax(yTmp) - np.nanmin(yTmp)
             xInc = xRange * self.xMult  # ms, xInc is 10% of x-range
             yInc = yRange * self.yMult
-            for i in range(xTmp.shape[0]):
-                xTmp[i, :] += xOffset
-                yTmp[i, :] += yOffset
-                xOffset += xInc  # ms
-                yOffset += yInc  # mV
+            clipSteps = np.arange(xTmp.shape[0])[:, np.newaxis]
+            xTmp = xTmp + clipSteps * xInc
+            yTmp = yTmp + clipSteps * yInc
+
+            # x mean is redundant but works well for waterfall
+            xMeanClip = np.nanmean(xTmp, axis=0)
+            yMeanClip = np.nanmean(yTmp, axis=0)
+            yVarClip = np.nanvar(yTmp, axis=0)
 
         #
-        # original, one multiline for all clips (super fast)
-        # self.clipLines = MultiLine(xTmp, yTmp, self, allowXAxisDrag=False, type='clip')
-        #
-        # each clip so we can set color
-        # cmap = pg.colormap.get('Greens', source='matplotlib') # prepare a linear color map
+        # one multiline (one path) for all clips
+        # with color, one multiline per block of clips that share a color
         numSpikes = xTmp.shape[0]
 
         doColor = self.colorCheckBox.isChecked()
-        if doColor:
-            # cmap = pg.colormap.get('CET-L18') # prepare a linear color map
-            cmap = pg.colormap.get(
-                "gist_rainbow", source="matplotlib"
-            )  # prepare a linear color map
-
-            tmpColors = cmap.getColors()
-            tmpLinSpace = np.linspace(
-                0, len(tmpColors), numSpikes, endpoint=False, dtype=np.uint16
-            )
-        # for tmp in tmps:
-        #    print(tmp)
-        for i in range(numSpikes):
-            # forcePenColor = cmap.getByIndex(i)  # returns PyQt5.QtGui.QColor
-            forcePenColor = None
-            if doColor:
-                currentStep = tmpLinSpace[i]
-                forcePenColor = tmpColors[currentStep]
-            else:
-                forcePenColor = self.getPenColor()
-
-            xPlot = xTmp[i, :]
-            yPlot = yTmp[i, :]
+        if not doColor:
             tmpClipLines = MultiLine(
-                xPlot,
-                yPlot,
+                xTmp,
+                yTmp,
                 self,
                 allowXAxisDrag=False,
-                forcePenColor=forcePenColor,
+                forcePenColor=self.getPenColor(),
                 type="clip",
             )
             self.clipPlot.addItem(tmpClipLines)
+        else:
+            # cmap = pg.colormap.get('CET-L18') # prepare a linear color map
+            cmap = pg.colormap.get(
+                "gist_rainbow", source="matplotlib"
+            )  # prepare a linear color map
 
-        #
-        # always calculate mean clip
-        # x mean is redundant but works well for waterfall
-        xMeanClip = np.nanmean(xTmp, axis=0)  # xTmp is in ms
-        yMeanClip = np.nanmean(yTmp, axis=0)
+            tmpColors = cmap.getColors()
+            numBlocks = min(numSpikes, self.maxColorBlocks)
+            blockStarts = np.linspace(0, numSpikes, numBlocks + 1).astype(int)
+            for blockStart, blockStop in zip(blockStarts[:-1], blockStarts[1:]):
+                currentStep = blockStart * len(tmpColors) // numSpikes
+                tmpClipLines = MultiLine(
+                    xTmp[blockStart:blockStop],
+                    yTmp[blockStart:blockStop],
+                    self,
+                    allowXAxisDrag=False,
+                    forcePenColor=tmpColors[currentStep],
+                    type="clip",
+                )
+                self.clipPlot.addItem(tmpClipLines)
 
         # plot if checkbox is on
         if self.meanCheckBox.isChecked():
@@ -418,10 +469,8 @@ class spikeClips(sanpyPlugin):
         else:
             self.variancePlot.show()
             # self.variancePlot.clear()
-            xVarClip = np.nanmean(xTmp, axis=0)  # xTmp is in ms
-            yVarClip = np.nanvar(yTmp, axis=0)
             tmpVarClipLine = MultiLine(
-                xVarClip, yVarClip, self, width=3, allowXAxisDrag=False, type="meanclip"
+                xMeanClip, yVarClip, self, width=3, allowXAxisDrag=False, type="meanclip"
             )
             self.variancePlot.addItem(tmpVarClipLine)
             self.variancePlot.getAxis("left").setLabel("Variance")
@@ -440,12 +489,11 @@ class spikeClips(sanpyPlugin):
 
         #
         # store so we can export
-        # print('  xTmp:', xTmp.shape)
-        # print('  yTmp:', yTmp.shape)
-        # print('  yMeanClip:', yMeanClip.shape)
-        self.x = xTmp  # 1D
+        self.x = xTmp  # 2D
         self.y = yTmp  # 2D
         self.yMean = yMeanClip
+        self.yVar = yVarClip
+        self._clipSpikeNumbers = allClips["spikeNumbers"][clipRows]
 
         # update pre/post clip (ms)
         self.preClipWidthSpinBox.setValue(self.preClipWidth_ms)
@@ -454,7 +502,7 @@ class spikeClips(sanpyPlugin):
         #
         # replot any selected spikes
         # self.old_selectSpike()
-        self.selectSpikeList()
+        self._plotSelectedClips()
 
     def saveResultsFigure(self):
         super().saveResultsFigure(pgPlot=self.clipPlot)
@@ -523,34 +571,132 @@ class spikeClips(sanpyPlugin):
     def selectSpikeList(self):
         """Select spikes based on self.getSelectedSpikes().
 
-        sDict (dict): NOT USED
+        When responding to 'Spike Selection', only the selected clips are plotted.
+        Clips are cached so this only updates the mean and variance.
         """
-        # logger.info(sDict)
+        if self.respondTo == "Spike Selection":
+            self._myReplotClips()
+        else:
+            self._plotSelectedClips()
 
-        x = np.zeros(1) * np.nan
-        y = np.zeros(1) * np.nan
+    def _plotSelectedClips(self):
+        """Highlight the clips of the selected spikes."""
+        if self.spikeListMultiLine is not None:
+            self.clipPlot.removeItem(self.spikeListMultiLine)
+            self.spikeListMultiLine = None
 
         _selectedSpikes = self.getSelectedSpikes()
+        if len(_selectedSpikes) == 0 or self._clipSpikeNumbers is None:
+            return
 
-        if len(_selectedSpikes) > 0:
-            try:
-                x = self.x[_selectedSpikes]
-                y = self.y[_selectedSpikes]
-            except IndexError as e:
-                pass
-        if self.spikeListMultiLine is not None:
-            self.clipPlot.removeItem(self.spikeListMultiLine)
-        if len(_selectedSpikes) > 0:
-            self.spikeListMultiLine = MultiLine(
-                x,
-                y,
-                self,
-                width=3,
-                allowXAxisDrag=False,
-                forcePenColor="c",
-                type="spike list selection",
-            )
-            self.clipPlot.addItem(self.spikeListMultiLine)
+        # map spike numbers to plotted clips, selected spikes may not be plotted
+        selectedRows = np.isin(self._clipSpikeNumbers, _selectedSpikes)
+        if not np.any(selectedRows):
+            return
+
+        self.spikeListMultiLine = MultiLine(
+            self.x[selectedRows],
+            self.y[selectedRows],
+            self,
+            width=3,
+            allowXAxisDrag=False,
+            forcePenColor="c",
+            type="spike list selection",
+        )
+        self.clipPlot.addItem(self.spikeListMultiLine)
+
+
+class _runningClipStats:
+    """Mean and variance (per column) of selected rows in a 2D array of clips.
+
+    Keeps a running sum and sum of squares so changing the selected rows
+    only adds and removes the rows that changed.
+    NaN are ignored like np.nanmean() and np.nanvar().
+    """
+
+    def __init__(self, clips: np.ndarray):
+        """
+        Args:
+            clips: 2D (clips x samples)
+        """
+        self._clips = clips
+        self._rows = np.zeros(clips.shape[0], dtype=bool)
+
+        # sums are relative to the first clip to keep the variance precise
+        self._offset = np.nan_to_num(clips[0]) if clips.shape[0] else 0
+
+        numSamples = clips.shape[1]
+        self._sum = np.zeros(numSamples)
+        self._sumSquared = np.zeros(numSamples)
+        self._count = np.zeros(numSamples, dtype=np.int64)
+
+    def _addRows(self, rows: np.ndarray, sign: int):
+        if not np.any(rows):
+            return
+        theseClips = self._clips[rows] - self._offset
+        isFinite = np.isfinite(theseClips)
+        theseClips[~isFinite] = 0
+        self._sum += sign * theseClips.sum(axis=0)
+        self._sumSquared += sign * np.square(theseClips).sum(axis=0)
+        self._count += sign * isFinite.sum(axis=0)
+
+    def setRows(self, rows: np.ndarray):
+        """Set the selected rows.
+
+        Args:
+            rows: 1D boolean mask, one per clip
+        """
+        rows = np.asarray(rows, dtype=bool)
+        addRows = rows & ~self._rows
+        removeRows = self._rows & ~rows
+        numChanged = np.count_nonzero(addRows) + np.count_nonzero(removeRows)
+        if numChanged == 0:
+            return
+        if numChanged > np.count_nonzero(rows):
+            # start over, fewer rows than the change
+            self._sum[:] = 0
+            self._sumSquared[:] = 0
+            self._count[:] = 0
+            self._addRows(rows, 1)
+        else:
+            self._addRows(addRows, 1)
+            self._addRows(removeRows, -1)
+        self._rows = rows.copy()
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._sum / self._count + self._offset
+
+    def var(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            theMean = self._sum / self._count
+            theVar = self._sumSquared / self._count - np.square(theMean)
+        return np.maximum(theVar, 0, where=~np.isnan(theVar), out=theVar)
+
+
+def _clipsToQPath(x: np.ndarray, y: np.ndarray) -> QtGui.QPainterPath:
+    """One path for all clips, x and y are 2D (clips x samples).
+
+    Same as pg.arrayToQPath() with a connect array that does not draw the
+    segment between each clip. With no NaN, each clip is added as one
+    QPolygonF (one subpath), this is much faster for thousands of clips.
+    """
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        connect = np.ones(x.shape, dtype=bool)
+        connect[:, -1] = 0  # don't draw the segment between each trace
+        return pg.arrayToQPath(x.ravel(), y.ravel(), connect.ravel())
+
+    numClips, numPnts = x.shape
+    path = QtGui.QPainterPath()
+    if hasattr(path, "reserve"):  # Qt 5.13
+        path.reserve(x.size)
+    clipPolygon = pg.functions.create_qpolygonf(numPnts)
+    clipArray = pg.functions.ndarray_from_qpolygonf(clipPolygon)
+    for clipIdx in range(numClips):
+        clipArray[:, 0] = x[clipIdx]
+        clipArray[:, 1] = y[clipIdx]
+        path.addPolygon(clipPolygon)
+    return path
 
 
 # class MultiLine(pg.QtGui.QGraphicsPathItem):
@@ -591,9 +737,7 @@ class MultiLine(QtWidgets.QGraphicsPathItem):
         self.linearRegionItem = None
 
         if len(x.shape) == 2:
-            connect = np.ones(x.shape, dtype=bool)
-            connect[:, -1] = 0  # don't draw the segment between each trace
-            self.path = pg.arrayToQPath(x.flatten(), y.flatten(), connect.flatten())
+            self.path = _clipsToQPath(x, y)
         else:
             self.path = pg.arrayToQPath(x.flatten(), y.flatten(), connect="all")
         # pg.QtGui.QGraphicsPathItem.__init__(self, self.path)
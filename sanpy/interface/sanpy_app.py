@@ -270,6 +270,7 @@ class SanPyWindow(QtWidgets.QMainWindow):
 
             if doQuit:
                 logger.info("SanPy is quiting")
+                self.myDetectionWidget.stopDetection()
                 QtCore.QCoreApplication.quit()
 
     def getOptions(self):
@@ -1,11 +1,97 @@
 from functools import partial
 
+import numpy as np
+
 from PyQt5 import QtCore, QtWidgets, QtGui
 import pyqtgraph as pg
 
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+class minMaxPyramid:
+    """Level of detail (min, max) pyramid of one trace.
+
+    Level 0 has the (min, max) of each block of `firstBlockSize` points,
+    each level above merges `factor` blocks of the level below. Build once
+    per trace and use getData() to get about 2 points per pixel for any
+    x range.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, factor: int = 4, firstBlockSize: int = 16):
+        """
+        Args:
+            x: x values, sorted (like sweepX)
+            y: y values, same length as x
+            factor: Number of blocks merged into one block at each level
+            firstBlockSize: Number of points in each block of level 0
+        """
+        self._x = x
+        self._y = y
+
+        # list of (blockSize, blockMin, blockMax), finest first
+        self._levels = []
+
+        blockSize = firstBlockSize
+        blockMin = self._reduce(y, np.fmin, firstBlockSize)
+        blockMax = self._reduce(y, np.fmax, firstBlockSize)
+        while True:
+            self._levels.append((blockSize, blockMin, blockMax))
+            if len(blockMin) <= factor:
+                break
+            blockMin = self._reduce(blockMin, np.fmin, factor)
+            blockMax = self._reduce(blockMax, np.fmax, factor)
+            blockSize *= factor
+
+    @staticmethod
+    def _reduce(values: np.ndarray, ufunc, blockSize: int) -> np.ndarray:
+        """Reduce each block of values with ufunc, NaN is ignored unless a block is all NaN."""
+        numFull = len(values) // blockSize
+        blocks = ufunc.reduce(values[: numFull * blockSize].reshape(numFull, blockSize), axis=1)
+        if numFull * blockSize < len(values):
+            # partial last block
+            blocks = np.append(blocks, ufunc.reduce(values[numFull * blockSize :]))
+        return blocks
+
+    def getData(self, start: float, stop: float, numPixels: int):
+        """Get (x, y) to plot the x range [start, stop] on numPixels.
+
+        Returns raw points when the range has fewer points per pixel than the
+        first block size, otherwise (min, max) pairs of about one block per
+        pixel, both are at the x of their block start.
+        """
+        numPixels = max(int(numPixels), 1)
+        startPnt = max(np.searchsorted(self._x, start, side="left") - 1, 0)
+        stopPnt = min(np.searchsorted(self._x, stop, side="right") + 1, len(self._x))
+
+        pntsPerPixel = (stopPnt - startPnt) / numPixels
+        theLevel = None
+        for level in self._levels:
+            if level[0] > pntsPerPixel:
+                break
+            theLevel = level
+        if theLevel is None:
+            return self._x[startPnt:stopPnt], self._y[startPnt:stopPnt]
+
+        blockSize, blockMin, blockMax = theLevel
+        startBlock = startPnt // blockSize
+        stopBlock = -(-stopPnt // blockSize)
+        blockMin = blockMin[startBlock:stopBlock]
+        blockMax = blockMax[startBlock:stopBlock]
+
+        # merge blocks of this level down to about one block per pixel
+        mergeBlocks = max(len(blockMin) // numPixels, 1)
+        if mergeBlocks > 1:
+            blockMin = self._reduce(blockMin, np.fmin, mergeBlocks)
+            blockMax = self._reduce(blockMax, np.fmax, mergeBlocks)
+        blockSize *= mergeBlocks
+
+        xPlot = np.repeat(self._x[startBlock * theLevel[0] :: blockSize][: len(blockMin)], 2)
+        yPlot = np.empty(len(xPlot))
+        yPlot[0::2] = blockMin
+        yPlot[1::2] = blockMax
+        return xPlot, yPlot
+
+
 class sanpyCursors(QtCore.QObject):
     signalCursorDragged = QtCore.pyqtSignal(str)  # dx
     signalSetDetectionParam = QtCore.pyqtSignal(str, float)
@@ -43,20 +43,21 @@ from typing import List, Union, Optional
 
 import numpy as np
 import pandas as pd
-from skimage.measure import profile
-import scipy.signal
-import scipy
-import tifffile
-
-import matplotlib.pyplot as plt
+import scipy  # submodules like scipy.signal are loaded on first use
 
 import warnings
 
 import sanpy
+from sanpy._util import _lazyImport
 
 from sanpy.sanpyLogger import get_logger
 logger = get_logger(__name__)
 
+# only load when we analyze a kymograph
+profile = _lazyImport("skimage.measure.profile")
+tifffile = _lazyImport("tifffile")
+plt = _lazyImport("matplotlib.pyplot")
+
 class myMplPlot():
     def __init__(self, x, y):
         self.fig = plt.figure()
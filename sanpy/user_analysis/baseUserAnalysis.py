@@ -5,7 +5,9 @@ import importlib
 import os
 import traceback  # to print call stack on exception
 import inspect
-from typing import List, Union
+from typing import List, Union, Dict, Optional, Tuple
+
+import numpy as np
 
 import sanpy
 from sanpy import DO_KYMOGRAPH_ANALYSIS
@@ -36,15 +38,26 @@ def _module_from_file(module_name, file_path):
     return module
 
 
+# user analysis files that are already loaded, {file: (mtime, pluginDict)}
+_userPluginCache: Dict[str, Tuple[float, dict]] = {}
+
+# user analysis classes in sanpy.user_analysis, found once
+_corePluginList: Optional[List[dict]] = None
+
+
 def _getObjectList(verbose=True) -> List[dict]:
     """Return a list of classes defined in sanpy.userAnalysis.
 
     Each of these is an object we can (i) construct or (ii) interrogate statis class members
 
+    User analysis files are only (re)loaded when they are new or their
+    modification time changes, see _userPluginCache.
+
     Returns
     -------
     list of dict
     """
+    global _corePluginList
 
     if verbose:
         logger.info("")
@@ -57,6 +70,11 @@ def _getObjectList(verbose=True) -> List[dict]:
     pluginDict = {}
     loadedModuleList = []
 
+    # forget files that were removed
+    for file in list(_userPluginCache.keys()):
+        if file not in files:
+            del _userPluginCache[file]
+
     for file in files:
         if file.endswith("__init__.py"):
             continue
@@ -64,6 +82,11 @@ def _getObjectList(verbose=True) -> List[dict]:
         if file == 'baseUserAnalysis.py':
             continue
 
+        mtime = os.path.getmtime(file)
+        if file in _userPluginCache and _userPluginCache[file][0] == mtime:
+            loadedModuleList.append(_userPluginCache[file][1])
+            continue
+
         moduleName = os.path.split(file)[1]
         moduleName = os.path.splitext(moduleName)[0]
         fullModuleName = "sanpy.user_analysis." + moduleName  # + "." + moduleName
@@ -108,10 +131,15 @@ def _getObjectList(verbose=True) -> List[dict]:
         if verbose:
             logger.info(f'  loading user analysis from file: "{file}"')
 
+        _userPluginCache[file] = (mtime, pluginDict)
         loadedModuleList.append(pluginDict)
 
+    if _corePluginList is not None:
+        return loadedModuleList + _corePluginList
+
     # new, june 2023, get from user_analysis folder as well
     logger.info('fetching user analysis from core code folder sanpy.user_analysis')
+    _corePluginList = []
     _ignoreModuleList = []
     if not DO_KYMOGRAPH_ANALYSIS:
         _ignoreModuleList.append('kymUserAnalysis')
@@ -139,7 +167,7 @@ def _getObjectList(verbose=True) -> List[dict]:
             if verbose:
                 logger.info(f' loading core user analysis from user_analysis: "{moduleName}"')
 
-            loadedModuleList.append(pluginDict)
+            _corePluginList.append(pluginDict)
           
     # print out the entire list
     # logger.info('')
@@ -147,13 +175,13 @@ def _getObjectList(verbose=True) -> List[dict]:
     #     for k,v in loadedModuleDict.items():
     #         logger.info(f'    {k} : {v}')
     #
-    return loadedModuleList  # list of dict
+    return loadedModuleList + _corePluginList  # list of dict
 
 
 def findUserAnalysisStats() -> List[dict]:
     """Get the stat names of all user defined analysis.
     
-    This is determined once at runtime. If files change, sanpy must be restarted.
+    User analysis files are reloaded when they change, see _getObjectList().
     """
     userStatList: List[dict] = []
     objList = _getObjectList()  # list of dict
@@ -340,6 +368,50 @@ class baseUserAnalysis:
                 f"spikeIdx {spikeIdx} is out of range, max value is {self.ba.numSpikes}"
             )
 
+    def getColumn(self, theKey: str) -> np.ndarray:
+        """Get one analysis result for all spikes.
+
+        Parameters
+        ----------
+        theKey : str
+            Name of the analysis result defined internal name.
+
+        Returns
+        -------
+        np.ndarray
+            One value per spike, None if theKey is not a key in analysis results.
+        """
+        try:
+            return self.ba.spikeDict.getColumn(theKey)
+        except KeyError as e:
+            logger.error(f'User internal stat does not exist "{theKey}"')
+
+    def setColumn(self, theKey: str, theValues, spikeIdx=None):
+        """Set the value of a spike key for all spikes or a list of spikes.
+
+        Parameters
+        ----------
+        theKey : str
+            Name of the user defined internal name.
+        theValues : scalar, list, or np.ndarray
+            One value per spike in spikeIdx, a scalar is set for all of them.
+        spikeIdx : list of int or np.ndarray
+            The spike indices, 0 based. If None then set all spikes.
+        """
+        if spikeIdx is not None:
+            spikeIdx = np.asarray(spikeIdx, dtype=np.int64)
+            if len(spikeIdx) > 0 and (
+                spikeIdx.min() < 0 or spikeIdx.max() >= self.ba.numSpikes
+            ):
+                logger.error(
+                    f"spikeIdx is out of range, max value is {self.ba.numSpikes}"
+                )
+                return
+        try:
+            self.ba.spikeDict.setColumn(theKey, theValues, rows=spikeIdx)
+        except ValueError as e:
+            logger.error(e)
+
     def run(self):
         """Run user analysis. Calculate values for each new user stat."""
 
@@ -1,5 +1,5 @@
 import numpy as np
-import scipy.signal
+import scipy  # submodules like scipy.signal are loaded on first use
 
 from sanpy.user_analysis.baseUserAnalysis import baseUserAnalysis
 
@@ -54,61 +54,57 @@ class kymUserAnalysis(baseUserAnalysis):
         filteredDiam = self.ba.kymAnalysis.getResults('diameter_um_golay')
 
         pairedSpikeList = dResultDict['pairedSpikeList']
+        if len(pairedSpikeList) == 0:
+            return
 
         # for spikeIdx, spikeDict in enumerate(self.ba.spikeDict):
         #     if not spikeIdx in pairedSpikeList:
         #         logger.warning(f'ba spike {spikeIdx} is not in pairedSpikeList:{pairedSpikeList}')
         #         continue
-        
-        for _tmpIdx, spikeIdx in enumerate(pairedSpikeList):
-            # spikeIdx is index into ba spike dict
 
-            diamSpikeIdx = _tmpIdx
-            
-            k_diam_foot_pnt = dResultDict['diamSpikeTimes'][diamSpikeIdx]
-            k_diam_foot_sec = self.ba.fileLoader.pnt2Sec_(k_diam_foot_pnt)
-            k_diam_foot = filteredDiam[k_diam_foot_pnt]
+        # one value per diameter spike, pairedSpikeList is index into ba spike dict
+        filteredDiam = np.asarray(filteredDiam)
 
-            k_diam_peak_pnt = dResultDict['diamPeakPnts'][diamSpikeIdx]
-            k_diam_peak_sec = self.ba.fileLoader.pnt2Sec_(k_diam_peak_pnt)
-            k_diam_peak = filteredDiam[k_diam_peak_pnt]
+        k_diam_foot_pnt = np.asarray(dResultDict['diamSpikeTimes'])
+        k_diam_foot_sec = self.ba.fileLoader.pnt2Sec_(k_diam_foot_pnt)
+        k_diam_foot = filteredDiam[k_diam_foot_pnt]
 
-            k_diam_time_to_peak_sec = k_diam_peak_sec - k_diam_foot_sec
-            k_diam_amp = k_diam_peak - k_diam_foot  # may be reversed +/-
+        k_diam_peak_pnt = np.asarray(dResultDict['diamPeakPnts'])
+        k_diam_peak_sec = self.ba.fileLoader.pnt2Sec_(k_diam_peak_pnt)
+        k_diam_peak = filteredDiam[k_diam_peak_pnt]
 
-            k_fit_m = dResultDict['fit_tau_sec'][diamSpikeIdx]
-            k_fit_tau = dResultDict['fit_tau_sec'][diamSpikeIdx]
-            k_fit_b = dResultDict['fit_tau_sec'][diamSpikeIdx]
+        k_diam_time_to_peak_sec = k_diam_peak_sec - k_diam_foot_sec
+        k_diam_amp = k_diam_peak - k_diam_foot  # may be reversed +/-
 
-            k_diam_tau_sec = dResultDict['fit_tau_sec'][diamSpikeIdx]
-            k_diam_fit_r2 = dResultDict['fit_r2'][diamSpikeIdx]
+        k_fit_m = dResultDict['fit_tau_sec']
+        k_fit_tau = dResultDict['fit_tau_sec']
+        k_fit_b = dResultDict['fit_tau_sec']
 
-            # logger.info(f'ba spike {spikeIdx} k_diam_foot_sec:{k_diam_foot_sec} k_diam_foot:{k_diam_foot}')
-            # logger.info(f'    k_diam_peak_sec:{k_diam_peak_sec} k_diam_peak:{k_diam_peak}')
-            
-            # set values in main ba
-            self.setSpikeValue(spikeIdx, "k_diam_foot", k_diam_foot)
-            self.setSpikeValue(spikeIdx, "k_diam_foot_pnt", k_diam_foot_pnt)
-            self.setSpikeValue(spikeIdx, "k_diam_foot_sec", k_diam_foot_sec)
-            # peak
-            self.setSpikeValue(spikeIdx, "k_diam_peak", k_diam_peak)
-            # logger.info(f'                                                           spikeIdx:{spikeIdx} k_diam_peak_pnt:{k_diam_peak_pnt}')
-            self.setSpikeValue(spikeIdx, "k_diam_peak_pnt", k_diam_peak_pnt)
-            self.setSpikeValue(spikeIdx, "k_diam_peak_sec", k_diam_peak_sec)
-            # summary
-            self.setSpikeValue(spikeIdx, "k_diam_time_to_peak_sec", k_diam_time_to_peak_sec)
-            self.setSpikeValue(spikeIdx, "k_diam_amp", k_diam_amp)
+        k_diam_tau_sec = dResultDict['fit_tau_sec']
+        k_diam_fit_r2 = dResultDict['fit_r2']
 
-            # percent change in diameter from foot to peak
-            k_diam_percent = round( k_diam_peak / k_diam_foot * 100, 3)
-            self.setSpikeValue(spikeIdx, "k_diam_percent", k_diam_percent)
+        # set values in main ba
+        self.setColumn("k_diam_foot", k_diam_foot, pairedSpikeList)
+        self.setColumn("k_diam_foot_pnt", k_diam_foot_pnt, pairedSpikeList)
+        self.setColumn("k_diam_foot_sec", k_diam_foot_sec, pairedSpikeList)
+        # peak
+        self.setColumn("k_diam_peak", k_diam_peak, pairedSpikeList)
+        self.setColumn("k_diam_peak_pnt", k_diam_peak_pnt, pairedSpikeList)
+        self.setColumn("k_diam_peak_sec", k_diam_peak_sec, pairedSpikeList)
+        # summary
+        self.setColumn("k_diam_time_to_peak_sec", k_diam_time_to_peak_sec, pairedSpikeList)
+        self.setColumn("k_diam_amp", k_diam_amp, pairedSpikeList)
+
+        # percent change in diameter from foot to peak
+        k_diam_percent = np.round(k_diam_peak / k_diam_foot * 100, 3)
+        self.setColumn("k_diam_percent", k_diam_percent, pairedSpikeList)
 
-            self.setSpikeValue(spikeIdx, "k_fit_m", k_fit_m)
-            self.setSpikeValue(spikeIdx, "k_fit_tau", k_fit_tau)
-            self.setSpikeValue(spikeIdx, "k_fit_b", k_fit_b)
+        self.setColumn("k_fit_m", k_fit_m, pairedSpikeList)
+        self.setColumn("k_fit_tau", k_fit_tau, pairedSpikeList)
+        self.setColumn("k_fit_b", k_fit_b, pairedSpikeList)
 
-            self.setSpikeValue(spikeIdx, "k_diam_tau_sec", k_diam_tau_sec)
-            self.setSpikeValue(spikeIdx, "k_diam_fit_r2", k_diam_fit_r2)
+        self.setColumn("k_diam_tau_sec", k_diam_tau_sec, pairedSpikeList)
+        self.setColumn("k_diam_fit_r2", k_diam_fit_r2, pairedSpikeList)
 
     def run(self):
         if not self.ba.fileLoader.isKymograph:
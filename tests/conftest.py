@@ -0,0 +1,12 @@
+import sys
+
+import pytest
+
+import sanpy
+
+@pytest.fixture(autouse=True)
+def headerIndexFolder(tmp_path, monkeypatch):
+	"""Save analysisDir header index files in tmp_path, not the user cache folder."""
+	folder = tmp_path / 'header_index'
+	monkeypatch.setattr(sys.modules['sanpy.analysisDir'], '_headerIndexFolder', str(folder))
+	return folder
@@ -0,0 +1,36 @@
+import copy
+
+import sanpy
+from sanpy.interface.bDetectionWidget import detectionWorker
+
+def test_detectionWorker_cancel(qtbot):
+    """Cancel a detection running in a background thread, the original ba is unchanged."""
+    path = 'data/19114001.abf'
+    dDict = sanpy.bDetection().getDetectionDict('SA Node')
+
+    ba = sanpy.bAnalysis(path)
+    assert ba.spikeDetect(dDict)
+    spikeDict = ba.spikeDict
+    numSpikes = ba.numSpikes
+    dDict2 = copy.deepcopy(dDict)
+    dDict2['dvdtThreshold'] = 5
+
+    worker = detectionWorker(ba, dDict2)
+    progress = []
+
+    def cancelOnProgress(ba, sweepNumber, numSweeps, sweepFraction):
+        progress.append(sweepFraction)
+        worker.cancel()
+
+    worker.signalDetectProgress.connect(cancelOnProgress)
+    with qtbot.waitSignal(worker.signalDetectDone, timeout=60_000) as blocker:
+        worker.start()
+    assert worker.wait(60_000)
+    assert not worker.isRunning()
+
+    # cancelled before the sweep is done
+    assert blocker.args == [ba, None]
+    assert all(sweepFraction < 1 for sweepFraction in progress)
+    assert ba.spikeDict is spikeDict
+    assert ba.numSpikes == numSpikes
+    assert ba.getDetectionDict()['dvdtThreshold'] == dDict['dvdtThreshold']
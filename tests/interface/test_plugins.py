@@ -170,6 +170,8 @@ def test_plugins(qtbot):
         _selectSpikesDict = {'ba': baWithAnalysis, 'spikeList':[1,10,15]}
         logger.info(f'   selecting spikes {_selectSpikesDict}')
         _newPlugin.slot_selectSpikeList(_selectSpikesDict)
+        # plugin is hidden so the refresh bus holds the refresh, run it now
+        _newPlugin.selectSpikeList()
 
         # TODO: test switch file
         # switch to csv ba with no spikes
@@ -191,6 +193,168 @@ def test_plugins(qtbot):
 
     logger.info('   done')
 
+def test_pluginManifest():
+    """Manifest matches the plugin classes it imports on first use.
+    """
+    pluginManifest = sanpy.interface.plugins.pluginManifest
+    for className, oneManifest in pluginManifest.items():
+        pluginClass = getattr(sanpy.interface.plugins, className)
+        assert pluginClass.__name__ == className
+        assert pluginClass.__module__ == 'sanpy.interface.plugins.' + oneManifest['module']
+        assert pluginClass.myHumanName == oneManifest['humanName']
+        assert pluginClass.showInMenu == oneManifest['showInMenu']
+
+    # importing a plugin module does not hide the plugin class of the same name
+    assert sanpy.interface.plugins.plotScatter.myHumanName == 'Plot Scatter'
+
+    pluginsObject = bPlugins()
+    assert pluginsObject.getConstructor('Plot Scatter') is sanpy.interface.plugins.plotScatter
+
+def test_pluginSubmoduleImportedFirst():
+    """Importing a plugin submodule first does not hide its class.
+
+    Python binds each imported submodule onto its package, run in a new
+    Python so sanpy.interface.plugins is imported in this order.
+    """
+    import subprocess
+
+    code = "\n".join([
+        "import importlib",
+        "from PyQt5 import QtWidgets",
+        "app = QtWidgets.QApplication([])",
+        "import sanpy.interface.plugins.sanpyPlugin",
+        "importlib.import_module('sanpy.interface.plugins.fftPlugin')",
+        "from sanpy.interface.plugins import sanpyPlugin, fftPlugin",
+        "assert isinstance(sanpyPlugin, type), sanpyPlugin",
+        "assert isinstance(fftPlugin, type), fftPlugin",
+        "from sanpy.interface import bPlugins",
+        "pluginsObject = bPlugins()",
+        "assert pluginsObject.getConstructor('FFT') is fftPlugin",
+        "newPlugin = pluginsObject.runPlugin('FFT', None, show=False)",
+        "assert isinstance(newPlugin, fftPlugin)",
+    ])
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, env=env
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+class _countPlugin(sanpy.interface.plugins.sanpyPlugin):
+    """Minimal plugin that counts replots and the stats it fetched."""
+    myHumanName = 'Count Replot'
+    showInMenu = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.numReplot = 0
+        self.numSelect = 0
+        self.peakVal = None
+
+    def replot(self):
+        self.numReplot += 1
+        self.peakVal = self.getStat('peakVal')
+
+    def selectSpikeList(self):
+        self.numSelect += 1
+
+def test_pluginRefreshBus(qtbot):
+    """Bursts coalesce into one refresh per plugin, hidden plugins wait until shown.
+    """
+    path = os.path.join('data', '19114001.abf')
+    ba = sanpy.bAnalysis(path)
+    bd = sanpy.bDetection()
+    ba.spikeDetect(bd.getDetectionDict('SA Node'))
+
+    pluginsObject = bPlugins()
+    refreshBus = pluginsObject.getRefreshBus()
+
+    plugins = [_countPlugin(ba=ba, bPlugin=pluginsObject) for _ in range(3)]
+    for plugin in plugins:
+        qtbot.addWidget(plugin)
+        plugin.show()
+    hiddenPlugin = plugins[2]
+    hiddenPlugin.hide()
+
+    # a burst of changes, like dragging the x-axis
+    for _idx in range(20):
+        for plugin in plugins:
+            plugin.slot_updateAnalysis({'ba': ba})
+            plugin.slot_selectSpikeList({'ba': ba, 'spikeList': [_idx]})
+
+    # nothing is refreshed until the bus flushes
+    assert all(plugin.numReplot == 0 for plugin in plugins)
+
+    qtbot.waitUntil(lambda: plugins[0].numReplot == 1)
+    for plugin in plugins[:2]:
+        assert plugin.numReplot == 1
+        assert plugin.numSelect == 1
+        assert plugin.getSelectedSpikes() == [19]
+        assert plugin.peakVal == ba.getStat('peakVal')
+
+    # each plugin gets its own copy of the shared snapshot
+    assert plugins[0].peakVal is not plugins[1].peakVal
+
+    # hidden plugin was skipped, catches up when shown
+    assert hiddenPlugin.numReplot == 0
+    hiddenPlugin.show()
+    qtbot.waitUntil(lambda: hiddenPlugin.numReplot == 1)
+    assert hiddenPlugin.numSelect == 1
+
+    # closed plugins are forgotten
+    plugins[0].slot_updateAnalysis({'ba': ba})
+    refreshBus.removePlugin(plugins[0])
+    refreshBus.flush()
+    assert plugins[0].numReplot == 1
+
+def test_spikeClips(qtbot):
+    """All clips are one path, mean and variance follow the selected clips.
+    """
+    import numpy as np
+
+    path = os.path.join('data', '19114001.abf')
+    ba = sanpy.bAnalysis(path)
+    bd = sanpy.bDetection()
+    ba.spikeDetect(bd.getDetectionDict('SA Node'))
+
+    plugin = sanpy.interface.plugins.spikeClips(ba=ba)
+    qtbot.addWidget(plugin)
+
+    # one path for all clips plus the mean clip
+    assert len(plugin.clipPlot.items) == 2
+    allClips = plugin.y.copy()
+    assert allClips.shape[0] == len(ba.getSpikeClipSpikeNumbers())
+    assert plugin.y.shape[0] > 5
+
+    # selection only changes rows, clips are not remade
+    plugin.respondTo = 'Spike Selection'
+    plugin.varianceCheckBox.setChecked(True)
+    clipCache = plugin._allClips
+    for spikeList in [[1, 2, 3], [2, 3, 4, 5], [5], list(range(1, plugin.y.shape[0]))]:
+        plugin.setSelectedSpikes(spikeList)
+        plugin.selectSpikeList()
+        assert plugin._allClips is clipCache
+        rows = np.isin(ba.getSpikeClipSpikeNumbers(), spikeList)
+        assert plugin.y.shape[0] == rows.sum()
+        np.testing.assert_allclose(plugin.yMean, np.nanmean(allClips[rows], axis=0))
+        np.testing.assert_allclose(plugin.yVar, np.nanvar(allClips[rows], axis=0), atol=1e-9)
+
+    # phase plot
+    plugin.phasePlotCheckBox.setChecked(True)
+    phaseClips = np.diff(allClips[rows], axis=1)
+    np.testing.assert_allclose(plugin.yMean, np.nanmean(phaseClips, axis=0), atol=1e-9)
+    np.testing.assert_allclose(plugin.yVar, np.nanvar(phaseClips, axis=0), atol=1e-9)
+
+    # color draws a bounded number of paths
+    plugin.maxColorBlocks = 4
+    plugin.colorCheckBox.setChecked(True)
+    assert len(plugin.clipPlot.items) == 4 + 1 + 1  # clips, mean, spike selection
+
+    # new detection remakes the clips
+    ba.spikeDetect(bd.getDetectionDict('SA Node'))
+    plugin.slot_updateAnalysis({'ba': ba})
+    plugin.replot()
+    assert plugin._allClips is not clipCache
+
 if __name__ == '__main__':
 
     if 0:
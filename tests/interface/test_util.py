@@ -0,0 +1,26 @@
+import numpy as np
+
+from sanpy.interface.util import minMaxPyramid
+
+def test_minMaxPyramid():
+    x = np.arange(100_000) / 20  # ms
+    y = np.sin(x)
+    y[500:700] = np.nan
+    y[70_000] = 5  # a one point spike
+    pyramid = minMaxPyramid(x, y)
+
+    # about 2 points per pixel, min and max are kept
+    xPlot, yPlot = pyramid.getData(x[0], x[-1], 500)
+    assert 500 <= len(xPlot) <= 3 * 500
+    assert np.nanmax(yPlot) == 5
+    assert np.nanmin(yPlot) == np.nanmin(y)
+    assert xPlot[0] == x[0]
+
+    # a zoomed range
+    xPlot, yPlot = pyramid.getData(3000, 3500, 100)
+    assert xPlot[0] <= 3000 and xPlot[-1] >= 3500 - 5
+    assert np.nanmax(yPlot) == 5
+
+    # few points per pixel is raw data
+    xPlot, yPlot = pyramid.getData(100, 110, 1000)
+    assert np.array_equal(xPlot, x[1999:2202])
@@ -52,5 +52,27 @@ class Test_Analysis(unittest.TestCase):
 
         self.assertEqual(len(thresholdSec), self.expectedNumSpikes) # expecting 102 spikes
 
+    def test_3_spikeClips(self):
+        logger.info('RUNNING')
+        theseClips, theseClips_x, meanClip = self.ba.getSpikeClips(
+            None, None, preSpikeClipWidth_ms=10, postSpikeClipWidth_ms=20
+        )
+
+        # one 2D clip array with one shared x-axis
+        numPnts = self.ba.fileLoader.ms2Pnt_(10) + self.ba.fileLoader.ms2Pnt_(20)
+        self.assertEqual(theseClips.shape, (self.expectedNumSpikes, numPnts))
+        self.assertEqual(theseClips_x.shape, theseClips.shape)
+        self.assertEqual(theseClips_x[0, self.ba.fileLoader.ms2Pnt_(10)], 0)
+        self.assertTrue((meanClip == theseClips.mean(axis=0)).all())
+
+        thresholdPnt = self.ba.getStat('thresholdPnt')[5]
+        startPnt = thresholdPnt - self.ba.fileLoader.ms2Pnt_(10)
+        sweepY = self.ba.fileLoader.sweepY_filtered
+        self.assertTrue((theseClips[5] == sweepY[startPnt:startPnt+numPnts]).all())
+
+        # clips by spike number
+        theseClips, _, _ = self.ba.getSpikeClips(None, None, spikeSelection=[2, 4])
+        self.assertEqual(len(theseClips), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,8 @@
 import os
+import shutil
+import sys
+
+import pytest
 
 import sanpy
 from sanpy.sanpyLogger import get_logger
@@ -17,5 +21,150 @@ def test_dir():
 		ba = ad.getAnalysis(rowIdx)
 		print(ba)
 
+def test_loadFolder_workers(tmp_path, monkeypatch):
+	for file in ['19114000.abf', '2021_07_20_0010.abf']:
+		shutil.copy(os.path.join('data', file), tmp_path)
+
+	ad = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+
+	df = ad.loadFolder(workers=1)
+
+	# read headers in a pool even with few files
+	monkeypatch.setattr(sys.modules['sanpy.analysisDir'], '_poolMinFiles', 1)
+	dfPool = ad.loadFolder(workers=2)
+
+	assert len(df) == 2
+	assert df.equals(dfPool)
+
+	# header only rows match rows from loaded data
+	for rowIdx in range(len(df)):
+		path = ad.getPathFromRelPath(df.at[rowIdx, 'relPath'])
+		_ba, rowDict = ad.getFileRow(path, loadData=True)
+		for col in ['Dur(s)', 'Sweeps', 'Epochs', 'kHz', 'Mode', 'Acq Date']:
+			assert df.at[rowIdx, col] == rowDict[col]
+
+def test_headerIndex(tmp_path, monkeypatch, headerIndexFolder):
+	dataPath = os.path.join(tmp_path, 'data')
+	os.mkdir(dataPath)
+	for file in ['19114000.abf', '2021_07_20_0010.abf']:
+		shutil.copy(os.path.join('data', file), dataPath)
+	tmp_path = dataPath
+
+	ad = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	df = ad.getDataFrame()
+
+	# header index is saved in the cache folder, not the data folder
+	assert os.path.dirname(ad._getHeaderIndexFile()) == str(headerIndexFolder)
+	assert os.path.isfile(ad._getHeaderIndexFile())
+	assert sorted(os.listdir(tmp_path)) == ['19114000.abf', '2021_07_20_0010.abf']
+
+	# reopen without reading any file headers
+	analysisDirModule = sys.modules['sanpy.analysisDir']
+	_getFileRow = analysisDirModule._getFileRow
+	readList = []
+	def _countFileRow(path, *args, **kwargs):
+		readList.append(path)
+		return _getFileRow(path, *args, **kwargs)
+	monkeypatch.setattr(analysisDirModule, '_getFileRow', _countFileRow)
+
+	ad2 = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	assert len(readList) == 0
+	assert df.drop('_ba', axis=1).equals(ad2.getDataFrame().drop('_ba', axis=1))
+
+	# only changed file is read
+	changedPath = os.path.join(tmp_path, '19114000.abf')
+	os.utime(changedPath, (0, 0))
+	ad3 = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	assert readList == [changedPath]
+	assert len(ad3) == 2
+
+def test_analyzeAll(tmp_path):
+	for file in ['19114000.abf', '19114001.abf']:
+		shutil.copy(os.path.join('data', file), tmp_path)
+
+	ad = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	dfSummary = ad.analyzeAll('SA Node', workers=2)
+
+	assert len(dfSummary) == 2
+	assert (dfSummary['Error'] == '').all()
+
+	# reload table and analysis from h5 file
+	ad2 = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	for rowIdx in range(len(ad2)):
+		assert ad2.getDataFrame().at[rowIdx, 'uuid']
+		ba = ad2.getAnalysis(rowIdx)
+		assert ba.numSpikes == dfSummary.at[rowIdx, 'N']
+		assert ba.numSpikes > 0
+
+	# nothing changed, save does not write to h5 file
+	hdfPath = ad2._getHdfFile()
+	ad2.saveHdf(repack=False)  # file table has new loaded (L) column
+	hdfSize = os.path.getsize(hdfPath)
+	ad2.saveHdf(repack=False)
+	assert os.path.getsize(hdfPath) == hdfSize
+
+	# re-saving analysis leaves wasted space until repack
+	ba = ad2.getAnalysis(0)
+	ba._detectionDirty = True
+	ad2.saveHdf(repack=False)
+	assert sanpy.h5Util.getWastedFraction(hdfPath) > 0.1
+	ad2.saveHdf(repack=True)
+	assert sanpy.h5Util.getWastedFraction(hdfPath) < 0.1
+
+def test_saveHdf_repackFraction(tmp_path):
+	for file in ['19114000.abf', '19114001.abf']:
+		shutil.copy(os.path.join('data', file), tmp_path)
+
+	ad = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+	ad.analyzeAll('SA Node', workers=1)
+	hdfPath = ad._getHdfFile()
+
+	# re-saving analysis leaves wasted space
+	ba = ad.getAnalysis(0)
+	ba._detectionDirty = True
+	ad.saveHdf(repack=False)
+	wastedFraction = sanpy.h5Util.getWastedFraction(hdfPath)
+	assert wastedFraction > 0.1
+	hdfSize = os.path.getsize(hdfPath)
+
+	# at or below the threshold, nothing to save and no repack
+	ad.saveHdf(repackFraction=wastedFraction + 0.01)
+	ad.saveHdf(repackFraction=wastedFraction)
+	assert os.path.getsize(hdfPath) == hdfSize
+	assert sanpy.h5Util.getWastedFraction(hdfPath) == wastedFraction
+
+	# above the threshold repacks
+	ad.saveHdf(repackFraction=wastedFraction - 0.01)
+	assert os.path.getsize(hdfPath) < hdfSize
+	assert sanpy.h5Util.getWastedFraction(hdfPath) < 0.1
+
+	# default threshold
+	assert ad.repackFraction == 0.3
+	with pytest.raises(ValueError):
+		ad.saveHdf(repackFraction=2)
+
+def test_analyzeAll_skipsDirty(tmp_path):
+	for file in ['19114000.abf', '19114001.abf']:
+		shutil.copy(os.path.join('data', file), tmp_path)
+
+	ad = sanpy.analysisDir(path=str(tmp_path), folderDepth=1)
+
+	# user edits to a loaded analysis are not saved
+	ba = ad.getAnalysis(0)
+	ba.spikeDetect(sanpy.bDetection().getDetectionDict('SA Node'))
+	ba.setSpikeStat([0], 'isBad', True)
+	assert ad.analysisIsDirty(0)
+
+	dfSummary = ad.analyzeAll('SA Node', workers=1)
+
+	assert len(dfSummary) == 2
+	assert 'unsaved' in dfSummary.at[0, 'Error']
+	assert dfSummary.at[1, 'Error'] == ''
+
+	# dirty analysis is still loaded with its edits
+	assert ad.getDataFrame().at[0, '_ba'] is ba
+	assert ba.getStat('isBad')[0]
+	assert ad.getDataFrame().at[1, '_ba'] is None
+
 if __name__ == '__main__':
 	test_dir()
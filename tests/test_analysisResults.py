@@ -0,0 +1,393 @@
+import copy
+import numpy as np
+import pandas as pd
+
+import sanpy
+from sanpy.bAnalysisResults import analysisResultList
+
+def test_analysisResultList():
+    arl = analysisResultList()
+    arl.appendDefault(3)
+    assert len(arl) == 3
+
+    # dictionary like access to one spike
+    arl[1]["peakVal"] = 12.5
+    assert arl[1]["peakVal"] == 12.5
+    assert np.isnan(arl[0]["peakVal"])
+
+    # int columns stay int
+    arl.setColumn("thresholdPnt", np.array([10, 20, 30]))
+    assert arl[2]["thresholdPnt"] == 30
+    assert isinstance(arl[2]["thresholdPnt"], int)
+
+    # errors are in a side table, only spikes with errors are in it
+    arl.appendError(0, {"Type": "test"})
+    assert len(arl[0]["errors"]) == 1
+    assert len(arl[1]["errors"]) == 0
+    assert len(arl.getColumn("errors")) == 3
+    arl.asDataFrame()
+    assert list(arl._errors.keys()) == [0]
+
+    # new user keys are added for all spikes
+    arl[2]["user_stat"] = "a"
+    assert "user_stat" in arl[0].keys()
+
+    df = arl.asDataFrame()
+    assert len(df) == 3
+    assert df["thresholdPnt"].dtype == np.int64
+    assert df.columns[-1] == "user_stat"
+
+def test_appendAnalysis():
+    arl = analysisResultList()
+    arl.appendDefault(2)
+    arl.setColumn("sweep", 0)
+
+    other = analysisResultList()
+    other.appendDefault(3)
+    other.setColumn("sweep", 1)
+    other.appendError(0, {"Type": "test"})
+
+    arl.appendAnalysis(other)
+    assert len(arl) == 5
+    assert list(arl.getColumn("sweep")) == [0, 0, 1, 1, 1]
+    assert len(arl[2]["errors"]) == 1
+
+def test_getSpikeIndex():
+    arl = analysisResultList()
+    arl.appendDefault(6)
+    arl.setColumn("sweep", [0, 0, 1, 1, 0, 2])
+    arl.setColumn("epoch", [0, 1, 0, 1, 1, 0])
+    arl.setColumn("thresholdSec", [0.5, 0.1, 0.2, 0.3, 0.9, 0.1])
+
+    spikeIndex = arl.getSpikeIndex()
+    assert spikeIndex.getRows() == slice(0, 6)
+    assert spikeIndex.getRows(1) == slice(2, 4)
+    assert list(spikeIndex.getRows(0)) == [0, 1, 4]
+    assert list(spikeIndex.getRows(0, 1)) == [1, 4]
+    assert list(spikeIndex.getRows("All", 0)) == [0, 2, 5]
+    assert spikeIndex.getRows(3) == slice(0, 0)
+    assert list(spikeIndex.getRowsInTime(0.1, 0.3)) == [1, 2, 5]
+    assert list(arl.getColumn("sweep", rows=spikeIndex.getRows(0, 1))) == [0, 0]
+
+    # rebuilt only when index keys change
+    arl.setColumn("peakVal", 1.0)
+    assert arl.getSpikeIndex() is spikeIndex
+    arl[4]["sweep"] = 1
+    assert arl.getSpikeIndex() is not spikeIndex
+    assert arl.getSpikeIndex().getRows(1) == slice(2, 5)
+
+def test_getStat():
+    path = 'data/19114001.abf'
+    ba = sanpy.bAnalysis(path)
+    dDict = sanpy.bDetection().getDetectionDict('SA Node')
+    ba.spikeDetect(dDict)
+
+    peakVal = ba.getStat('peakVal')
+    assert len(peakVal) == ba.numSpikes
+    assert peakVal[5] == ba.spikeDict[5]['peakVal']
+
+    ba.setSpikeStat([1, 2], 'userType', 3)
+    assert ba.getSpikeStat([0, 1, 2], 'userType') == [0, 3, 3]
+
+    # sweep and epoch filtering match a mask over all spikes
+    path = 'data/2021_07_20_0010.abf'
+    ba = sanpy.bAnalysis(path)
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+    ba.spikeDetect(dDict)
+    sweeps = np.array(ba.getStat('sweep'))
+    epochs = np.array(ba.getStat('epoch'))
+    peakVal = np.array(ba.getStat('peakVal'))
+    for sweep in range(ba.fileLoader.numSweeps):
+        for epoch in ['All', 0, 1, 2]:
+            mask = sweeps == sweep
+            if epoch != 'All':
+                mask &= epochs == epoch
+            assert ba.getStat('peakVal', sweepNumber=sweep, epochNumber=epoch) == list(peakVal[mask])
+
+def test_spikeDetect_workers():
+    path = 'data/2021_07_20_0010.abf'  # 18 sweeps
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+
+    ba2 = sanpy.bAnalysis(path)
+    ba2.spikeDetect(dDict, workers=2)
+
+    assert ba2.numSpikes == ba.numSpikes
+    assert list(ba2.getStat('spikeNumber')) == list(range(ba.numSpikes))
+    assert ba2.getStat('sweep') == ba.getStat('sweep')
+    assert ba2.getStat('thresholdPnt') == ba.getStat('thresholdPnt')
+    assert len(ba2.dfError) == len(ba.dfError)
+
+def test_spikeDetect_chunks():
+    path = 'data/19114001.abf'
+    dDict = sanpy.bDetection().getDetectionDict('SA Node')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+
+    # chunks much shorter than the recording
+    ba2 = sanpy.bAnalysis(path, lazy=True)
+    ba2.spikeDetect(dDict, chunkSec=0.5)
+
+    assert ba2.numSpikes == ba.numSpikes
+    for stat in ['spikeNumber', 'sweepSpikeNumber', 'thresholdPnt', 'thresholdSec',
+                 'peakPnt', 'preMinPnt', 'postSpike_dvdt_min_pnt', 'isi_ms', 'cycleLength_ms',
+                 'earlyDiastolicDurationRate', 'widths_50']:
+        assert np.array_equal(ba2.getStat(stat), ba.getStat(stat), equal_nan=True), stat
+    assert ba2.spikeDict[10]['widths'] == ba.spikeDict[10]['widths']
+    assert ba2.dfError.equals(ba.dfError)
+
+def test_spikeDetect_chunksLongRefractory():
+    """Chunked detection is the same as whole sweep detection.
+
+    Wu-iPSC has a refractory_ms and peakWindow_ms longer than small chunks.
+    """
+    dDict = sanpy.bDetection().getDetectionDict('Wu-iPSC')
+    dropColumns = ['analysisDate', 'analysisTime']
+
+    for path in ['data/19114001.abf', 'data/19114000.abf']:
+        ba = sanpy.bAnalysis(path)
+        ba.spikeDetect(dDict)
+        df = ba.asDataFrame().drop(columns=dropColumns)
+
+        # 0.1 s chunks are smaller than the padding before and after them
+        prePnts, postPnts = ba._getChunkPadding()
+        assert ba.fileLoader.ms2Pnt_(100) < min(prePnts, postPnts)
+
+        for chunkSec in [0.1, 1.0, 7.3]:
+            ba2 = sanpy.bAnalysis(path, lazy=True)
+            ba2.spikeDetect(dDict, chunkSec=chunkSec)
+            df2 = ba2.asDataFrame().drop(columns=dropColumns)
+            pd.testing.assert_frame_equal(df2, df)
+            assert ba2.dfError.equals(ba.dfError)
+
+def test_spikeDetect_chunksLazy():
+    """Lazy chunked detection never reads or filters a full sweep."""
+    path = 'data/19114001.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Wu-iPSC')
+
+    ba = sanpy.bAnalysis(path, lazy=True)
+    ba.spikeDetect(dDict, chunkSec=1.0)
+    assert ba.numSpikes > 0
+
+    fileLoader = ba.fileLoader
+    assert fileLoader._sweepX is None
+    assert fileLoader._lazySweepY is None
+    assert fileLoader._filteredY is None
+    assert fileLoader._filteredDeriv is None
+    assert len(fileLoader._derivativeCache) == 0
+
+    # the current sweep is filtered when it is needed, with the detection filter
+    ba2 = sanpy.bAnalysis(path)
+    ba2.spikeDetect(dDict)
+    assert np.array_equal(fileLoader.sweepY_filtered, ba2.fileLoader.sweepY_filtered)
+
+    # spike clips only read their points
+    clips = ba._makeSpikeClips(None, None)[1]
+    assert np.array_equal(clips, ba2._makeSpikeClips(None, None)[1])
+
+def test_detectionTimes():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+
+    # reports are made once for all sweeps
+    assert list(ba.detectionTimes.keys()) == ['detect', 'userAnalysis', 'dataFrame', 'errorReport']
+    assert len(ba.asDataFrame()) == ba.numSpikes
+    assert set(ba.dfError['Sweep']) <= set(ba.fileLoader.sweepList)
+
+def test_getErrors():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+
+    dfError = ba.getErrors()
+    assert len(dfError) == ba.numErrors
+    assert list(dfError.columns) == ['Spike', 'Seconds', 'Sweep', 'Epoch', 'Type', 'Details']
+
+    # each error has the sweep and epoch of its spike
+    assert set(dfError['Sweep']) <= set(ba.getStat('sweep'))
+    assert set(dfError['Epoch']) <= set(ba.getStat('epoch'))
+
+    sweep = dfError['Sweep'].iloc[-1]
+    errorType = dfError['Type'].iloc[-1]
+    oneSweep = ba.getErrors(sweepNumber=sweep)
+    assert len(oneSweep) == (dfError['Sweep'] == sweep).sum()
+    oneType = ba.getErrors(sweepNumber=sweep, errorType=errorType)
+    assert len(oneType) > 0
+    assert set(oneType['Type']) == {errorType}
+    assert len(ba.getErrors(sweepNumber=sweep, errorType='not an error')) == 0
+
+def test_spikeDetect_reuseCandidates():
+    path = 'data/19114001.abf'
+    dDict = copy.deepcopy(sanpy.bDetection().getDetectionDict('SA Node'))
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+    candidates = ba._candidateCache[0]['candidates']
+
+    # half-widths are a feature, candidates are reused
+    dDict['halfHeights'] = [20, 50]
+    ba.spikeDetect(dDict)
+    assert ba._candidateCache[0]['candidates'] is candidates
+
+    ba2 = sanpy.bAnalysis(path)
+    ba2.spikeDetect(copy.deepcopy(dDict))
+    assert ba.numSpikes == ba2.numSpikes
+    assert ba.getStat('widths_20') == ba2.getStat('widths_20')
+    assert ba.dfError.equals(ba2.dfError)
+
+    # peak filter is a candidate stage
+    dDict['onlyPeaksAbove_mV'] = 20
+    ba.spikeDetect(dDict)
+    assert ba._candidateCache[0]['candidates'] is not candidates
+    assert ba.numSpikes < ba2.numSpikes
+
+def test_sweepDetection():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+    numSpikes = ba.numSpikes
+
+    grid = {'refractory_ms': [5, 50], 'dvdtThreshold': [20, 40]}
+    df = ba.sweepDetection(grid)
+    assert len(df) == 4
+    assert list(df.columns[:4]) == ['dvdtThreshold', 'refractory_ms', 'numSpikes', 'numErrors']
+    assert 'peakVal_mean' in df.columns
+
+    # our own analysis is not changed
+    assert ba.numSpikes == numSpikes
+
+    for _, row in df.iterrows():
+        oneDict = copy.deepcopy(dDict)
+        oneDict['refractory_ms'] = row['refractory_ms']
+        oneDict['dvdtThreshold'] = row['dvdtThreshold']
+        ba2 = sanpy.bAnalysis(path)
+        ba2.spikeDetect(oneDict)
+        assert row['numSpikes'] == ba2.numSpikes
+        assert row['peakVal_mean'] == np.mean(ba2.getStat('peakVal'))
+
+def test_spikeDetect_progress():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    ba.spikeDetect(dDict)
+    numSpikes = ba.numSpikes
+
+    # detect on a copy, this ba is not changed until applyDetection()
+    progress = []
+    baCopy = ba.getDetectionCopy()
+    dDict2 = copy.deepcopy(dDict)
+    dDict2['dvdtThreshold'] = 5
+    assert baCopy.spikeDetect(
+        dDict2,
+        progressCallback=lambda sweep, numSweeps, sweepFraction: progress.append((sweep, sweepFraction))
+    )
+    assert [sweep for sweep, sweepFraction in progress if sweepFraction == 1] == list(ba.fileLoader.sweepList)
+    assert [sweepFraction for sweep, sweepFraction in progress if sweep == 0] == sorted(
+        sweepFraction for sweep, sweepFraction in progress if sweep == 0
+    )
+    assert ba.numSpikes == numSpikes
+    assert ba.getDetectionDict()['dvdtThreshold'] == dDict['dvdtThreshold']
+
+    ba.applyDetection(baCopy)
+    assert ba.numSpikes == baCopy.numSpikes
+    assert ba.getDetectionDict()['dvdtThreshold'] == 5
+    assert ba.fileLoader.filteredDeriv is not None
+
+    # cancel in the second sweep
+    baCopy = ba.getDetectionCopy()
+    assert not baCopy.spikeDetect(dDict, progressCallback=lambda sweep, numSweeps, sweepFraction: sweep < 1)
+
+def test_spikeDetect_cancelUnchanged():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    # cancel the first detection, ba is still not analyzed
+    ba = sanpy.bAnalysis(path)
+    assert not ba.spikeDetect(dDict, progressCallback=lambda sweep, numSweeps, sweepFraction: sweep < 1)
+    assert not ba.isAnalyzed()
+    assert ba.numSpikes == 0
+
+    # cancel a new detection, ba keeps its analysis
+    assert ba.spikeDetect(dDict)
+    spikeDict = ba.spikeDict
+    numSpikes = ba.numSpikes
+    dDict2 = copy.deepcopy(dDict)
+    dDict2['dvdtThreshold'] = 5
+    assert not ba.spikeDetect(dDict2, progressCallback=lambda sweep, numSweeps, sweepFraction: sweep < 1)
+    assert ba.spikeDict is spikeDict
+    assert ba.numSpikes == numSpikes
+    assert ba.getDetectionDict()['dvdtThreshold'] == dDict['dvdtThreshold']
+
+def test_spikeDetect_cancelInSweep():
+    """A long single sweep reports progress and is cancelled before it is done."""
+    path = 'data/19114001.abf'
+    dDict = sanpy.bDetection().getDetectionDict('SA Node')
+
+    ba = sanpy.bAnalysis(path)
+    assert ba.fileLoader.numSweeps == 1
+    assert ba.spikeDetect(dDict)
+    spikeDict = ba.spikeDict
+    numSpikes = ba.numSpikes
+    dDict2 = copy.deepcopy(dDict)
+    dDict2['dvdtThreshold'] = 5
+
+    for chunkSec in [None, 2.0]:
+        progress = []
+
+        def cancelHalfway(sweep, numSweeps, sweepFraction):
+            progress.append(sweepFraction)
+            return sweepFraction < 0.5
+
+        assert not ba.spikeDetect(dDict2, chunkSec=chunkSec, progressCallback=cancelHalfway)
+        assert 0.5 <= progress[-1] < 1
+        assert len(progress) > 1
+        assert ba.spikeDict is spikeDict
+        assert ba.numSpikes == numSpikes
+        assert ba.getDetectionDict()['dvdtThreshold'] == dDict['dvdtThreshold']
+
+def test_spikeDetect_cancelWorkers():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    progress = []
+
+    def cancelFirst(sweep, numSweeps, sweepFraction):
+        progress.append(sweep)
+        return False
+
+    # the pool and its workers are terminated
+    assert not ba.spikeDetect(dDict, workers=2, progressCallback=cancelFirst)
+    assert progress == [0]
+    assert not ba.isAnalyzed()
+    assert ba.numSpikes == 0
+
+def test_applyDetection_keepsChanges():
+    path = 'data/2021_07_20_0010.abf'
+    dDict = sanpy.bDetection().getDetectionDict('Neuron')
+
+    ba = sanpy.bAnalysis(path)
+    baCopy = ba.getDetectionCopy()
+    assert baCopy.spikeDetect(dDict)
+
+    # changed while detecting on the copy
+    ba.fileLoader.setSweep(2)
+    ba.uuid = 'tKept'
+
+    ba.applyDetection(baCopy)
+    assert ba.isAnalyzed()
+    assert ba.numSpikes == baCopy.numSpikes
+    assert ba.spikeDict is baCopy.spikeDict
+    assert ba.fileLoader.currentSweep == 2
+    assert ba.uuid == 'tKept'
@@ -0,0 +1,95 @@
+import numpy as np
+
+from sanpy import analysisUtil
+
+def test_windowHelpers():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=500)
+
+    startPnts = np.array([0, 10, 490, 200, 300])
+    stopPnts = np.array([50, 10, 520, 260, 301])  # includes empty and past end
+
+    argMin = analysisUtil.windowArgMin(y, startPnts, stopPnts)
+    argMax = analysisUtil.windowArgMax(y, startPnts, stopPnts)
+    lastBelow = analysisUtil.windowLastBelow(y, startPnts, stopPnts, np.zeros(5))
+    firstBelow = analysisUtil.windowFirstBelow(y, startPnts, stopPnts, np.zeros(5))
+    firstAbove = analysisUtil.windowFirstAbove(y, startPnts, stopPnts, np.ones(5))
+    for i, (start, stop) in enumerate(zip(startPnts, stopPnts)):
+        oneWindow = y[start:stop]
+        if len(oneWindow) == 0:
+            assert argMin[i] == -1
+            assert argMax[i] == -1
+            assert lastBelow[i] == -1
+            assert firstBelow[i] == -1
+            assert firstAbove[i] == -1
+            continue
+        assert argMin[i] == start + np.argmin(oneWindow)
+        assert argMax[i] == start + np.argmax(oneWindow)
+        below = np.where(oneWindow < 0)[0]
+        expected = start + below[-1] if len(below) > 0 else -1
+        assert lastBelow[i] == expected
+        expected = start + below[0] if len(below) > 0 else -1
+        assert firstBelow[i] == expected
+        above = np.where(oneWindow > 1)[0]
+        expected = start + above[0] if len(above) > 0 else -1
+        assert firstAbove[i] == expected
+
+    theMeans = analysisUtil.windowMean(y, startPnts[[0, 3]], 20)
+    assert theMeans[0] == np.average(y[0:20])
+    assert theMeans[1] == np.average(y[200:220])
+
+def test_candidateFilters():
+    rng = np.random.default_rng(1)
+    spikeTimes = np.sort(rng.choice(np.arange(0, 2000), size=200, replace=False))
+    spikeErrors = [f"error {i}" for i in range(len(spikeTimes))]
+
+    # first spike is always good, then remove spikes too close to last good spike
+    goodMask = analysisUtil.refractoryMask(spikeTimes, 25)
+    lastGood = spikeTimes[0]
+    for i, spikeTime in enumerate(spikeTimes):
+        expected = i == 0 or (spikeTime - lastGood) >= 25
+        assert goodMask[i] == expected
+        if expected:
+            lastGood = spikeTime
+
+    # spike times of 0 are also thrown out
+    newSpikeTimes, newErrors = analysisUtil.throwOutRefractory(
+        spikeTimes, 25, spikeErrors
+    )
+    assert list(newSpikeTimes) == [t for t in spikeTimes[goodMask] if t]
+    assert newErrors == [e for e, t in zip(spikeErrors, spikeTimes) if t in newSpikeTimes]
+
+    y = rng.normal(size=2000)
+    risingMask = analysisUtil.risingPhaseMask(y, spikeTimes, 10)
+    for i, spikeTime in enumerate(spikeTimes):
+        if spikeTime < 10 or spikeTime + 11 > len(y):
+            continue
+        preAvg = np.average(y[spikeTime - 10 : spikeTime])
+        postAvg = np.average(y[spikeTime + 1 : spikeTime + 11])
+        assert risingMask[i] == (postAvg > preAvg)
+
+    peakPnts, peakVals = analysisUtil.windowPeaks(y, spikeTimes, 15)
+    # many windows that overlap
+    manyTimes = np.arange(0, 2010, 3)
+    manyPeaks, _ = analysisUtil.windowPeaks(y, manyTimes, 40)
+    assert np.array_equal(manyPeaks, analysisUtil.windowArgMax(y, manyTimes, manyTimes + 40))
+    for i, spikeTime in enumerate(spikeTimes):
+        assert peakPnts[i] == spikeTime + np.argmax(y[spikeTime : spikeTime + 15])
+        assert peakVals[i] == np.max(y[spikeTime : spikeTime + 15])
+
+def test_windowLinearFit():
+    rng = np.random.default_rng(2)
+    x = np.arange(1000) / 10000 + 5.0  # seconds
+    y = rng.normal(size=1000)
+
+    startPnts = np.array([0, 100, 300, 300, 990])
+    stopPnts = np.array([50, 400, 300, 301, 1000])  # includes empty and one point
+    slopes, intercepts, numPnts = analysisUtil.windowLinearFit(x, y, startPnts, stopPnts)
+    assert list(numPnts) == [50, 300, 0, 1, 10]
+    for i, (start, stop) in enumerate(zip(startPnts, stopPnts)):
+        if stop - start < 2:
+            assert np.isnan(slopes[i])
+            continue
+        m, b = np.polyfit(x[start:stop], y[start:stop], 1)
+        assert np.isclose(slopes[i], m)
+        assert np.isclose(intercepts[i], b)
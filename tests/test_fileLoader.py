@@ -105,7 +105,89 @@ def test_fileLoader_abf():
         print('csvPath:', csvPath)
         df.to_csv(csvPath, index=False)
 
-    
+def test_fileLoader_header():
+    # loadData=False only loads the header
+    for path in [os.path.join('data', '19114001.abf'), os.path.join('data', '2021_07_20_0010.abf')]:
+        abfFile = fileLoader_abf(path)
+        headerFile = fileLoader_abf(path, loadData=False)
+
+        assert headerFile.loadData is False
+        assert headerFile.recordingDur == abfFile.recordingDur
+        assert headerFile.numSweeps == abfFile.numSweeps
+        assert headerFile.numEpochs == abfFile.numEpochs
+        assert headerFile.recordingFrequency == abfFile.recordingFrequency
+        assert headerFile.recordingMode == abfFile.recordingMode
+        assert dict(headerFile.metadata) == dict(abfFile.metadata)
+
+def test_fileLoader_lazy():
+    # lazy=True memory maps one sweep at a time
+    import numpy as np
+
+    path = os.path.join('data', '2021_07_20_0010.abf')
+    abfFile = fileLoader_abf(path)
+    lazyFile = fileLoader_abf(path, lazy=True)
+
+    assert lazyFile.lazy is True
+    assert lazyFile.numEpochs == abfFile.numEpochs
+    for sweep in [0, 5, abfFile.numSweeps - 1]:
+        abfFile.setSweep(sweep)
+        lazyFile.setSweep(sweep)
+        assert np.array_equal(lazyFile.sweepX, abfFile.sweepX)
+        assert np.array_equal(lazyFile.sweepY, abfFile.sweepY)
+        assert np.array_equal(lazyFile.sweepC, abfFile.sweepC)
+        assert lazyFile.getEpochTable(sweep).getEpochList() == abfFile.getEpochTable(sweep).getEpochList()
+
+    # lazy only filters the current sweep, when it is needed
+    abfFile._getDerivative(0, 7, 2)
+    assert lazyFile._getDerivative(0, 7, 2) is None
+    assert lazyFile._filteredDeriv is None
+    for sweep in [0, 5]:
+        abfFile.setSweep(sweep)
+        lazyFile.setSweep(sweep)
+        assert np.array_equal(lazyFile.filteredDeriv, abfFile.filteredDeriv)
+        assert np.array_equal(lazyFile.sweepY_filtered, abfFile.sweepY_filtered)
+        assert lazyFile._filteredDeriv.shape == (lazyFile.numPnts, 1)
+        assert np.array_equal(
+            lazyFile._getFilteredRange(sweep + 1, 100, 200),
+            abfFile._getFilteredRange(sweep + 1, 100, 200),
+        )
+    assert len(lazyFile._derivativeCache) == 0
+
+    sweepLoader = lazyFile.getSweepLoader(5)
+    assert sweepLoader.lazy is False
+    assert np.array_equal(sweepLoader.sweepY, abfFile.getSweepLoader(5).sweepY)
+
+def test_fileLoader_derivativeCache():
+    path = os.path.join('data', '2021_07_20_0010.abf')
+    abfFile = fileLoader_abf(path)
+
+    filteredDeriv = abfFile._getDerivative(0, 5, 2)
+    assert abfFile._getDerivative(0, 5, 2) is filteredDeriv
+
+    # least recently used is evicted
+    for SavitzkyGolay_pnts in range(7, 7 + 2 * abfFile.derivativeCacheSize, 2):
+        abfFile._getDerivative(0, SavitzkyGolay_pnts, 2)
+    assert len(abfFile._derivativeCache) == abfFile.derivativeCacheSize
+    assert abfFile._getDerivative(0, 5, 2) is not filteredDeriv
+
+def test_fileLoader_tif_header(tmp_path):
+    import numpy as np
+    import tifffile
+
+    # 3d with time in shape[0], loadFile() will rotate
+    path = os.path.join(tmp_path, 'kymograph.tif')
+    tifffile.imwrite(path, np.ones((2, 300, 50), dtype=np.uint16))
+
+    tifFile = fileLoader_tif(path)
+    headerFile = fileLoader_tif(path, loadData=False)
+
+    assert headerFile.tifData is None
+    assert headerFile.tifHeader == tifFile.tifHeader
+    assert headerFile.recordingDur == tifFile.recordingDur
+    assert headerFile.numSweeps == tifFile.numSweeps
+    assert headerFile.recordingFrequency == tifFile.recordingFrequency
+    assert headerFile.recordingMode == tifFile.recordingMode
+
 def test_new_b_analysis():
     # test new version of bAnalysis using fileLoader
     # path = 'data/19114001.abf'
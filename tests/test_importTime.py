@@ -0,0 +1,77 @@
+"""Import time of sanpy and sanpy.interface.
+
+Run this file to benchmark import time,
+
+    python tests/test_importTime.py
+"""
+
+import statistics
+import subprocess
+import sys
+
+# loaded on first use, not on import
+_heavyModules = [
+    "scipy.signal",
+    "scipy.stats",
+    "seaborn",
+    "matplotlib",
+    "tables",
+    "h5py",
+    "tifffile",
+    "skimage",
+    "requests",
+]
+
+def _importTime(moduleName : str):
+    """Import a module in a fresh Python.
+
+    Uses `python -X importtime`.
+
+    Returns:
+        seconds: Cumulative import time of moduleName
+        moduleList: All modules that were imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {moduleName}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds = None
+    moduleList = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _self, cumulative, oneModule = line.split("|")
+        oneModule = oneModule.strip()
+        moduleList.append(oneModule)
+        if oneModule == moduleName:
+            seconds = int(cumulative) / 1e6
+    return seconds, moduleList
+
+def test_import_sanpy():
+    seconds, moduleList = _importTime("sanpy")
+    assert seconds > 0
+    for heavyModule in _heavyModules:
+        assert heavyModule not in moduleList, heavyModule
+
+def test_import_interface():
+    seconds, moduleList = _importTime("sanpy.interface")
+    assert seconds > 0
+    for heavyModule in _heavyModules:
+        assert heavyModule not in moduleList, heavyModule
+
+    # plugins are listed from their manifest and imported when first run
+    assert "sanpy.interface.plugins" in moduleList
+    assert "sanpy.interface.plugins.fftPlugin" not in moduleList
+    assert "sanpy.interface.plugins.plotScatter" not in moduleList
+
+if __name__ == "__main__":
+    numRepeats = 7
+    for moduleName in ["sanpy", "sanpy.interface"]:
+        secondsList = [_importTime(moduleName)[0] for _ in range(numRepeats)]
+        print(
+            f'"import {moduleName}" median {statistics.median(secondsList):.3f} s'
+            f" min {min(secondsList):.3f} s over {numRepeats} runs"
+        )
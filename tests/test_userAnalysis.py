@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+import sanpy
+from sanpy.user_analysis import baseUserAnalysis
+
+_userAnalysisCode = '''from sanpy.user_analysis.baseUserAnalysis import baseUserAnalysis
+
+class myUserAnalysis(baseUserAnalysis):
+    def defineUserStats(self):
+        self.addUserStat("My Peak Height", "my_peakHeight")
+
+    def run(self):
+        peakVal = self.getColumn("peakVal")
+        thresholdVal = self.getColumn("thresholdVal")
+        self.setColumn("my_peakHeight", peakVal - thresholdVal)
+'''
+
+def test_userAnalysisCache(tmp_path, monkeypatch):
+    monkeypatch.setattr(sanpy._util, '_getUserAnalysisFolder', lambda: str(tmp_path))
+    path = os.path.join(tmp_path, 'myUserAnalysis.py')
+    with open(path, 'w') as f:
+        f.write(_userAnalysisCode)
+
+    objList = baseUserAnalysis._getObjectList()
+    constructor = [obj['constructor'] for obj in objList if obj['path'] == path][0]
+
+    # not reloaded when the file did not change
+    objList = baseUserAnalysis._getObjectList()
+    assert [obj['constructor'] for obj in objList if obj['path'] == path][0] is constructor
+
+    # reloaded when the file changes
+    mtime = os.path.getmtime(path)
+    os.utime(path, (mtime + 10, mtime + 10))
+    objList = baseUserAnalysis._getObjectList()
+    assert [obj['constructor'] for obj in objList if obj['path'] == path][0] is not constructor
+
+    # user analysis runs with spike detection
+    ba = sanpy.bAnalysis('data/19114001.abf')
+    ba.spikeDetect(sanpy.bDetection().getDetectionDict('SA Node'))
+    assert np.array_equal(ba.getStat('my_peakHeight'), ba.getStat('peakHeight'))
+
+    os.remove(path)
+    objList = baseUserAnalysis._getObjectList()
+    assert path not in [obj['path'] for obj in objList]
+
+def test_userAnalysisColumn():
+    ba = sanpy.bAnalysis('data/19114001.abf')
+    ba.spikeDetect(sanpy.bDetection().getDetectionDict('SA Node'))
+
+    userObj = baseUserAnalysis.baseUserAnalysis(ba)
+    assert np.array_equal(userObj.getColumn('peakVal'), ba.getStat('peakVal'))
+    assert userObj.getColumn('not a stat') is None
+
+    userObj.setColumn('my_stat', 0.5)
+    userObj.setColumn('my_stat', [1.5, 2.5], spikeIdx=[1, 3])
+    assert ba.getStat('my_stat')[0:4] == [0.5, 1.5, 0.5, 2.5]
+
+    # out of range spikes are not set
+    userObj.setColumn('my_stat', [9.0], spikeIdx=[ba.numSpikes])
+    assert 9.0 not in ba.getStat('my_stat')